@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import platform
+from pathlib import Path
+from typing import Any, Dict, List
+
+from daily_art.core.fs import load_json, save_json
+from daily_art.domain.documents import utc_now_iso
+
+# Results are {group: {metric: value}}. The metric name says which way is better:
+# *_per_s is a rate (higher), *_ms / *_bytes / *_allocs are costs (lower).
+# Anything else (recall, hit rate) is a quality score compared with an absolute slack.
+
+LOWER_IS_BETTER = ("_ms", "_bytes", "_allocs")
+QUALITY_SLACK = 0.005
+
+Results = Dict[str, Dict[str, float]]
+
+
+def save_baseline(path: Path, results: Results, config: Dict[str, Any] | None = None) -> None:
+    save_json(path, {
+        "created_at": utc_now_iso(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": config or {},
+        "results": results,
+    })
+
+
+def load_baseline(path: Path) -> Results:
+    return load_json(path)["results"]
+
+
+def compare(current: Results, baseline: Results, tolerance: float = 0.2) -> List[str]:
+    """
+    Regressions beyond tolerance (relative, for rates and costs), one line each.
+    Groups or metrics missing from either side are skipped.
+    """
+    out: List[str] = []
+    for group, metrics in current.items():
+        base = baseline.get(group) or {}
+        for name, value in metrics.items():
+            if name not in base:
+                continue
+            ref = float(base[name])
+            if name.endswith("_per_s"):
+                bad = value < ref * (1 - tolerance)
+            elif name.endswith(LOWER_IS_BETTER):
+                bad = value > ref * (1 + tolerance)
+            else:
+                bad = value < ref - QUALITY_SLACK
+            if bad:
+                change = (value - ref) / ref * 100 if ref else 0.0
+                out.append(f"{group}.{name}: {value:g} vs baseline {ref:g} ({change:+.1f}%)")
+    return out
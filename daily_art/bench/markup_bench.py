@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+from daily_art.core.telegram_io import build_entities_from_markup
+
+# Usage: python -m daily_art.bench.markup_bench [--sizes 1000 10000 100000] [--repeat 5]
+# Time per char should stay flat as the input grows (the parser is linear).
+# CASES are checked first (exit code 1 on a mismatch), so a faster parser can't
+# silently change the output.
+
+PARAGRAPH = (
+    "**Name:** The Starry Night — *oil on canvas*, painted in __June 1889__ 🌌. "
+    "See [the museum page](https://www.moma.org/collection/works/79802) and `inv. 472.1941`. "
+    "~~Not~~ a night view from his window, but ||a composite from memory||.\n"
+)
+
+
+# markup -> (clean text, entities)
+CASES = {
+    "**Name:** Starry 🌌 night": ("Name: Starry 🌌 night", [{"type": "bold", "offset": 0, "length": 5}]),
+    "a *b* c": ("a b c", [{"type": "italic", "offset": 2, "length": 1}]),
+    "***bi***": ("bi", [{"type": "bold", "offset": 0, "length": 2}, {"type": "italic", "offset": 0, "length": 2}]),
+    "**a *b* c**": ("a b c", [{"type": "bold", "offset": 0, "length": 5}, {"type": "italic", "offset": 2, "length": 1}]),
+    "[link](https://a.b/c) `x*y*`": (
+        "link x*y*",
+        [{"type": "text_link", "offset": 0, "length": 4, "url": "https://a.b/c"}, {"type": "code", "offset": 5, "length": 4}],
+    ),
+    "**unclosed": ("**unclosed", []),
+    "2*3*4 snake_case": ("234 snake_case", [{"type": "italic", "offset": 1, "length": 1}]),
+}
+
+
+def check() -> List[str]:
+    failures = []
+    for markup, expected in CASES.items():
+        got = build_entities_from_markup(markup)
+        if got != expected:
+            failures.append(f"{markup!r}: expected {expected}, got {got}")
+    return failures
+
+
+def make_text(n_chars: int) -> str:
+    reps = n_chars // len(PARAGRAPH) + 1
+    return (PARAGRAPH * reps)[:n_chars]
+
+
+def bench(n_chars: int, repeat: int) -> float:
+    text = make_text(n_chars)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        build_entities_from_markup(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the Telegram markup parser")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    failures = check()
+    if failures:
+        print(f"{len(failures)} case(s) parse differently:")
+        for line in failures:
+            print("  " + line)
+        return 1
+    print(f"{'chars':>10}  {'best ms':>10}  {'ns/char':>8}")
+    for n in args.sizes:
+        t = bench(n, args.repeat)
+        print(f"{n:>10}  {t * 1000:>10.2f}  {t / n * 1e9:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
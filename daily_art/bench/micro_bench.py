@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from daily_art.bench.baseline import compare, load_baseline, save_baseline
+from daily_art.connectors.serper import _stable_id
+from daily_art.core.telegram_io import build_caption, build_entities_from_markup, clamp_entities
+from daily_art.domain.citations import citations_from_evidence
+from daily_art.domain.documents import Document, Evidence
+from daily_art.domain.models import ArtPost
+from daily_art.rag.chunking import Chunker, _chunk_id
+
+# Usage: python -m daily_art.bench.micro_bench [-k caption] [--baseline b.json [--save-baseline]]
+# Per case: ops/sec (best of --repeat timed runs), peak bytes traced during one call and
+# result_allocs = memory blocks still held by one call's return value.
+# Exit code 1 when a case regressed past --tolerance vs the baseline.
+
+PLAIN = (
+    "Painted in the asylum at Saint-Rémy, the canvas turns the view from his window into a "
+    "**swirling sky** over a *sleeping village*, with a cypress as the dark foreground."
+)
+EMOJI = (
+    "🌌✨ **Night sky** 🌙⭐️ over the *village* 🏘️🌳 — __cypress__ 🌲🔥 and ||hidden church|| ⛪️🙏 "
+    "👨‍🎨🖌️🎨 `inv. 472.1941` 🇳🇱🇫🇷 ~~day~~ 🌞➡️🌚 [MoMA](https://www.moma.org/) 🏛️💫"
+)
+
+
+def _post(body: str, repeat: int) -> ArtPost:
+    para = " ".join([body] * repeat)
+    return ArtPost(
+        title="The Starry Night",
+        year=1889,
+        art_style="Post-Impressionism",
+        artist="Vincent van Gogh",
+        related_quote="I dream my painting and I paint my dream",
+        quote_author="Vincent van Gogh",
+        painting_features=para,
+        context=para,
+        meaning=para,
+        conclusion=body,
+        unique_fact="He considered it a failure.",
+        painting_urls=[f"https://example.org/img/{i}.jpg" for i in range(3)],
+    )
+
+
+FIXTURES: Dict[str, ArtPost] = {
+    "short": _post(PLAIN, 1),
+    "emoji": _post(EMOJI, 2),
+    "long": _post(PLAIN + " " + EMOJI, 6),   # ~5 KB caption
+}
+
+DOCUMENT = Document(
+    id="wiki_0123456789abcdef",
+    title="The Starry Night",
+    text="\n".join([PLAIN * 3, EMOJI * 2] * 20),
+    url="https://en.wikipedia.org/wiki/The_Starry_Night",
+    source_type="wikipedia",
+    metadata={"lang": "en"},
+)
+
+EVIDENCE = [
+    Evidence(
+        chunk_id=f"c{i}",
+        text=PLAIN,
+        source_title=f"Source {i % 7}" if i % 3 else "",
+        source_url=f"https://site{i % 7}.example.org/page",
+        score=1.0 - i / 40,
+    )
+    for i in range(40)
+]
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    fn: Callable[[], Any]
+
+
+def _cases() -> List[Case]:
+    cases: List[Case] = []
+    for label, post in FIXTURES.items():
+        caption, _ = build_caption(post)
+        markup = "\n".join(filter(None, [post.painting_features, post.context, post.meaning]))
+        cases += [
+            Case(f"build_caption[{label}]", lambda p=post: build_caption(p)),
+            Case(f"build_entities_from_markup[{label}]", lambda t=markup: build_entities_from_markup(t)),
+            # clamp mutates lengths, so each call gets fresh entity dicts
+            Case(f"clamp_entities[{label}]", lambda c=caption, t=markup: clamp_entities(
+                c[: len(c) // 2], [dict(e) for e in build_entities_from_markup(t)[1]])),
+        ]
+        dumped = post.model_dump_json()
+        cases += [
+            Case(f"artpost_dump_json[{label}]", lambda p=post: p.model_dump_json()),
+            Case(f"artpost_validate_json[{label}]", lambda s=dumped: ArtPost.model_validate_json(s)),
+        ]
+
+    chunker = Chunker()
+    doc_json = DOCUMENT.model_dump_json()
+    cases += [
+        Case("chunker_chunk", lambda: chunker.chunk(DOCUMENT)),
+        Case("citations_from_evidence", lambda: citations_from_evidence(EVIDENCE, max_sources=5)),
+        Case("stable_id", lambda: _stable_id("wiki", DOCUMENT.url)),
+        Case("chunk_id", lambda: _chunk_id(DOCUMENT.id, 3, PLAIN)),
+        Case("document_dump_json", lambda: DOCUMENT.model_dump_json()),
+        Case("document_validate_json", lambda: Document.model_validate_json(doc_json)),
+    ]
+    return cases
+
+
+def time_case(fn: Callable[[], Any], repeat: int = 5, min_time: float = 0.1) -> float:
+    """
+    Best ops/sec over `repeat` runs; each run loops until it lasts at least min_time.
+    """
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - t0 >= min_time:
+            break
+        number *= 2
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return number / best
+
+
+def alloc_case(fn: Callable[[], Any]) -> Dict[str, float]:
+    fn()  # warm caches (regexes, pydantic validators) so they don't count
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    own = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(own).compare_to(before.filter_traces(own), "lineno")
+    held = sum(d.count_diff for d in diff if d.count_diff > 0)
+    del result
+    return {"peak_bytes": peak, "result_allocs": held}
+
+
+def run(pattern: str = "", repeat: int = 5, min_time: float = 0.1) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for case in _cases():
+        if pattern and pattern not in case.name:
+            continue
+        results[case.name] = {"ops_per_s": round(time_case(case.fn, repeat, min_time), 1), **alloc_case(case.fn)}
+    return results
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Micro-benchmarks for caption, chunking, hashing and model (de)serialization")
+    ap.add_argument("-k", dest="pattern", default="", help="Only cases whose name contains this")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--min-time", type=float, default=0.1, help="Seconds per timed run")
+    ap.add_argument("--baseline", type=str, default="", help="Baseline JSON to compare against (or to write)")
+    ap.add_argument("--save-baseline", action="store_true", help="Write results to --baseline instead of comparing")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown/growth before failing")
+    args = ap.parse_args(argv)
+
+    results = run(args.pattern, args.repeat, args.min_time)
+    print(f"{'case':<42} {'ops/s':>12} {'peak B':>10} {'allocs':>7}")
+    for name, r in results.items():
+        print(f"{name:<42} {r['ops_per_s']:>12,.0f} {r['peak_bytes']:>10,} {r['result_allocs']:>7}")
+
+    if not args.baseline:
+        return 0
+    path = Path(args.baseline)
+    if args.save_baseline:
+        save_baseline(path, results, config={"repeat": args.repeat, "min_time": args.min_time})
+        print(f"\nBaseline written: {path}")
+        return 0
+
+    regressions = compare(results, load_baseline(path), tolerance=args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) vs {path}:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print(f"\nNo regressions vs {path} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
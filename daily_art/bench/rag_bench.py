@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from daily_art.bench.baseline import compare, load_baseline, save_baseline
+from daily_art.core.cache import FileCache
+from daily_art.core.stats import latency_summary
+from daily_art.domain.documents import Chunk, Document
+from daily_art.rag.chunking import Chunker, ChunkingConfig
+from daily_art.rag.embeddings import OfflineEmbedder, embedding_cache_key
+from daily_art.rag.kb import KnowledgeBase, KnowledgeBaseConfig
+from daily_art.rag.vectordb import QdrantConfig
+
+# Usage: python -m daily_art.bench.rag_bench [--sizes 1k 10k 100k 1m] [--baseline b.json [--save-baseline]]
+# Everything runs offline: hashed bag-of-words vectors and an in-process Qdrant (":memory:").
+# Recall is known-item: the query is a handful of words taken from one chunk, which must come
+# back in the top k. Exit code 1 when a metric regressed past --tolerance vs the baseline.
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+PARAS_PER_DOC = 4
+
+ART_WORDS = (
+    "oil canvas tempera fresco portrait landscape still life baroque impressionism cubism "
+    "brushwork palette chiaroscuro perspective museum collection gallery patron commission "
+    "sketch etching varnish pigment ultramarine vermilion light shadow horizon figure"
+).split()
+SYLLABLES = "ka ro mi tel san vo lu ber qui den ash or pel zin mar tho".split()
+
+
+@dataclass(frozen=True)
+class RagBenchConfig:
+    dim: int = 128
+    top_k: int = 10
+    queries: int = 200
+    query_words: int = 8
+    cache_ops: int = 2000      # embedding-cache writes/reads per size (files on disk)
+    batch_size: int = 512
+    seed: int = 0
+
+
+def _vocabulary(rng: random.Random, n: int = 20_000) -> List[str]:
+    words = set(ART_WORDS)
+    while len(words) < n:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def synthetic_corpus(n_chunks: int, chunking: ChunkingConfig, seed: int = 0) -> List[Document]:
+    """
+    Documents whose paragraphs each become exactly one chunk (longer than min_chars,
+    two together longer than max_chars), so the corpus yields ~n_chunks chunks.
+    """
+    rng = random.Random(seed)
+    vocab = _vocabulary(rng)
+    target = (chunking.min_chars + chunking.max_chars) // 2 + 50
+    docs: List[Document] = []
+    for d in range(-(-n_chunks // PARAS_PER_DOC)):
+        paras = []
+        for _ in range(min(PARAS_PER_DOC, n_chunks - d * PARAS_PER_DOC)):
+            words: List[str] = []
+            size = 0
+            while size < target:
+                w = rng.choice(vocab)
+                words.append(w)
+                size += len(w) + 1
+            paras.append(" ".join(words)[: chunking.max_chars])
+        docs.append(Document(
+            id=f"bench_{d}",
+            title=f"Synthetic work {d}",
+            text="\n".join(paras),
+            url=f"https://bench.invalid/{d}",
+            source_type="manual",
+        ))
+    return docs
+
+
+def _rate(n: int, seconds: float) -> float:
+    return round(n / seconds, 1) if seconds > 0 else 0.0
+
+
+def _bench_cache(chunks: List[Chunk], embedder: OfflineEmbedder, n_ops: int) -> Dict[str, float]:
+    sample = chunks[:n_ops]
+    vectors = embedder.embed_texts([c.text for c in sample])
+    keys = [embedding_cache_key(embedder.cfg.model, c.text) for c in sample]
+    with tempfile.TemporaryDirectory(prefix="rag_bench_") as tmp:
+        cache = FileCache(Path(tmp))
+        t0 = time.perf_counter()
+        for k, v in zip(keys, vectors):
+            cache.set_json("embeddings", k, v)
+        write_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for k in keys:
+            cache.get_json("embeddings", k)
+        read_s = time.perf_counter() - t0
+    return {"cache_write_per_s": _rate(len(keys), write_s), "cache_read_per_s": _rate(len(keys), read_s)}
+
+
+def _known_item_queries(chunks: List[Chunk], cfg: RagBenchConfig) -> List[Tuple[str, str]]:
+    rng = random.Random(cfg.seed + 1)
+    picks = rng.sample(chunks, min(cfg.queries, len(chunks)))
+    out = []
+    for ch in picks:
+        words = ch.text.split()
+        out.append((" ".join(rng.sample(words, min(cfg.query_words, len(words)))), ch.id))
+    return out
+
+
+def bench_size(n_chunks: int, cfg: RagBenchConfig, qdrant: QdrantConfig) -> Dict[str, float]:
+    chunking = ChunkingConfig()
+    docs = synthetic_corpus(n_chunks, chunking, seed=cfg.seed)
+    embedder = OfflineEmbedder(dim=cfg.dim)
+
+    chunker = Chunker(chunking)
+    t0 = time.perf_counter()
+    chunks = [ch for d in docs for ch in chunker.chunk(d)]
+    chunk_s = time.perf_counter() - t0
+
+    kb = KnowledgeBase(
+        openai_api_key="",
+        cfg=KnowledgeBaseConfig(
+            chunking=chunking,
+            qdrant=QdrantConfig(**{**asdict(qdrant), "collection": f"bench_{uuid.uuid4().hex[:10]}"}),
+            top_k=cfg.top_k,
+        ),
+        embedder=embedder,
+    )
+    try:
+        embed_s = upsert_s = 0.0
+        for i in range(0, len(chunks), cfg.batch_size):
+            batch = chunks[i : i + cfg.batch_size]
+            t0 = time.perf_counter()
+            vectors = embedder.embed_texts([c.text for c in batch])
+            t1 = time.perf_counter()
+            kb.store.upsert(batch, vectors)
+            embed_s += t1 - t0
+            upsert_s += time.perf_counter() - t1
+
+        hits = 0
+        latencies: List[float] = []
+        for query, chunk_id in _known_item_queries(chunks, cfg):
+            t0 = time.perf_counter()
+            evidence = kb.search(query, top_k=cfg.top_k)
+            latencies.append(time.perf_counter() - t0)
+            hits += any(e.chunk_id == chunk_id for e in evidence)
+    finally:
+        kb.store.drop()
+
+    lat = latency_summary(latencies)
+    return {
+        "chunks": len(chunks),
+        "chunk_docs_per_s": _rate(len(docs), chunk_s),
+        "chunk_chunks_per_s": _rate(len(chunks), chunk_s),
+        **_bench_cache(chunks, embedder, cfg.cache_ops),
+        "embed_per_s": _rate(len(chunks), embed_s),
+        "upsert_points_per_s": _rate(len(chunks), upsert_s),
+        "search_p50_ms": lat["p50"],
+        "search_p95_ms": lat["p95"],
+        "search_p99_ms": lat["p99"],
+        f"recall_at_{cfg.top_k}": round(hits / max(1, len(latencies)), 4),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark chunking, embedding cache, upsert and search at scale (offline)")
+    ap.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["1k", "10k"])
+    ap.add_argument("--dim", type=int, default=128)
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--cache-ops", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--backend", choices=["memory", "qdrant"], default="memory",
+                    help="memory = in-process store; qdrant = server at localhost:6333")
+    ap.add_argument("--baseline", type=str, default="", help="Baseline JSON to compare against (or to write)")
+    ap.add_argument("--save-baseline", action="store_true", help="Write results to --baseline instead of comparing")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before failing")
+    args = ap.parse_args(argv)
+
+    cfg = RagBenchConfig(dim=args.dim, top_k=args.top_k, queries=args.queries, cache_ops=args.cache_ops, seed=args.seed)
+    qdrant = QdrantConfig(location=":memory:") if args.backend == "memory" else QdrantConfig()
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name in args.sizes:
+        r = bench_size(SIZES[name], cfg, qdrant)
+        results[name] = r
+        print(f"\n[{name}] {r['chunks']} chunks")
+        for k, v in r.items():
+            if k != "chunks":
+                print(f"  {k:>22}: {v:,.3f}" if isinstance(v, float) else f"  {k:>22}: {v}")
+
+    if not args.baseline:
+        return 0
+    path = Path(args.baseline)
+    if args.save_baseline:
+        save_baseline(path, results, config={**asdict(cfg), "backend": args.backend})
+        print(f"\nBaseline written: {path}")
+        return 0
+
+    regressions = compare(results, load_baseline(path), tolerance=args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) vs {path}:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print(f"\nNo regressions vs {path} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
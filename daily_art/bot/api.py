@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from daily_art.core.resilience import guard
+
+log = logging.getLogger("daily_art.bot.api")
+
+
+class BotAPI:
+    """
+    Minimal async Bot API client for the listener (replies, webhook setup).
+    Shares the process-wide "telegram" guard with the send queue.
+    """
+    def __init__(self, token: str, timeout: float = 30.0):
+        if not token:
+            raise RuntimeError("Missing TELEGRAM_BOT_TOKEN")
+        self.base = f"https://api.telegram.org/bot{token}"
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def call(self, method: str, **params: Any) -> Any:
+        g = guard("telegram")
+        g.breaker.before_call()
+        wait = g.bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        try:
+            r = await self._client.post(f"{self.base}/{method}", json={k: v for k, v in params.items() if v is not None})
+        except httpx.TransportError:
+            g.breaker.record_failure()
+            raise
+        if r.status_code >= 500 or r.status_code == 429:
+            g.breaker.record_failure()
+        else:
+            g.breaker.record_success()
+        body = r.json()
+        if not body.get("ok"):
+            raise RuntimeError(f"Telegram {method} failed ({r.status_code}): {body.get('description')}")
+        return body.get("result")
+
+    async def send_message(self, chat_id: int | str, text: str, reply_to_message_id: Optional[int] = None) -> Any:
+        return await self.call("sendMessage", chat_id=chat_id, text=text, reply_to_message_id=reply_to_message_id)
+
+    async def set_webhook(
+        self,
+        url: str,
+        secret_token: str = "",
+        max_connections: int = 40,
+        allowed_updates: Optional[List[str]] = None,
+    ) -> Any:
+        return await self.call(
+            "setWebhook",
+            url=url,
+            secret_token=secret_token or None,
+            max_connections=max_connections,
+            allowed_updates=allowed_updates,
+        )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class RecordingBotAPI:
+    """
+    Offline stand-in: keeps replies in memory instead of calling Telegram (replay/load tests).
+    """
+    def __init__(self) -> None:
+        self.sent: List[Dict[str, Any]] = []
+
+    async def call(self, method: str, **params: Any) -> Any:
+        self.sent.append({"method": method, **params})
+        return {"message_id": len(self.sent)}
+
+    async def send_message(self, chat_id: int | str, text: str, reply_to_message_id: Optional[int] = None) -> Any:
+        return await self.call("sendMessage", chat_id=chat_id, text=text, reply_to_message_id=reply_to_message_id)
+
+    async def aclose(self) -> None:
+        pass
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+log = logging.getLogger("daily_art.bot.dispatcher")
+
+# Update kinds the listener handles (same set the polling listener subscribes to).
+MESSAGE_KINDS = ("message", "edited_message", "channel_post", "edited_channel_post")
+
+
+@dataclass
+class Incoming:
+    update: Dict[str, Any]
+    message: Dict[str, Any]
+    chat_id: Optional[int]
+    text: str
+    command: str = ""      # "draft" for "/draft@MyBot ..."
+    args: str = ""
+
+    @property
+    def username(self) -> Optional[str]:
+        return (self.message.get("from") or {}).get("username")
+
+
+Handler = Callable[[Incoming], Awaitable[None]]
+
+
+def parse_update(update: Dict[str, Any]) -> Optional[Incoming]:
+    """
+    Raw update -> Incoming (text or caption, plus /command and its arguments), or None
+    for updates without a message.
+    """
+    message = next((update[k] for k in MESSAGE_KINDS if update.get(k)), None)
+    if not message:
+        return None
+    text = (message.get("text") or message.get("caption") or "").strip()
+    inc = Incoming(update=update, message=message, chat_id=(message.get("chat") or {}).get("id"), text=text)
+    if text.startswith("/"):
+        head, _, rest = text.partition(" ")
+        inc.command = head[1:].split("@", 1)[0].lower()
+        inc.args = rest.strip()
+    return inc
+
+
+class Dispatcher:
+    """
+    Routes updates to command handlers, everything else to the text handler.
+    """
+    def __init__(self) -> None:
+        self.commands: Dict[str, Handler] = {}
+        self.text_handler: Optional[Handler] = None
+
+    def command(self, name: str) -> Callable[[Handler], Handler]:
+        def register(fn: Handler) -> Handler:
+            self.commands[name] = fn
+            return fn
+        return register
+
+    def text(self, fn: Handler) -> Handler:
+        self.text_handler = fn
+        return fn
+
+    async def dispatch(self, update: Dict[str, Any]) -> None:
+        inc = parse_update(update)
+        if inc is None:
+            return
+        log.info("Incoming update %s: chat_id=%s text=%r", update.get("update_id"), inc.chat_id, inc.text[:80])
+        if inc.command:
+            handler = self.commands.get(inc.command)
+        else:
+            handler = self.text_handler if inc.text else None
+        if handler is not None:
+            await handler(inc)
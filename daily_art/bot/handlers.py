@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Iterable, Optional, Tuple
+
+from daily_art.bot.dispatcher import Dispatcher, Incoming
+
+log = logging.getLogger("daily_art.bot.handlers")
+
+STATUS_LIMIT = 10
+
+HELP_TEXT = "/start - say hi\n/help - this list"
+JOB_HELP_TEXT = (
+    "/draft <title> | <author> | <year> - queue a draft\n"
+    "/status [id] - recent jobs, or one job\n"
+    "/send <id> - publish a finished draft"
+)
+
+
+def parse_draft_args(args: str) -> Optional[Tuple[str, str, str]]:
+    """
+    "Title | Author | Year" -> (title, author, year); author and year are optional.
+    """
+    parts = [p.strip() for p in args.split("|")]
+    if not parts or not parts[0]:
+        return None
+    parts += [""] * (3 - len(parts))
+    return parts[0], parts[1], parts[2]
+
+
+def build_dispatcher(api, jobs=None, admin_chat_ids: Iterable[str] = ()) -> Dispatcher:
+    """
+    The listener's handlers: /start, /help and an echo for plain text (as in listen.py).
+    With a JobQueue, also /draft, /status and /send (admin chats only: jobs carry
+    other chats' titles and results).
+    """
+    dp = Dispatcher()
+    admins = {str(c) for c in admin_chat_ids}
+
+    async def reply(inc: Incoming, text: str) -> None:
+        if inc.chat_id is not None:
+            await api.send_message(inc.chat_id, text, reply_to_message_id=inc.message.get("message_id"))
+
+    @dp.command("start")
+    async def start(inc: Incoming) -> None:
+        await reply(inc, f"Hi {inc.username or 'there'}!")
+
+    @dp.command("help")
+    async def help_command(inc: Incoming) -> None:
+        await reply(inc, HELP_TEXT if jobs is None else f"{HELP_TEXT}\n{JOB_HELP_TEXT}")
+
+    @dp.text
+    async def echo(inc: Incoming) -> None:
+        await reply(inc, inc.text)
+
+    if jobs is None:
+        return dp
+
+    from daily_art.pipeline.jobs import Job
+
+    async def allowed(inc: Incoming) -> bool:
+        if str(inc.chat_id) in admins:
+            return True
+        log.warning("Rejected /%s from chat %s", inc.command, inc.chat_id)
+        await reply(inc, "Not allowed here (see TELEGRAM_ADMIN_CHAT_IDS).")
+        return False
+
+    # JobQueue methods do file I/O; keep them off the event loop as well.
+    @dp.command("draft")
+    async def draft(inc: Incoming) -> None:
+        if not await allowed(inc):
+            return
+        parsed = parse_draft_args(inc.args)
+        if parsed is None:
+            await reply(inc, "Usage: /draft <title> | <author> | <year>")
+            return
+        title, author, year = parsed
+        job = Job(kind="draft", args={"title": title, "author": author, "year": year}, chat_id=inc.chat_id)
+        ahead = await asyncio.to_thread(jobs.put, job)
+        await reply(inc, f"Queued draft {job.id} ({ahead} ahead)")
+
+    @dp.command("send")
+    async def send(inc: Incoming) -> None:
+        if not await allowed(inc):
+            return
+        draft_id = inc.args.strip()
+        target = await asyncio.to_thread(jobs.get, draft_id) if draft_id else None
+        if target is None or target.kind != "draft":
+            await reply(inc, "Usage: /send <draft id> (see /status)")
+            return
+        if target.status != "done":
+            await reply(inc, f"Draft {draft_id} is {target.status}; try again when it is done")
+            return
+        job = Job(kind="send", args={"draft_job": draft_id}, chat_id=inc.chat_id)
+        await asyncio.to_thread(jobs.put, job)
+        await reply(inc, f"Publishing draft {draft_id}…")
+
+    @dp.command("status")
+    async def status(inc: Incoming) -> None:
+        if not await allowed(inc):
+            return
+        all_jobs = await asyncio.to_thread(jobs.all)
+        if inc.args:
+            job = next((j for j in all_jobs if j.id == inc.args.strip()), None)
+            if job is None:
+                await reply(inc, f"No job {inc.args.strip()}")
+                return
+            shown = [job]
+        else:
+            shown = [j for j in all_jobs if j.chat_id == inc.chat_id][-STATUS_LIMIT:]
+        if not shown:
+            await reply(inc, "No jobs yet")
+            return
+        lines = []
+        for j in shown:
+            what = j.args.get("title") or j.args.get("draft_job", "")
+            extra = f" - {j.error}" if j.error else ""
+            lines.append(f"{j.id} {j.kind} {j.status}: {what}{extra}")
+        await reply(inc, "\n".join(lines))
+
+    return dp
+
+
+def job_queue():
+    from daily_art.core.config import load_settings
+    from daily_art.pipeline.jobs import JobQueue
+
+    return JobQueue(load_settings().data_dir / "bot" / "jobs.json")
+
+
+def start_job_workers(api, queue, loop: asyncio.AbstractEventLoop, workers: int = 2):
+    """
+    Starts pipeline worker threads for `queue`; their progress messages are posted
+    back through `api` on `loop`.
+    """
+    from daily_art.pipeline.art_pipeline import ArtPipeline
+    from daily_art.pipeline.jobs import JobWorkers
+
+    def notify(chat_id: Optional[int], text: str) -> None:
+        if chat_id is None:
+            return
+        fut = asyncio.run_coroutine_threadsafe(api.send_message(chat_id, text), loop)
+        fut.add_done_callback(lambda f: f.exception() and log.warning("Progress message failed: %s", f.exception()))
+
+    pool = JobWorkers(ArtPipeline(), queue, notify, workers=workers)
+    pool.start()
+    return pool
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from daily_art.core.logging import configure_logging
+from daily_art.core.stats import latency_summary
+
+from daily_art.bot.api import RecordingBotAPI
+from daily_art.bot.handlers import build_dispatcher
+from daily_art.bot.webhook import UpdateProcessor, WebhookApp
+
+# Replays recorded updates (JSONL, e.g. from the listener's --record) against the webhook.
+#   python -m daily_art.bot.replay updates.jsonl                       # in-process, replies recorded
+#   python -m daily_art.bot.replay updates.jsonl --url http://host:8080/telegram --secret S
+# Reports webhook ack latency and how long the workers took to drain the backlog.
+
+
+def load_updates(path: Path) -> List[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def expand(updates: List[Dict[str, Any]], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Repeats the recording with fresh update_ids so deduplication doesn't hide the load.
+    """
+    out: List[Dict[str, Any]] = []
+    uid = 1
+    for _ in range(max(1, repeat)):
+        for u in updates:
+            out.append({**u, "update_id": uid})
+            uid += 1
+    return out
+
+
+async def replay(
+    updates: List[Dict[str, Any]],
+    url: str = "",
+    secret: str = "",
+    concurrency: int = 32,
+    workers: int = 16,
+    max_pending: int = 1000,
+    handler_delay: float = 0.0,
+    max_redeliveries: int = 20,
+) -> Dict[str, Any]:
+    processor = None
+    if url:
+        client = httpx.AsyncClient(timeout=30.0)
+        target = url
+    else:
+        api = RecordingBotAPI()
+        dp = build_dispatcher(api)
+
+        async def handle(update: Dict[str, Any]) -> None:
+            if handler_delay:
+                await asyncio.sleep(handler_delay)  # stand-in for slow handlers
+            await dp.dispatch(update)
+
+        processor = UpdateProcessor(handle, workers=workers, max_pending=max_pending)
+        app = WebhookApp(processor, secret_token=secret)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), timeout=30.0)
+        target = "http://replay.local/telegram"
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def post(update: Dict[str, Any]) -> None:
+        # like Telegram: a 503 is redelivered after Retry-After
+        for _ in range(max_redeliveries + 1):
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post(target, json=update, headers=headers)
+                latencies.append(time.perf_counter() - t0)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+            if r.status_code != 503:
+                return
+            await asyncio.sleep(float(r.headers.get("retry-after", "1")))
+
+    t0 = time.perf_counter()
+    async with client:
+        await asyncio.gather(*(post(u) for u in updates))
+        acked = time.perf_counter() - t0
+        if processor is not None:
+            await processor.stop(drain=True)
+    total = time.perf_counter() - t0
+
+    report: Dict[str, Any] = {
+        "updates": len(updates),
+        "statuses": statuses,
+        "ack_ms": latency_summary(latencies),
+        "acked_in_s": round(acked, 3),
+        "total_s": round(total, 3),
+        "updates_per_s": round(len(updates) / total, 1) if total else 0.0,
+    }
+    if processor is not None:
+        report["processor"] = processor.stats
+    return report
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Replay recorded Telegram updates against the webhook")
+    ap.add_argument("updates", type=str, help="JSONL of raw updates")
+    ap.add_argument("--url", type=str, default="", help="Running webhook URL (default: in-process app)")
+    ap.add_argument("--secret", type=str, default="")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--concurrency", type=int, default=32, help="Concurrent webhook deliveries")
+    ap.add_argument("--workers", type=int, default=16, help="In-process: update workers")
+    ap.add_argument("--max-pending", type=int, default=1000, help="In-process: queue bound")
+    ap.add_argument("--handler-delay", type=float, default=0.0, help="In-process: simulated seconds per update")
+    ap.add_argument("--log-level", type=str, default="WARNING")
+    args = ap.parse_args(argv)
+    configure_logging(args.log_level)
+
+    updates = expand(load_updates(Path(args.updates)), args.repeat)
+    report = asyncio.run(replay(
+        updates,
+        url=args.url,
+        secret=args.secret,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        handler_delay=args.handler_delay,
+    ))
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import json
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from daily_art.core import metrics
+from daily_art.core.fs import append_jsonl
+from daily_art.core.tracing import span
+
+log = logging.getLogger("daily_art.bot.webhook")
+
+UPDATES = metrics.counter("daily_art_bot_updates_total", "Webhook updates by outcome", ("result",))
+UPDATES_PENDING = metrics.gauge("daily_art_bot_updates_pending", "Updates queued for the handler workers")
+
+
+class UpdateProcessor:
+    """
+    Bounded queue + fixed pool of worker tasks. submit() never waits: it returns False
+    when max_pending updates are already queued, so the backlog can't grow without bound.
+    Redelivered updates (same update_id) are acknowledged but processed once.
+    """
+    def __init__(
+        self,
+        handle: Callable[[Dict[str, Any]], Awaitable[None]],
+        workers: int = 16,
+        max_pending: int = 1000,
+        dedupe_window: int = 10000,
+    ):
+        self.handle = handle
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.dedupe_window = dedupe_window
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        self.stats = {"received": 0, "duplicates": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        UPDATES_PENDING.set_function(lambda: self.pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, update: Dict[str, Any]) -> bool:
+        self.start()
+        self.stats["received"] += 1
+        uid = update.get("update_id")
+        if isinstance(uid, int):
+            if uid in self._seen:
+                self.stats["duplicates"] += 1
+                UPDATES.labels("duplicate").inc()
+                return True
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            UPDATES.labels("rejected").inc()
+            return False
+        if isinstance(uid, int):
+            self._seen[uid] = None
+            if len(self._seen) > self.dedupe_window:
+                self._seen.popitem(last=False)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self._queue.get()
+            try:
+                with span("bot.update", update_id=update.get("update_id")):
+                    await self.handle(update)
+                self.stats["processed"] += 1
+                UPDATES.labels("processed").inc()
+            except Exception:
+                self.stats["failed"] += 1
+                UPDATES.labels("failed").inc()
+                log.exception("Failed to process update %s", update.get("update_id"))
+            finally:
+                self._queue.task_done()
+
+    async def drain(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self, drain: bool = True) -> None:
+        if drain:
+            await self.drain()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+class WebhookApp:
+    """
+    ASGI app for Telegram webhooks: POST <path> queues the update on the processor and
+    returns 200 at once (handlers run in the background). A full queue answers 503,
+    which makes Telegram redeliver later instead of us buffering without limit.
+    record_path appends every accepted update as JSONL (input for bot.replay).
+    """
+    def __init__(
+        self,
+        processor: UpdateProcessor,
+        path: str = "/telegram",
+        secret_token: str = "",
+        record_path: Optional[Path] = None,
+        on_startup: Optional[Callable[[], Awaitable[None]]] = None,
+        on_shutdown: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.processor = processor
+        self.path = path
+        self.secret_token = secret_token
+        self.record_path = record_path
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        if scope["path"] == "/healthz" and scope["method"] == "GET":
+            body = {"pending": self.processor.pending, **self.processor.stats}
+            await self._respond(send, 200, body)
+            return
+        if scope["path"] != self.path or scope["method"] != "POST":
+            await self._respond(send, 404, {"ok": False})
+            return
+
+        if self.secret_token:
+            headers = dict(scope.get("headers") or [])
+            got = headers.get(b"x-telegram-bot-api-secret-token", b"").decode("latin-1")
+            if not hmac.compare_digest(got, self.secret_token):
+                await self._respond(send, 401, {"ok": False})
+                return
+
+        raw = b""
+        while True:
+            msg = await receive()
+            raw += msg.get("body", b"")
+            if not msg.get("more_body"):
+                break
+        try:
+            update = json.loads(raw)
+        except ValueError:
+            await self._respond(send, 400, {"ok": False})
+            return
+
+        if not self.processor.submit(update):
+            if self.processor.stats["rejected"] == 1 or self.processor.stats["rejected"] % 100 == 0:
+                log.warning(
+                    "Update queue full (%d pending, %d rejected so far); asking Telegram to retry",
+                    self.processor.pending, self.processor.stats["rejected"],
+                )
+            await self._respond(send, 503, {"ok": False}, extra_headers=[(b"retry-after", b"1")])
+            return
+        if self.record_path is not None:
+            append_jsonl(self.record_path, [update])
+        await self._respond(send, 200, {"ok": True})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            msg = await receive()
+            if msg["type"] == "lifespan.startup":
+                self.processor.start()
+                if self.on_startup:
+                    await self.on_startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif msg["type"] == "lifespan.shutdown":
+                await self.processor.stop(drain=True)
+                if self.on_shutdown:
+                    await self.on_shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _respond(send, status: int, body: Dict[str, Any], extra_headers=None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers + (extra_headers or [])})
+        await send({"type": "http.response.body", "body": payload})
+
+
+def serve(
+    token: str,
+    public_url: str,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    path: str = "/telegram",
+    secret_token: str = "",
+    workers: int = 16,
+    max_pending: int = 1000,
+    record_path: Optional[Path] = None,
+    job_workers: int = 2,
+    admin_chat_ids: Iterable[str] = (),
+    metrics_port: int = 0,
+    metrics_host: str = "127.0.0.1",
+) -> None:
+    """
+    Registers the webhook with Telegram and serves it with uvicorn.
+    job_workers > 0 enables /draft, /status and /send backed by the pipeline job queue.
+    metrics_port > 0 serves /metrics on its own (by default local-only) listener, never
+    on the public webhook port.
+    """
+    import uvicorn
+
+    from daily_art.bot.api import BotAPI
+    from daily_art.bot.dispatcher import MESSAGE_KINDS
+    from daily_art.bot.handlers import build_dispatcher, job_queue, start_job_workers
+
+    if metrics_port:
+        metrics.serve_metrics(metrics_port, host=metrics_host)
+    api = BotAPI(token)
+    jobs = job_queue() if job_workers > 0 else None
+    dp = build_dispatcher(api, jobs=jobs, admin_chat_ids=admin_chat_ids)
+    processor = UpdateProcessor(dp.dispatch, workers=workers, max_pending=max_pending)
+
+    async def startup() -> None:
+        if jobs is not None:
+            start_job_workers(api, jobs, asyncio.get_running_loop(), workers=job_workers)
+        url = public_url.rstrip("/") + path
+        await api.set_webhook(
+            url,
+            secret_token=secret_token,
+            max_connections=min(100, workers * 2),
+            allowed_updates=list(MESSAGE_KINDS),
+        )
+        log.info("Webhook registered at %s (%d workers)", url, workers)
+
+    app = WebhookApp(
+        processor,
+        path=path,
+        secret_token=secret_token,
+        record_path=record_path,
+        on_startup=startup,
+        on_shutdown=api.aclose,
+    )
+    uvicorn.run(app, host=host, port=port, log_level="warning")
@@ -1,19 +1,21 @@
 from __future__ import annotations
 import argparse
 import logging
+import sys
 from pathlib import Path
 from daily_art.core.config import load_settings
-from daily_art.core.fs import ensure_dirs, save_json
+from daily_art.core.fs import ensure_dirs, load_json, save_json
 from daily_art.core.logging import configure_logging
 from daily_art.core.validate import validate_settings
 from daily_art.connectors.serper import SerperClient
 from daily_art.connectors.wikipedia import WikipediaClient
-from daily_art.core.fs import load_json
 from daily_art.domain.documents import Document
-from daily_art.rag.kb import KnowledgeBase
-from daily_art.core.validate import validate_settings
-from daily_art.pipeline.art_pipeline import ArtPipeline
+from daily_art.pipeline.art_pipeline import ARTIFACT_STAGES, ArtPipeline
 from daily_art.core.cache import FileCache
+from daily_art.core import tracing
+
+# langchain / openai / qdrant_client are imported inside the commands that need them,
+# so --help, build-message and send start fast and don't depend on those services.
 
 log = logging.getLogger("daily_art.cli")
 
@@ -44,6 +46,43 @@ def cmd_fetch_docs(args: argparse.Namespace) -> int:
     return 0
 
 
+def cmd_prefetch(args: argparse.Namespace) -> int:
+    """
+    Warm the Serper cache for many queries using batched requests.
+    """
+    s = load_settings()
+    configure_logging(s.log_level)
+    validate_settings(s, require_telegram=False, require_serper=True)
+
+    lines = Path(args.queries).read_text(encoding="utf-8").splitlines()
+    queries = [q.strip() for q in lines if q.strip()]
+
+    serper = SerperClient(api_key=s.serper_api_key, cache=FileCache(s.data_dir / "cache"))
+    serper.search_many(queries)
+    if args.images:
+        serper.search_images_many(queries, num=args.num_images)
+    log.info("Prefetched %d queries", len(queries))
+    return 0
+
+
+def _add_fresh_llm(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--fresh-llm",
+        action="store_true",
+        help="Bypass the LLM response cache and regenerate text (LLM_CACHE_TTL_HOURS enables the cache)",
+    )
+
+
+def _add_force_stage(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--force-stage",
+        action="append",
+        default=[],
+        choices=ARTIFACT_STAGES,
+        help="Recompute this stage even if its artifact is cached (repeatable)",
+    )
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(prog="daily_art", description="RAG knowledge pipeline")
 
@@ -52,22 +91,90 @@ def build_parser() -> argparse.ArgumentParser:
     p_draft.add_argument("title", type=str)
     p_draft.add_argument("author", type=str)
     p_draft.add_argument("year", type=str)
+    _add_force_stage(p_draft)
+    _add_fresh_llm(p_draft)
+    p_draft.add_argument("--stream", action="store_true", help="Stream generation and print fields as they arrive")
     p_draft.set_defaults(func=cmd_draft)
 
+    p_batch = sub.add_parser("draft-batch", help="Draft many artworks from CSV/JSONL with a worker pool (resumable)")
+    p_batch.add_argument("items", type=str, help="CSV (title,author,year header) or JSONL file")
+    p_batch.add_argument("--workers", type=int, default=4)
+    p_batch.add_argument("--retries", type=int, default=3, help="Retries per item with exponential backoff")
+    p_batch.add_argument("--backoff", type=float, default=2.0, help="Initial backoff in seconds")
+    p_batch.add_argument("--checkpoint", type=str, default="", help="Checkpoint JSONL (default: data/batches/<items>.checkpoint.jsonl)")
+    _add_fresh_llm(p_batch)
+    p_batch.add_argument("--metrics-port", type=int, default=0, help="Serve Prometheus /metrics on 127.0.0.1:PORT while running")
+    p_batch.set_defaults(func=cmd_draft_batch)
+
+    p_bj = sub.add_parser("batch-run", help="Submit drafts or embeddings as one provider batch job (offline, cheaper)")
+    p_bj.add_argument("kind", choices=("drafts", "embeddings"))
+    p_bj.add_argument("input", type=str, help="drafts: CSV/JSONL of artworks; embeddings: docs JSON from fetch-docs")
+    p_bj.add_argument("--name", type=str, default="", help="Job name (default: input file stem)")
+    p_bj.add_argument("--provider", choices=("openai", "local"), default="openai")
+    p_bj.add_argument("--no-wait", action="store_true", help="Submit and exit; use batch-collect later")
+    p_bj.add_argument("--poll-interval", type=float, default=60.0)
+    p_bj.set_defaults(func=cmd_batch_run)
+
+    p_bc = sub.add_parser("batch-collect", help="Map a finished batch job's results into drafts / embedding cache")
+    p_bc.add_argument("name", type=str)
+    p_bc.set_defaults(func=cmd_batch_collect)
+
+    p_ref = sub.add_parser("refine", help="Regenerate only the draft fields your comments target")
+    p_ref.add_argument("draft_json", type=str, help="Path to ArtPost JSON produced by draft")
+    p_ref.add_argument(
+        "-c", "--comment",
+        action="append",
+        required=True,
+        help='Reviewer comment, e.g. "intro: make it shorter" (repeatable; unprefixed comments are matched to fields)',
+    )
+    p_ref.set_defaults(func=cmd_refine)
+
     p_bm = sub.add_parser("build-message", help="Build Telegram message JSON from ArtPost JSON")
     p_bm.add_argument("art_json", type=str, help="Path to ArtPost JSON (draft/refined)")
+    _add_force_stage(p_bm)
     p_bm.set_defaults(func=cmd_build_message)
 
     p_send = sub.add_parser("send", help="Send Telegram message from MessagePayload JSON")
     p_send.add_argument("message_json", type=str, help="Path to message JSON produced by build-message")
+    p_send.add_argument(
+        "--chat", action="append", default=[],
+        help="Target chat id/@channel (repeatable); defaults to TELEGRAM_CHAT_ID. Already-sent chats are skipped.",
+    )
     p_send.set_defaults(func=cmd_send)
 
     p_post = sub.add_parser("post", help="Draft -> build-message -> send")
     p_post.add_argument("title", type=str)
     p_post.add_argument("author", type=str)
     p_post.add_argument("year", type=str)
+    _add_force_stage(p_post)
+    _add_fresh_llm(p_post)
     p_post.set_defaults(func=cmd_post)
 
+    sa = sub.add_parser("schedule-add", help="Queue an artwork for posting at a given time")
+    sa.add_argument("title", type=str)
+    sa.add_argument("author", type=str)
+    sa.add_argument("year", type=str)
+    sa.add_argument("--at", required=True, help="Send time, ISO-8601 (e.g. 2026-10-20T09:00:00+00:00; UTC if no offset)")
+    sa.set_defaults(func=cmd_schedule_add)
+
+    sl = sub.add_parser("schedule-list", help="Show the posting queue")
+    sl.set_defaults(func=cmd_schedule_list)
+
+    sv = sub.add_parser("schedule-resolve", help="Settle a post whose send outcome is unknown (check the channel first)")
+    sv.add_argument("id", type=str)
+    how = sv.add_mutually_exclusive_group(required=True)
+    how.add_argument("--sent", action="store_true", help="It did reach the channel: mark it sent")
+    how.add_argument("--resend", action="store_true", help="It did not: queue it for sending again")
+    sv.add_argument("--message-id", type=int, default=None, help="With --sent: the Telegram message_id")
+    sv.set_defaults(func=cmd_schedule_resolve)
+
+    sr = sub.add_parser("schedule-run", help="Run the posting scheduler (prepares posts ahead, sends on time)")
+    sr.add_argument("--lead-hours", type=float, default=6.0, help="Prepare posts this long before send time")
+    sr.add_argument("--poll-interval", type=float, default=30.0)
+    sr.add_argument("--once", action="store_true", help="Run a single tick and exit (e.g. from cron)")
+    sr.add_argument("--metrics-port", type=int, default=0, help="Serve Prometheus /metrics on 127.0.0.1:PORT while running")
+    sr.set_defaults(func=cmd_schedule_run)
+
     f = sub.add_parser("fetch-docs", help="Fetch documents from Serper/Wikipedia and save as JSON")
     f.add_argument("query", type=str)
     f.add_argument("--out", type=str, default="")
@@ -76,24 +183,91 @@ def build_parser() -> argparse.ArgumentParser:
     f.add_argument("--use-wiki", action="store_true", help="Enable Wikipedia document")
     f.set_defaults(func=cmd_fetch_docs)
 
+    pf = sub.add_parser("prefetch", help="Warm the Serper cache for a file of queries (one per line)")
+    pf.add_argument("queries", type=str, help="Text file with one query per line")
+    pf.add_argument("--images", action="store_true", help="Also prefetch image search results")
+    pf.add_argument("--num-images", type=int, default=2)
+    pf.set_defaults(func=cmd_prefetch)
+
     ix = sub.add_parser("kb-index", help="Index documents JSON into vector store")
     ix.add_argument("--docs", required=True, help="Path to docs JSON produced by fetch-docs")
     ix.set_defaults(func=cmd_kb_index)
 
+    sw = sub.add_parser("eval-sweep", help="Evaluate a grid of chunking/top_k configs on throwaway indexes")
+    sw.add_argument("--docs", required=True, help="Docs JSON produced by fetch-docs")
+    sw.add_argument("--gold", default="daily_art/eval/gold.json")
+    sw.add_argument("--max-chars", type=int, nargs="+", default=[600, 900, 1200])
+    sw.add_argument("--min-chars", type=int, nargs="+", default=[100, 200])
+    sw.add_argument("--top-k", type=int, nargs="+", default=[4, 6, 8])
+    sw.add_argument("--backend", choices=["memory", "qdrant"], default="memory",
+                    help="memory: in-process Qdrant; qdrant: temporary collections on the configured server")
+    sw.add_argument("--workers", type=int, default=8)
+    sw.add_argument("--report", type=str, default="", help="Write the leaderboard as JSON")
+    sw.set_defaults(func=cmd_eval_sweep)
+
     qs = sub.add_parser("kb-search", help="Search the KB and print evidence snippets")
     qs.add_argument("query", type=str)
     qs.add_argument("--top-k", type=int, default=6)
     qs.set_defaults(func=cmd_kb_search)
 
+    ts = sub.add_parser("trace-summary", help="Waterfall of one traced run and per-span percentiles across runs")
+    ts.add_argument("files", nargs="+", help="Span JSONL file(s) written with --trace")
+    ts.add_argument("--trace-id", default="", help="Trace to draw (default: the most recent)")
+    ts.add_argument("--no-waterfall", action="store_true", help="Only print the aggregate table")
+    ts.set_defaults(func=cmd_trace_summary)
+
+    ur = sub.add_parser("usage-report", help="OpenAI tokens, cost and cache savings from the usage ledger")
+    ur.add_argument("--by", choices=["day", "command", "artwork", "model"], default="day")
+    ur.add_argument("--since", default="", help="Only records from this UTC date on (YYYY-MM-DD)")
+    ur.set_defaults(func=cmd_usage_report)
+
+    for sp in sub.choices.values():
+        if sp is not ts:
+            sp.add_argument("--trace", default="", metavar="OUT.jsonl",
+                            help="Append timing spans of this run to a JSONL file (see trace-summary)")
+
     return p
 
+def _print_field(key: str, value) -> None:
+    text = str(value).replace("\n", " ")
+    print(f"{key}: {text[:80]}{'…' if len(text) > 80 else ''}", file=sys.stderr, flush=True)
+
+
 def cmd_draft(args) -> int:
-    pipeline = ArtPipeline()
-    path = pipeline.build_draft(title=args.title, author=args.author, year=args.year)
+    pipeline = ArtPipeline(
+        fresh_generations=args.fresh_llm,
+        stream_generation=args.stream,
+        on_field=_print_field if args.stream else None,
+    )
+    path = pipeline.build_draft(
+        title=args.title, author=args.author, year=args.year, force_stages=args.force_stage
+    )
 
     print(path)
     return 0
 
+def cmd_draft_batch(args: argparse.Namespace) -> int:
+    from daily_art.pipeline.batch import Checkpoint, load_items, run_batch
+
+    pipeline = ArtPipeline(fresh_generations=args.fresh_llm)
+    configure_logging(pipeline.s.log_level)
+    items_path = Path(args.items)
+    items = load_items(items_path)
+
+    cp_path = Path(args.checkpoint) if args.checkpoint else (
+        pipeline.s.data_dir / "batches" / f"{items_path.stem}.checkpoint.jsonl"
+    )
+    counts = run_batch(
+        pipeline,
+        items,
+        Checkpoint(cp_path),
+        workers=args.workers,
+        retries=args.retries,
+        backoff=args.backoff,
+    )
+    print(f"done={counts['done']} failed={counts['failed']} checkpoint={cp_path}")
+    return 0 if counts["failed"] == 0 else 1
+
 def cmd_kb_index(args: argparse.Namespace) -> int:
     s = load_settings()
     configure_logging(s.log_level)
@@ -103,37 +277,219 @@ def cmd_kb_index(args: argparse.Namespace) -> int:
     raw = load_json(docs_path)
     docs = [Document(**d) for d in raw]
 
-    kb = KnowledgeBase(openai_api_key=s.openai_api_key)
+    from daily_art.rag.kb import KnowledgeBase
+    kb = KnowledgeBase(openai_api_key=s.openai_api_key, cache=FileCache(s.data_dir / "cache"))
     n_chunks = kb.upsert_documents(docs)
     log.info("Indexed %d docs into %d chunks", len(docs), n_chunks)
     return 0
 
+def cmd_eval_sweep(args: argparse.Namespace) -> int:
+    from dataclasses import asdict
+
+    from daily_art.eval.sweep import SweepGrid, format_leaderboard, rows_to_json, run_sweep
+    from daily_art.rag.vectordb import QdrantConfig
+
+    s = load_settings()
+    configure_logging(s.log_level)
+    validate_settings(s, require_telegram=False, require_serper=False)
+
+    docs = [Document(**d) for d in load_json(Path(args.docs))]
+    gold = load_json(Path(args.gold))
+    grid = SweepGrid(max_chars=args.max_chars, min_chars=args.min_chars, top_k=args.top_k)
+    qdrant = QdrantConfig(location=":memory:") if args.backend == "memory" else QdrantConfig()
+
+    rows = run_sweep(
+        docs, gold, grid,
+        openai_api_key=s.openai_api_key,
+        cache=FileCache(s.data_dir / "cache"),
+        qdrant=qdrant,
+        workers=args.workers,
+    )
+    print(format_leaderboard(rows))
+    if args.report:
+        save_json(Path(args.report), {"grid": asdict(grid), "rows": rows_to_json(rows)})
+        print(f"Report: {args.report}")
+    return 0
+
+
+def cmd_batch_run(args: argparse.Namespace) -> int:
+    """
+    Prepare a provider batch job (drafts or embeddings), submit it and, unless --no-wait,
+    poll until done and map the results back.
+    """
+    from daily_art.connectors.batch_providers import wait_for
+    from daily_art.pipeline import batch_jobs
+
+    s = load_settings()
+    configure_logging(s.log_level)
+    validate_settings(s, require_telegram=False, require_serper=False)
+
+    input_path = Path(args.input)
+    job_dir = s.data_dir / "batch_jobs" / (args.name or input_path.stem)
+    job_dir.mkdir(parents=True, exist_ok=True)
+    pipeline = None
+
+    if args.kind == "drafts":
+        from daily_art.pipeline.batch import load_items
+
+        pipeline = ArtPipeline()
+        items = load_items(input_path)
+        pipeline.prefetch(items)
+        n = batch_jobs.prepare_draft_job(pipeline, items, job_dir)
+    else:
+        from daily_art.rag.kb import KnowledgeBaseConfig
+
+        kb_cfg = KnowledgeBaseConfig()
+        docs = [Document(**d) for d in load_json(input_path)]
+        n = batch_jobs.prepare_embedding_job(
+            docs, job_dir, FileCache(s.data_dir / "cache"), kb_cfg.embeddings.model, kb_cfg.chunking
+        )
+    if n == 0:
+        print(f"nothing to submit job_dir={job_dir}")
+        return 0
+
+    provider = batch_jobs.make_provider(args.provider, s)
+    job_id = batch_jobs.submit_job(job_dir, provider)
+    print(f"submitted job_id={job_id} requests={n} job_dir={job_dir}")
+    if args.no_wait:
+        return 0
+
+    status = wait_for(provider, job_id, poll_interval=args.poll_interval)
+    if status != "completed":
+        log.error("Batch %s ended with status %s", job_id, status)
+        return 1
+    applied = batch_jobs.collect_job(job_dir, provider, pipeline=pipeline, cache=FileCache(s.data_dir / "cache"))
+    print(f"collected {applied} results")
+    return 0
+
+
+def cmd_batch_collect(args: argparse.Namespace) -> int:
+    from daily_art.pipeline import batch_jobs
+
+    s = load_settings()
+    configure_logging(s.log_level)
+
+    job_dir = s.data_dir / "batch_jobs" / args.name
+    manifest = load_json(job_dir / "manifest.json")
+    provider = batch_jobs.make_provider(manifest["provider"], s)
+    status = provider.status(manifest["job_id"])
+    if status != "completed":
+        print(f"job_id={manifest['job_id']} status={status}")
+        return 1 if status in ("failed", "expired", "cancelled") else 0
+
+    pipeline = ArtPipeline() if manifest["kind"] == "drafts" else None
+    applied = batch_jobs.collect_job(job_dir, provider, pipeline=pipeline, cache=FileCache(s.data_dir / "cache"))
+    print(f"collected {applied} results")
+    return 0
+
+
+def cmd_refine(args: argparse.Namespace) -> int:
+    pipeline = ArtPipeline()
+    configure_logging(pipeline.s.log_level)
+    path = pipeline.refine(Path(args.draft_json), args.comment)
+    print(path)
+    return 0
+
+
+def _schedule_queue(s) -> "ScheduleQueue":
+    from daily_art.pipeline.scheduler import ScheduleQueue
+
+    return ScheduleQueue(s.data_dir / "schedule" / "queue.json")
+
+
+def cmd_schedule_add(args: argparse.Namespace) -> int:
+    from daily_art.pipeline.scheduler import ScheduledPost, parse_send_at
+
+    s = load_settings()
+    try:
+        parse_send_at(args.at)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    post = ScheduledPost(title=args.title, author=args.author, year=args.year, send_at=args.at)
+    _schedule_queue(s).add(post)
+    print(f"scheduled id={post.id} send_at={post.send_at}")
+    return 0
+
+
+def cmd_schedule_list(args: argparse.Namespace) -> int:
+    s = load_settings()
+    for p in _schedule_queue(s).all():
+        extra = f" error={p.error}" if p.error else ""
+        print(f"{p.id}  {p.send_at}  {p.status:<9}  {p.title} | {p.author} | {p.year}{extra}")
+    return 0
+
+
+def cmd_schedule_resolve(args: argparse.Namespace) -> int:
+    s = load_settings()
+    try:
+        post = _schedule_queue(s).resolve(args.id, sent=args.sent, message_id=args.message_id)
+    except KeyError:
+        print(f"No scheduled post with id {args.id}", file=sys.stderr)
+        return 1
+    print(f"{post.id}  {post.status}")
+    return 0
+
+
+def cmd_schedule_run(args: argparse.Namespace) -> int:
+    from datetime import timedelta
+    from daily_art.pipeline.scheduler import Scheduler
+
+    pipeline = ArtPipeline()
+    configure_logging(pipeline.s.log_level)
+    validate_settings(pipeline.s, require_telegram=True, require_serper=False)
+    scheduler = Scheduler(
+        pipeline,
+        _schedule_queue(pipeline.s),
+        lead=timedelta(hours=args.lead_hours),
+        poll_interval=args.poll_interval,
+    )
+    if args.once:
+        scheduler.queue.recover()
+        scheduler.tick()
+        return 0
+    scheduler.run_forever()
+    return 0
+
+
 def cmd_build_message(args) -> int:
     pipeline = ArtPipeline()
-    out_path = pipeline.build_message(Path(args.art_json))
+    out_path = pipeline.build_message(Path(args.art_json), force_stages=args.force_stage)
     print(out_path)
     return 0
 
 
 def cmd_send(args) -> int:
+    from daily_art.connectors.telegram_queue import message_ids
+
     pipeline = ArtPipeline()
-    resp = pipeline.send(Path(args.message_json))
-    # Print minimal output
-    msg_id = resp.get("result", {}).get("message_id")
-    print(f"sent message_id={msg_id}")
-    return 0
+    if not args.chat:
+        resp = pipeline.send(Path(args.message_json))
+        # Print minimal output
+        print(f"sent message_id={','.join(map(str, message_ids(resp)))}")
+        return 0
+
+    results = pipeline.fan_out(Path(args.message_json), args.chat)
+    failed = 0
+    for chat_id, res in results.items():
+        if isinstance(res, BaseException):
+            failed += 1
+            print(f"{chat_id}: FAILED {res}")
+        else:
+            print(f"{chat_id}: sent message_id={','.join(map(str, message_ids(res)))}")
+    return 1 if failed else 0
 
 
 def cmd_post(args) -> int:
     """
     Convenience: draft -> build-message -> send
     """
-    pipeline = ArtPipeline()
-    art_path = pipeline.draft(args.title, args.author, args.year)
-    msg_path = pipeline.build_message(art_path)
+    pipeline = ArtPipeline(fresh_generations=args.fresh_llm)
+    art_path = pipeline.build_draft(args.title, args.author, args.year, force_stages=args.force_stage)
+    msg_path = pipeline.build_message(art_path, force_stages=args.force_stage)
     resp = pipeline.send(msg_path)
-    msg_id = resp.get("result", {}).get("message_id")
-    print(f"posted message_id={msg_id}")
+    from daily_art.connectors.telegram_queue import message_ids
+    print(f"posted message_id={','.join(map(str, message_ids(resp)))}")
     return 0
 
 def cmd_kb_search(args: argparse.Namespace) -> int:
@@ -141,6 +497,7 @@ def cmd_kb_search(args: argparse.Namespace) -> int:
     configure_logging(s.log_level)
     validate_settings(s, require_telegram=False, require_serper=False)
 
+    from daily_art.rag.kb import KnowledgeBase
     kb = KnowledgeBase(openai_api_key=s.openai_api_key)
     ev = kb.search(args.query, top_k=args.top_k)
 
@@ -149,10 +506,57 @@ def cmd_kb_search(args: argparse.Namespace) -> int:
         print(e.text)
     return 0
 
+def cmd_trace_summary(args: argparse.Namespace) -> int:
+    spans = tracing.load_spans(Path(f) for f in args.files)
+    if not spans:
+        print("No spans found.")
+        return 1
+    traces = tracing.group_traces(spans)
+    if not args.no_waterfall:
+        trace_id = args.trace_id or list(traces)[-1]
+        if trace_id not in traces:
+            print(f"No trace {trace_id}")
+            return 1
+        print(f"Trace {trace_id} ({len(traces[trace_id])} spans)\n")
+        print(tracing.waterfall(traces[trace_id]))
+        print()
+    print(f"{len(traces)} trace(s), {len(spans)} span(s); durations in ms\n")
+    print(tracing.format_aggregate(tracing.aggregate(spans)))
+    return 0
+
+
+def cmd_usage_report(args: argparse.Namespace) -> int:
+    from daily_art.core.usage import aggregate, format_report, usage_ledger
+
+    ledger = usage_ledger()
+    records = [r for r in ledger.read() if r.ts[:10] >= args.since]
+    if not records:
+        print(f"No usage recorded in {ledger.path}")
+        return 0
+    print(format_report(aggregate(records, by=args.by), args.by))
+    if ledger.daily_budget:
+        print(f"\nToday: {ledger.tokens_today()} of {ledger.daily_budget} budgeted tokens"
+              + (f" (fallback model: {ledger.fallback_model})" if ledger.fallback_model else ""))
+    return 0
+
+
 def main() -> int:
+    from daily_art.core.usage import usage_context
+
     parser = build_parser()
     args = parser.parse_args()
-    return args.func(args)
+    if getattr(args, "metrics_port", 0):
+        from daily_art.core.metrics import serve_metrics
+        serve_metrics(args.metrics_port)
+    with usage_context(command=args.cmd):
+        if not getattr(args, "trace", ""):
+            return args.func(args)
+        tracing.enable(Path(args.trace))
+        try:
+            with tracing.span(f"cli.{args.cmd}"):
+                return args.func(args)
+        finally:
+            tracing.disable()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Protocol
+
+from daily_art.core.resilience import guard
+
+log = logging.getLogger("daily_art.batch_providers")
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+EMBEDDINGS_ENDPOINT = "/v1/embeddings"
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def request_line(custom_id: str, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One line of a batch job file (OpenAI Batch API input format).
+    """
+    return {"custom_id": custom_id, "method": "POST", "url": endpoint, "body": body}
+
+
+def parse_output(lines: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Batch output JSONL -> {custom_id: response body}; failed requests are logged and skipped.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        resp = row.get("response") or {}
+        if row.get("error") or resp.get("status_code") != 200:
+            log.warning("Batch request %s failed: %s", row.get("custom_id"), row.get("error") or resp)
+            continue
+        out[row["custom_id"]] = resp.get("body") or {}
+    return out
+
+
+class BatchProvider(Protocol):
+    name: str
+
+    def submit(self, job_file: Path, endpoint: str) -> str: ...
+
+    def status(self, job_id: str) -> str: ...
+
+    def results(self, job_id: str) -> Dict[str, Dict[str, Any]]: ...
+
+
+class OpenAIBatchProvider:
+    """
+    OpenAI Batch API: upload the job file, create a batch, download the output file.
+    """
+    name = "openai"
+
+    def __init__(self, api_key: str):
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=api_key)
+
+    def submit(self, job_file: Path, endpoint: str) -> str:
+        with guard("openai").call():
+            with job_file.open("rb") as f:
+                uploaded = self.client.files.create(file=f, purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint=endpoint,
+                completion_window="24h",
+            )
+        return batch.id
+
+    def status(self, job_id: str) -> str:
+        with guard("openai").call():
+            return self.client.batches.retrieve(job_id).status
+
+    def results(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        with guard("openai").call():
+            batch = self.client.batches.retrieve(job_id)
+            if not batch.output_file_id:
+                return {}
+            text = self.client.files.content(batch.output_file_id).text
+        return parse_output(text.splitlines())
+
+
+def _echo_meta_responder(body: Dict[str, Any]) -> str:
+    """
+    Default offline chat response: a schema-shaped JSON object built from the prompt's META.
+    """
+    user = next((m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+    m = re.search(r"META:\n(\{.*?\})\n", user)
+    meta = json.loads(m.group(1)) if m else {}
+    return json.dumps({
+        "title": meta.get("title", ""),
+        "year": meta.get("year", ""),
+        "artist": meta.get("author", ""),
+        "intro": f"Offline draft for {meta.get('title', 'this artwork')}.",
+    })
+
+
+class LocalBatchProvider:
+    """
+    Offline stand-in with the same contract as OpenAIBatchProvider.
+    Jobs complete on submit: embeddings are deterministic hash vectors, chat answers come
+    from `chat_responder(body) -> str` (defaults to echoing META as JSON).
+    """
+    name = "local"
+
+    def __init__(
+        self,
+        root: Path,
+        chat_responder: Optional[Callable[[Dict[str, Any]], str]] = None,
+        embedding_dim: int = 1536,
+    ):
+        self.root = root
+        self.chat_responder = chat_responder or _echo_meta_responder
+        self.embedding_dim = embedding_dim
+
+    def _respond(self, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        if endpoint == EMBEDDINGS_ENDPOINT:
+            from daily_art.rag.embeddings import deterministic_embedding
+
+            inputs = body.get("input") or []
+            data = [
+                {"object": "embedding", "index": i, "embedding": deterministic_embedding(t, self.embedding_dim)}
+                for i, t in enumerate(inputs)
+            ]
+            tokens = sum(len(t) // 4 for t in inputs)
+            return {"object": "list", "data": data, "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+        content = self.chat_responder(body)
+        return {
+            "object": "chat.completion",
+            "model": body.get("model", ""),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+        }
+
+    def submit(self, job_file: Path, endpoint: str) -> str:
+        job_id = f"local_batch_{uuid.uuid4().hex[:12]}"
+        self.root.mkdir(parents=True, exist_ok=True)
+        out_lines = []
+        with job_file.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                req = json.loads(line)
+                body = self._respond(req["url"], req["body"])
+                out_lines.append(json.dumps({
+                    "custom_id": req["custom_id"],
+                    "response": {"status_code": 200, "body": body},
+                    "error": None,
+                }, ensure_ascii=False))
+        (self.root / f"{job_id}.output.jsonl").write_text("\n".join(out_lines) + "\n", encoding="utf-8")
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        return "completed" if (self.root / f"{job_id}.output.jsonl").exists() else "failed"
+
+    def results(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        p = self.root / f"{job_id}.output.jsonl"
+        return parse_output(p.read_text(encoding="utf-8").splitlines())
+
+
+def wait_for(provider: BatchProvider, job_id: str, poll_interval: float = 60.0, timeout: float = 86400.0) -> str:
+    """
+    Poll until the job reaches a terminal status (or timeout); returns the last status.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        status = provider.status(job_id)
+        if status in TERMINAL_STATUSES or time.monotonic() >= deadline:
+            return status
+        log.info("Batch %s: %s; next poll in %.0fs", job_id, status, poll_interval)
+        time.sleep(poll_interval)
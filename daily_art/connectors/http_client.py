@@ -5,11 +5,13 @@ from urllib3.util.retry import Retry
 
 def create_session() -> requests.Session:
     sess = requests.Session()
+    # POSTs are not retried here: pacing and fail-fast live in core/resilience.py,
+    # and blind POST retries amplify 429 storms (and can double-post to Telegram).
     retry = Retry(
-        total=5,
+        total=3,
         backoff_factor=0.4,
         status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=("GET", "POST"),
+        allowed_methods=("GET",),
         raise_on_status=False,
         respect_retry_after_header=True,
     )
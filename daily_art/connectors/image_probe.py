@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import logging
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+
+import requests
+
+from daily_art.connectors.http_client import SESSION
+from daily_art.core.cache import FileCache
+from daily_art.core.tracing import bind, current_span, traced
+
+log = logging.getLogger("daily_art.image_probe")
+
+# Telegram's limits for photos sent by URL.
+TELEGRAM_MAX_PHOTO_BYTES = 5 * 1024 * 1024
+TELEGRAM_MAX_SIDES_SUM = 10000
+TELEGRAM_MAX_ASPECT = 20.0
+
+ACCEPTED_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+
+@dataclass(frozen=True)
+class ImageProbeConfig:
+    min_width: int = 600
+    min_height: int = 400
+    target_pixels: int = 1600 * 1200   # above this, faster beats bigger
+    max_bytes: int = TELEGRAM_MAX_PHOTO_BYTES
+    head_bytes: int = 64 * 1024        # enough for the header of nearly every JPEG
+    timeout: float = 8.0
+    max_workers: int = 8
+    verdict_ttl_hours: float = 24 * 7
+
+
+@dataclass
+class ImageVerdict:
+    url: str
+    ok: bool
+    reason: str = ""
+    content_type: str = ""
+    size: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    latency: float = 0.0               # seconds to the first header bytes
+
+
+def image_dimensions(head: bytes) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) from the first bytes of a PNG, GIF, WebP or JPEG file.
+    """
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        return struct.unpack("<HH", head[6:10])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", head[26:30])
+            return w & 0x3FFF, h & 0x3FFF
+        if chunk == b"VP8L":
+            b = head[21:25]
+            w = 1 + (((b[1] & 0x3F) << 8) | b[0])
+            h = 1 + (((b[3] & 0x0F) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+            return w, h
+        if chunk == b"VP8X":
+            w = 1 + int.from_bytes(head[24:27], "little")
+            h = 1 + int.from_bytes(head[27:30], "little")
+            return w, h
+        return None
+    if head[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(head):
+            if head[i] != 0xFF:
+                i += 1
+                continue
+            marker = head[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                i += 1 if marker == 0xFF else 2
+                continue
+            seg_len = struct.unpack(">H", head[i + 2 : i + 4])[0]
+            # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack(">HH", head[i + 5 : i + 9])
+                return w, h
+            i += 2 + seg_len
+    return None
+
+
+def _total_size(r: requests.Response) -> Optional[int]:
+    content_range = r.headers.get("Content-Range", "")  # "bytes 0-65535/1234567"
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    length = r.headers.get("Content-Length", "")
+    return int(length) if r.status_code == 200 and length.isdigit() else None
+
+
+def _transient(reason: str) -> bool:
+    if reason.startswith("unreachable:"):
+        return True
+    return reason.startswith("http_") and (reason == "http_429" or reason >= "http_500")
+
+
+class ImageProber:
+    """
+    Vets image candidates before a draft is saved: one ranged GET per URL (header bytes
+    only), checked for type, size and dimensions against Telegram's limits, run
+    concurrently. Verdicts are cached per URL in the "image_probe" namespace, except
+    transient failures (unreachable, 429, 5xx), which are probed again next time.
+    """
+    def __init__(self, cache: FileCache | None = None, cfg: ImageProbeConfig | None = None):
+        self.cache = cache
+        self.cfg = cfg or ImageProbeConfig()
+
+    def _check(self, v: ImageVerdict) -> ImageVerdict:
+        cfg = self.cfg
+        if v.content_type not in ACCEPTED_TYPES:
+            v.ok, v.reason = False, f"content_type:{v.content_type or 'unknown'}"
+        elif v.size is not None and v.size > cfg.max_bytes:
+            v.ok, v.reason = False, f"too_large:{v.size}"
+        elif v.width and v.height:
+            if v.width < cfg.min_width or v.height < cfg.min_height:
+                v.ok, v.reason = False, f"too_small:{v.width}x{v.height}"
+            elif v.width + v.height > TELEGRAM_MAX_SIDES_SUM:
+                v.ok, v.reason = False, f"too_big:{v.width}x{v.height}"
+            elif max(v.width, v.height) / max(1, min(v.width, v.height)) > TELEGRAM_MAX_ASPECT:
+                v.ok, v.reason = False, "aspect_ratio"
+            else:
+                v.ok = True
+        else:
+            v.ok, v.reason = True, "dimensions_unknown"
+        return v
+
+    @traced("image.probe")
+    def probe(self, url: str) -> ImageVerdict:
+        sp = current_span()
+        if self.cache:
+            cached = self.cache.get_json("image_probe", url, max_age=self.cfg.verdict_ttl_hours * 3600)
+            if cached is not None:
+                sp.set(cache_hit=True)
+                return ImageVerdict(**cached)
+
+        t0 = time.monotonic()
+        try:
+            with SESSION.get(
+                url,
+                headers={"Range": f"bytes=0-{self.cfg.head_bytes - 1}"},
+                timeout=self.cfg.timeout,
+                stream=True,
+            ) as r:
+                if r.status_code >= 400:
+                    v = ImageVerdict(url=url, ok=False, reason=f"http_{r.status_code}")
+                else:
+                    head = b""
+                    for block in r.iter_content(8192):
+                        head += block
+                        if len(head) >= self.cfg.head_bytes:
+                            break
+                    dims = image_dimensions(head)
+                    v = self._check(ImageVerdict(
+                        url=url,
+                        ok=False,
+                        content_type=r.headers.get("Content-Type", "").split(";")[0].strip().lower(),
+                        size=_total_size(r),
+                        width=dims[0] if dims else None,
+                        height=dims[1] if dims else None,
+                    ))
+        except requests.RequestException as e:
+            v = ImageVerdict(url=url, ok=False, reason=f"unreachable:{type(e).__name__}")
+        v.latency = round(time.monotonic() - t0, 3)
+        sp.set(cache_hit=False, ok=v.ok, reason=v.reason, size=v.size)
+
+        if self.cache and not _transient(v.reason):
+            self.cache.set_json("image_probe", url, asdict(v))
+        return v
+
+    def probe_many(self, urls: List[str]) -> List[ImageVerdict]:
+        urls = list(dict.fromkeys(u for u in urls if u))
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.cfg.max_workers, len(urls))) as ex:
+            return list(ex.map(bind(self.probe), urls))
+
+    def rank(self, verdicts: List[ImageVerdict]) -> List[ImageVerdict]:
+        """
+        Valid images only: biggest first up to target_pixels, then fastest.
+        """
+        target = self.cfg.target_pixels
+
+        def key(v: ImageVerdict):
+            pixels = (v.width or 0) * (v.height or 0)
+            return (-min(pixels, target), v.latency)
+
+        return sorted((v for v in verdicts if v.ok), key=key)
+
+    def select(self, urls: List[str]) -> List[str]:
+        """
+        Valid URLs, best first; the pipeline posts the head of the list.
+        """
+        verdicts = self.probe_many(urls)
+        ranked = self.rank(verdicts)
+        rejected = [v for v in verdicts if not v.ok]
+        if rejected:
+            log.info("Rejected %d image(s): %s", len(rejected), ", ".join(f"{v.url} ({v.reason})" for v in rejected))
+        return [v.url for v in ranked]
@@ -5,42 +5,103 @@ import logging
 from typing import Any, Dict, List, Optional
 from daily_art.core.cache import FileCache
 from daily_art.connectors.http_client import SESSION
+from daily_art.core.resilience import guard
+from daily_art.core.tracing import current_span, span, traced
 from daily_art.domain.documents import Document
 
 log = logging.getLogger("daily_art.serper")
 
+SEARCH_URL = "https://google.serper.dev/search"
+IMAGES_URL = "https://google.serper.dev/images"
+
+# Serper accepts up to 100 queries in a single batched POST.
+MAX_BATCH = 100
+
+
 def _stable_id(prefix: str, text: str) -> str:
     h = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
     return f"{prefix}_{h}"
 
 
+def _image_urls(j: Dict[str, Any]) -> List[str]:
+    urls: List[str] = []
+    for it in j.get("images", []) or []:
+        if isinstance(it, dict) and it.get("imageUrl"):
+            urls.append(it["imageUrl"])
+    # dedupe while preserving order
+    seen = set()
+    out = []
+    for u in urls:
+        if u and u not in seen:
+            out.append(u)
+            seen.add(u)
+    return out
+
+
 class SerperClient:
     def __init__(self, api_key: str, cache: FileCache | None = None):
         self.api_key = api_key.strip()
         self.cache = cache
 
-    def search_raw(self, query: str) -> Dict[str, Any]:
-        if not self.api_key:
-            return {}
-        
-        cache_key = f"serper_search::{query}"
-        if self.cache:
-            cached = self.cache.get_json("serper", cache_key)
-            if cached is not None:
-                log.info("using cache")
-                return cached
-
-        url = "https://google.serper.dev/search"
+    def _post_batch(self, url: str, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        One POST per MAX_BATCH payloads; Serper answers a JSON array in request order.
+        """
         headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
-        payload = {"q": query, "gl": "us", "hl": "en"}
-        r = SESSION.post(url, headers=headers, data=json.dumps(payload), timeout=20)
-        r.raise_for_status()
-        data = r.json()
+        out: List[Dict[str, Any]] = []
+        for i in range(0, len(payloads), MAX_BATCH):
+            batch = payloads[i : i + MAX_BATCH]
+            body: Any = batch if len(batch) > 1 else batch[0]
+            with span("serper.post", endpoint=url.rsplit("/", 1)[-1], queries=len(batch)) as sp, guard("serper").call():
+                r = SESSION.post(url, headers=headers, data=json.dumps(body), timeout=20 + 2 * len(batch))
+                sp.set(status=r.status_code, response_bytes=len(r.content))
+                r.raise_for_status()
+            data = r.json()
+            if isinstance(data, dict):
+                data = [data]
+            if len(data) != len(batch):
+                raise RuntimeError(f"Serper returned {len(data)} results for {len(batch)} queries")
+            out.extend(d if isinstance(d, dict) else {} for d in data)
+        return out
 
-        if self.cache:
-            self.cache.set_json("serper", cache_key, data)
+    def search_raw(self, query: str) -> Dict[str, Any]:
+        return self.search_many([query])[0]
 
-        return data
+    @traced("serper.search")
+    def search_many(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """
+        Batched search_raw: results come back in the order of `queries`.
+        Each query is cached under its own key; only cache misses are sent.
+        """
+        if not self.api_key:
+            return [{} for _ in queries]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        missing: Dict[str, List[int]] = {}
+
+        for i, q in enumerate(queries):
+            if self.cache:
+                cached = self.cache.get_json("serper", f"serper_search::{q}")
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            missing.setdefault(q, []).append(i)
+
+        hits = sum(r is not None for r in results)
+        current_span().set(queries=len(queries), cache_hits=hits, cache_hit=not missing)
+        if hits:
+            log.info("using cache for %d/%d queries", hits, len(queries))
+
+        if missing:
+            pending = list(missing)
+            payloads = [{"q": q, "gl": "us", "hl": "en"} for q in pending]
+            for q, data in zip(pending, self._post_batch(SEARCH_URL, payloads)):
+                if self.cache:
+                    self.cache.set_json("serper", f"serper_search::{q}", data)
+                for i in missing[q]:
+                    results[i] = data
+
+        return [r if r is not None else {} for r in results]
 
     def search_documents(self, query: str, limit: int = 5) -> List[Document]:
         """
@@ -48,7 +109,9 @@ class SerperClient:
         We store title/link/snippet as text for now.
         (Later you can add real page fetching.)
         """
-        j = self.search_raw(query)
+        return self.documents_from_raw(query, self.search_raw(query), limit=limit)
+
+    def documents_from_raw(self, query: str, j: Dict[str, Any], limit: int = 5) -> List[Document]:
         organic = j.get("organic", []) or []
         docs: List[Document] = []
 
@@ -82,31 +145,36 @@ class SerperClient:
         return docs
 
     def search_images(self, query: str, num: int = 3) -> List[str]:
-        if not self.api_key:
-            return []
-
-        cache_key = f"serper_images::{query}::num={num}"
-        if self.cache:
-            cached = self.cache.get_json("serper", cache_key)
-            if cached is not None:
-                return cached
+        return self.search_images_many([query], num=num)[0]
 
-        url = "https://google.serper.dev/images"
-        headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
-        payload = {"q": query, "gl": "us", "hl": "en", "num": num}
-        r = SESSION.post(url, headers=headers, data=json.dumps(payload), timeout=20)
-        r.raise_for_status()
-        j = r.json()
-
-        urls: List[str] = []
-        for it in j.get("images", []) or []:
-            if isinstance(it, dict) and it.get("imageUrl"):
-                urls.append(it["imageUrl"])
-        # dedupe while preserving order
-        seen = set()
-        out = []
-        for u in urls:
-            if u and u not in seen:
-                out.append(u)
-                seen.add(u)
-        return out
+    @traced("serper.images")
+    def search_images_many(self, queries: List[str], num: int = 3) -> List[List[str]]:
+        """
+        Batched search_images with per-query caching, same contract as search_many.
+        """
+        if not self.api_key:
+            return [[] for _ in queries]
+
+        results: List[Optional[List[str]]] = [None] * len(queries)
+        missing: Dict[str, List[int]] = {}
+
+        for i, q in enumerate(queries):
+            if self.cache:
+                cached = self.cache.get_json("serper", f"serper_images::{q}::num={num}")
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            missing.setdefault(q, []).append(i)
+
+        current_span().set(queries=len(queries), cache_hit=not missing)
+        if missing:
+            pending = list(missing)
+            payloads = [{"q": q, "gl": "us", "hl": "en", "num": num} for q in pending]
+            for q, data in zip(pending, self._post_batch(IMAGES_URL, payloads)):
+                urls = _image_urls(data)
+                if self.cache:
+                    self.cache.set_json("serper", f"serper_images::{q}::num={num}", urls)
+                for i in missing[q]:
+                    results[i] = urls
+
+        return [r if r is not None else [] for r in results]
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from daily_art.core.cache import FileCache
+from daily_art.core.fs import append_jsonl
+from daily_art.core.metrics import counter
+from daily_art.core.resilience import CircuitOpenError, TokenBucket, guard, limit_config
+from daily_art.core.tracing import current_span, span
+from daily_art.domain.documents import utc_now_iso
+from daily_art.domain.models import MessagePayload
+
+log = logging.getLogger("daily_art.telegram_queue")
+
+API_URL = "https://api.telegram.org/bot{token}/{method}"
+MAX_MEDIA_GROUP = 10
+FILE_ID_NAMESPACE = "telegram_file_ids"   # image URL -> Telegram file_id
+
+# Only requests that provably never reached Telegram are retried on transport errors;
+# a timeout or 5xx after the request went out may already have posted.
+_SAFE_TO_RETRY = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+SENDS = counter("daily_art_telegram_sends_total", "Send jobs by result (sent, skipped as already sent, failed)", ("result",))
+FLOOD_WAITS = counter("daily_art_telegram_429_total", "Telegram 429 (flood wait) responses")
+
+
+class TelegramAPIError(RuntimeError):
+    def __init__(self, method: str, status_code: int, description: str, retry_after: float = 0.0):
+        super().__init__(f"Telegram {method} failed ({status_code}): {description}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def delivery_uncertain(e: BaseException) -> bool:
+    """
+    True when a failed send may still have posted: the request went out but no clear
+    answer came back (read timeouts, dropped connections, 5xx).
+    """
+    if isinstance(e, TelegramAPIError):
+        return e.status_code >= 500
+    return isinstance(e, httpx.TransportError) and not isinstance(e, _SAFE_TO_RETRY)
+
+
+def payload_key(chat_id: str, payload: MessagePayload) -> str:
+    raw = json.dumps([chat_id, payload.model_dump()], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _sent_messages(resp: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = resp.get("result")
+    if isinstance(result, list):
+        return [m for m in result if isinstance(m, dict)]
+    return [result] if isinstance(result, dict) else []
+
+
+def photo_file_id(message: Dict[str, Any]) -> Optional[str]:
+    """
+    file_id of the largest size of a sent photo (the same file_id works in any chat).
+    """
+    sizes = message.get("photo") or []
+    return sizes[-1].get("file_id") if sizes else None
+
+
+def message_ids(resp: Dict[str, Any]) -> List[int]:
+    """
+    Message ids from a sendPhoto (single message) or sendMediaGroup (list) response.
+    """
+    return [m["message_id"] for m in _sent_messages(resp) if "message_id" in m]
+
+
+class SentLedger:
+    """
+    Append-only JSONL of delivered (chat, payload) pairs, so re-running a send is a no-op.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sent: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from an interrupted run
+                    self._sent[row["key"]] = row
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._sent.get(key)
+
+    def record(self, key: str, chat_id: str, resp: Dict[str, Any]) -> None:
+        row = {"key": key, "chat_id": chat_id, "message_ids": message_ids(resp), "at": utc_now_iso(), "response": resp}
+        with self._lock:
+            self._sent[key] = row
+            append_jsonl(self.path, [row])
+
+
+@dataclass(frozen=True)
+class SendJob:
+    chat_id: str
+    payload: MessagePayload
+
+
+class TelegramSendQueue:
+    """
+    Async fan-out of message payloads to one or more chats.
+      - global bucket (limit_config("telegram"), ~30 msg/s) + one bucket per chat
+        (limit_config("telegram_chat"), ~1 msg/s) keep us under Telegram's flood limits;
+      - 429s are retried after the server's retry_after, which also pauses that chat;
+      - posts with several photo_urls go out as one sendMediaGroup album;
+      - every delivered (chat, payload) is written to the SentLedger and skipped next time;
+      - with a file_ids cache, the file_id Telegram returns for an image URL is stored
+        and sent instead of the URL afterwards (no re-download from the source site).
+    """
+    def __init__(
+        self,
+        bot_token: str,
+        ledger: SentLedger,
+        workers: int = 8,
+        max_attempts: int = 5,
+        timeout: float = 30.0,
+        file_ids: FileCache | None = None,
+    ):
+        if not bot_token:
+            raise RuntimeError("Missing TELEGRAM_BOT_TOKEN")
+        self.bot_token = bot_token
+        self.ledger = ledger
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.timeout = timeout
+        self.file_ids = file_ids
+        self._guard = guard("telegram")
+        self._chat_cfg = limit_config("telegram_chat")
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._cooldown_until: Dict[str, float] = {}
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        b = self._chat_buckets.get(chat_id)
+        if b is None:
+            b = self._chat_buckets[chat_id] = TokenBucket(self._chat_cfg.rps, self._chat_cfg.burst)
+        return b
+
+    async def _throttle(self, chat_id: str) -> None:
+        wait = self._cooldown_until.get(chat_id, 0.0) - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        wait = max(self._chat_bucket(chat_id).reserve(), self._guard.bucket.reserve())
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def photo_urls(payload: MessagePayload) -> List[str]:
+        return (payload.photo_urls or [payload.photo_url])[:MAX_MEDIA_GROUP]
+
+    def _cached_file_id(self, url: str) -> Optional[str]:
+        if self.file_ids is None:
+            return None
+        return self.file_ids.get_json(FILE_ID_NAMESPACE, url)
+
+    def _remember_file_ids(self, urls: List[str], resp: Dict[str, Any]) -> None:
+        if self.file_ids is None:
+            return
+        for url, msg in zip(urls, _sent_messages(resp)):
+            file_id = photo_file_id(msg)
+            if file_id and self._cached_file_id(url) != file_id:
+                self.file_ids.set_json(FILE_ID_NAMESPACE, url, file_id)
+
+    def _forget_file_ids(self, urls: List[str]) -> None:
+        if self.file_ids is not None:
+            for url in urls:
+                self.file_ids.delete(FILE_ID_NAMESPACE, url)
+
+    def request_for(
+        self, chat_id: str, payload: MessagePayload, use_file_ids: bool = True
+    ) -> Tuple[str, Dict[str, Any], bool]:
+        """
+        Returns (method, form data, whether any cached file_id was used).
+        """
+        urls = self.photo_urls(payload)
+        cached = [self._cached_file_id(u) if use_file_ids else None for u in urls]
+        photos = [fid or u for fid, u in zip(cached, urls)]
+        used_cache = any(cached)
+        entities = json.dumps(payload.caption_entities, ensure_ascii=False)
+        if len(photos) == 1:
+            return "sendPhoto", {
+                "chat_id": chat_id,
+                "photo": photos[0],
+                "caption": payload.caption,
+                "caption_entities": entities,
+            }, used_cache
+        media: List[Dict[str, Any]] = [{"type": "photo", "media": u} for u in photos]
+        media[0].update({"caption": payload.caption, "caption_entities": payload.caption_entities})
+        return "sendMediaGroup", {"chat_id": chat_id, "media": json.dumps(media, ensure_ascii=False)}, used_cache
+
+    async def _call(self, client: httpx.AsyncClient, method: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            self._guard.breaker.before_call()
+        except CircuitOpenError:
+            self._guard.observe("rejected")
+            raise
+        t0 = time.perf_counter()
+        with span(f"telegram.{method}", request_bytes=sum(len(str(v)) for v in data.values())) as sp:
+            try:
+                r = await client.post(API_URL.format(token=self.bot_token, method=method), data=data)
+            except httpx.TransportError:
+                self._guard.observe("error", time.perf_counter() - t0)
+                self._guard.breaker.record_failure()
+                raise
+            sp.set(status=r.status_code, response_bytes=len(r.content))
+        self._guard.observe("ok" if r.status_code == 200 else "error", time.perf_counter() - t0)
+        if r.status_code == 429:
+            FLOOD_WAITS.inc()
+        try:
+            body = r.json()
+        except ValueError:
+            body = {"ok": False, "description": r.text[:200]}
+        if r.status_code >= 500:
+            self._guard.breaker.record_failure()
+        else:
+            self._guard.breaker.record_success()
+        if r.status_code != 200 or not body.get("ok"):
+            params = body.get("parameters") or {}
+            raise TelegramAPIError(
+                method, r.status_code, str(body.get("description", "")), float(params.get("retry_after") or 0)
+            )
+        return body
+
+    async def send(self, client: httpx.AsyncClient, job: SendJob) -> Dict[str, Any]:
+        with span("telegram.send", chat_id=job.chat_id):
+            try:
+                resp = await self._send(client, job)
+            except Exception:
+                SENDS.labels("failed").inc()
+                raise
+        return resp
+
+    async def _send(self, client: httpx.AsyncClient, job: SendJob) -> Dict[str, Any]:
+        key = payload_key(job.chat_id, job.payload)
+        done = self.ledger.get(key)
+        current_span().set(already_sent=bool(done))
+        if done:
+            SENDS.labels("skipped").inc()
+            log.info("Already sent to %s (message_ids=%s); skipping", job.chat_id, done.get("message_ids"))
+            return done.get("response") or {}
+
+        urls = self.photo_urls(job.payload)
+        method, data, used_cache = self.request_for(job.chat_id, job.payload)
+        for attempt in range(1, self.max_attempts + 1):
+            current_span().set(attempts=attempt, photos=len(urls), cache_hit=used_cache)
+            await self._throttle(job.chat_id)
+            try:
+                resp = await self._call(client, method, data)
+            except TelegramAPIError as e:
+                if e.status_code == 400 and used_cache and attempt < self.max_attempts:
+                    # a stale/foreign file_id: drop it and fall back to the URLs
+                    log.warning("Cached file_id rejected (%s); resending by URL", e)
+                    self._forget_file_ids(urls)
+                    method, data, used_cache = self.request_for(job.chat_id, job.payload, use_file_ids=False)
+                    continue
+                if e.status_code != 429 or attempt == self.max_attempts:
+                    raise
+                self._cooldown_until[job.chat_id] = time.monotonic() + e.retry_after
+                log.warning("Flood limit for %s; retrying in %.0fs", job.chat_id, e.retry_after)
+                continue
+            except _SAFE_TO_RETRY as e:
+                if attempt == self.max_attempts:
+                    raise
+                delay = min(30.0, 2.0 ** attempt)
+                log.warning("Could not reach Telegram (%s); retrying in %.0fs", e, delay)
+                await asyncio.sleep(delay)
+                continue
+            self.ledger.record(key, job.chat_id, resp)
+            SENDS.labels("sent").inc()
+            self._remember_file_ids(urls, resp)
+            return resp
+        raise AssertionError("unreachable")
+
+    async def run(self, jobs: List[SendJob]) -> List[Dict[str, Any] | BaseException]:
+        """
+        Sends all jobs through a bounded worker pool; results are in job order
+        (the exception instead of a response for jobs that failed).
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for i, job in enumerate(jobs):
+            queue.put_nowait((i, job))
+        results: List[Any] = [None] * len(jobs)
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async def worker() -> None:
+                while True:
+                    try:
+                        i, job = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    try:
+                        results[i] = await self.send(client, job)
+                    except Exception as e:
+                        log.error("Send to %s failed: %s", job.chat_id, e)
+                        results[i] = e
+
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, len(jobs)) or 1)))
+        return results
+
+    def fan_out(self, payload: MessagePayload, chat_ids: List[str]) -> Dict[str, Dict[str, Any] | BaseException]:
+        """
+        Blocking helper: send one payload to many chats.
+        """
+        chat_ids = list(dict.fromkeys(chat_ids))
+        results = asyncio.run(self.run([SendJob(c, payload) for c in chat_ids]))
+        return dict(zip(chat_ids, results))
@@ -8,6 +8,9 @@ import requests
 
 from daily_art.domain.documents import Document
 from daily_art.core.cache import FileCache
+from daily_art.connectors.http_client import SESSION
+from daily_art.core.resilience import guard
+from daily_art.core.tracing import current_span, traced
 
 log = logging.getLogger("daily_art.wikipedia")
 
@@ -25,6 +28,7 @@ class WikipediaClient:
     def __init__(self, cache: FileCache | None = None):
         self.cache = cache
 
+    @traced("wikipedia.summary")
     def get_document(self, query: str) -> Optional[Document]:
         q = query.strip()
         if not q:
@@ -34,6 +38,7 @@ class WikipediaClient:
         if self.cache:
             cached = self.cache.get_json("wikipedia", cache_key)
             if cached is not None:
+                current_span().set(cache_hit=True)
                 log.info("using cache")
                 return Document(**cached)
 
@@ -41,7 +46,12 @@ class WikipediaClient:
         # It's still good for Phase 1. Later you can do search -> page title selection.
         url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{requests.utils.quote(q)}"
         try:
-            r = requests.get(url, timeout=15, headers={"User-Agent": "RAGArtPipeline/1.0"})
+            with guard("wikipedia").call():
+                r = SESSION.get(url, timeout=15)
+                current_span().set(cache_hit=False, status=r.status_code, response_bytes=len(r.content))
+                # only throttling/server errors count against the breaker; 404 just means "no page"
+                if r.status_code == 429 or r.status_code >= 500:
+                    r.raise_for_status()
             if r.status_code != 200:
                 return None
             j = r.json()
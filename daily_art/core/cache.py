@@ -2,10 +2,17 @@ from __future__ import annotations
 
 import hashlib
 import json
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Optional
 
+from daily_art.core.metrics import counter
+
+CACHE_LOOKUPS = counter(
+    "daily_art_cache_lookups_total", "FileCache reads by namespace and result (hit, miss, expired)", ("namespace", "result")
+)
+
 
 def sha1_text(s: str) -> str:
     return hashlib.sha1((s or "").encode("utf-8")).hexdigest()
@@ -19,10 +26,18 @@ class FileCache:
         h = sha1_text(key)
         return self.root / namespace / f"{h}{suffix}"
 
-    def get_json(self, namespace: str, key: str) -> Optional[Any]:
+    def get_json(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        max_age (seconds): treat entries older than this as missing.
+        """
         p = self._path_for_key(namespace, key)
         if not p.exists():
+            CACHE_LOOKUPS.labels(namespace, "miss").inc()
             return None
+        if max_age is not None and time.time() - p.stat().st_mtime > max_age:
+            CACHE_LOOKUPS.labels(namespace, "expired").inc()
+            return None
+        CACHE_LOOKUPS.labels(namespace, "hit").inc()
         return json.loads(p.read_text(encoding="utf-8"))
 
     def set_json(self, namespace: str, key: str, value: Any) -> Path:
@@ -32,4 +47,7 @@ class FileCache:
         return p
 
     def has(self, namespace: str, key: str) -> bool:
-        return self._path_for_key(namespace, key).exists()
\ No newline at end of file
+        return self._path_for_key(namespace, key).exists()
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._path_for_key(namespace, key).unlink(missing_ok=True)
\ No newline at end of file
@@ -2,7 +2,7 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 
 
@@ -26,6 +26,10 @@ class Settings:
 
     # Defaults
     openai_model: str = "gpt-4o-mini"
+    llm_cache_ttl_hours: float = 0.0  # 0 disables the generation cache
+    bot_admin_chat_ids: Tuple[str, ...] = ()  # chats allowed to run /draft and /send
+    daily_token_budget: int = 0       # OpenAI tokens per UTC day; 0 = unlimited
+    budget_fallback_model: str = ""   # chat model once the budget is spent; empty = refuse
 
 
 def load_settings() -> Settings:
@@ -52,4 +56,10 @@ def load_settings() -> Settings:
         telegram_bot_token=os.getenv("TELEGRAM_BOT_TOKEN", "").strip(),
         telegram_chat_id=os.getenv("TELEGRAM_CHAT_ID", "").strip(),
         openai_model=os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip() or "gpt-4o-mini",
+        llm_cache_ttl_hours=float(os.getenv("LLM_CACHE_TTL_HOURS", "0").strip() or 0),
+        bot_admin_chat_ids=tuple(
+            c.strip() for c in os.getenv("TELEGRAM_ADMIN_CHAT_IDS", "").split(",") if c.strip()
+        ),
+        daily_token_budget=int(os.getenv("DAILY_TOKEN_BUDGET", "0").strip() or 0),
+        budget_fallback_model=os.getenv("BUDGET_FALLBACK_MODEL", "").strip(),
     )
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class SchemaViolation(ValueError):
+    pass
+
+
+_WS = " \t\r\n"
+
+
+class IncrementalObjectParser:
+    """
+    Incremental parser for ONE top-level JSON object arriving in chunks (LLM stream).
+    feed() returns the (key, value) members completed by that chunk, so callers can use
+    fields before the object closes. Leading junk (e.g. a ```json fence) before the first
+    "{" is skipped. `validate(key, value)` may raise SchemaViolation; keys are also checked
+    against `allowed_keys` as soon as the key string closes.
+    Linear in input size: every character is looked at once.
+    """
+    def __init__(
+        self,
+        allowed_keys: Optional[set] = None,
+        validate: Optional[Callable[[str, Any], None]] = None,
+    ):
+        self.allowed_keys = allowed_keys
+        self.validate = validate
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+
+        self._state = "start"
+        self._buf: List[str] = []
+        self._key = ""
+        self._escape = False
+        self._depth = 0
+        self._in_str = False
+
+    def _emit(self, out: List[Tuple[str, Any]]) -> None:
+        raw = "".join(self._buf).strip()
+        self._buf = []
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise SchemaViolation(f"invalid value for '{self._key}': {raw[:40]!r}") from e
+        if self.validate:
+            self.validate(self._key, value)
+        self.fields[self._key] = value
+        out.append((self._key, value))
+        self._state = "after_value"
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        out: List[Tuple[str, Any]] = []
+        for ch in text:
+            if self.done:
+                break
+            st = self._state
+
+            if st == "start":
+                if ch == "{":
+                    self._state = "key_or_end"
+
+            elif st in ("key_or_end", "key_start"):
+                if ch in _WS:
+                    continue
+                if ch == '"':
+                    self._state = "key"
+                    self._buf = []
+                elif ch == "}" and st == "key_or_end":
+                    self.done = True
+                else:
+                    raise SchemaViolation(f"expected a key, got {ch!r}")
+
+            elif st == "key" or st == "vstring":
+                if self._escape:
+                    self._escape = False
+                    self._buf.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._buf.append(ch)
+                elif ch == '"':
+                    if st == "key":
+                        self._key = json.loads('"' + "".join(self._buf) + '"')
+                        self._buf = []
+                        if self.allowed_keys is not None and self._key not in self.allowed_keys:
+                            raise SchemaViolation(f"unexpected key '{self._key}'")
+                        self._state = "colon"
+                    else:
+                        self._buf.append(ch)
+                        self._emit(out)
+                else:
+                    self._buf.append(ch)
+
+            elif st == "colon":
+                if ch == ":":
+                    self._state = "value_start"
+                elif ch not in _WS:
+                    raise SchemaViolation(f"expected ':' after '{self._key}', got {ch!r}")
+
+            elif st == "value_start":
+                if ch in _WS:
+                    continue
+                self._buf = [ch]
+                if ch == '"':
+                    self._state = "vstring"
+                elif ch in "{[":
+                    self._state = "vnested"
+                    self._depth = 1
+                    self._in_str = False
+                else:
+                    self._state = "vscalar"
+
+            elif st == "vnested":
+                self._buf.append(ch)
+                if self._in_str:
+                    if self._escape:
+                        self._escape = False
+                    elif ch == "\\":
+                        self._escape = True
+                    elif ch == '"':
+                        self._in_str = False
+                elif ch == '"':
+                    self._in_str = True
+                elif ch in "{[":
+                    self._depth += 1
+                elif ch in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._emit(out)
+
+            elif st == "vscalar":
+                if ch in _WS or ch in ",}":
+                    self._emit(out)
+                    self._after_value(ch)
+                else:
+                    self._buf.append(ch)
+
+            elif st == "after_value":
+                self._after_value(ch)
+
+        return out
+
+    def _after_value(self, ch: str) -> None:
+        if ch in _WS:
+            return
+        if ch == ",":
+            self._state = "key_start"
+        elif ch == "}":
+            self.done = True
+        else:
+            raise SchemaViolation(f"expected ',' or '}}' after '{self._key}', got {ch!r}")
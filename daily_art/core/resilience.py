@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator
+
+from daily_art.core.metrics import counter, gauge, histogram
+
+log = logging.getLogger("daily_art.resilience")
+
+UPSTREAM_REQUESTS = counter(
+    "daily_art_upstream_requests_total",
+    "Upstream calls by service and outcome (ok, error, rejected by an open circuit)",
+    ("service", "outcome"),
+)
+UPSTREAM_SECONDS = histogram("daily_art_upstream_request_seconds", "Upstream call latency", ("service",))
+CIRCUIT_STATE = gauge("daily_art_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open", ("service",))
+_STATE_CODES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+@dataclass(frozen=True)
+class LimitConfig:
+    rps: float
+    burst: int
+    failure_threshold: int = 5     # consecutive upstream failures before the breaker opens
+    reset_timeout: float = 30.0    # seconds the breaker stays open before a trial call
+
+
+DEFAULT_LIMITS: Dict[str, LimitConfig] = {
+    "serper": LimitConfig(rps=5.0, burst=10),
+    "wikipedia": LimitConfig(rps=10.0, burst=20),
+    "telegram": LimitConfig(rps=25.0, burst=30),
+    "telegram_chat": LimitConfig(rps=1.0, burst=3),   # per chat, see TelegramSendQueue
+    "openai": LimitConfig(rps=8.0, burst=16),
+}
+
+
+def limit_config(service: str) -> LimitConfig:
+    """
+    Defaults per service, overridable via env: SERPER_RPS, SERPER_BURST,
+    SERPER_BREAKER_THRESHOLD, SERPER_BREAKER_RESET (same pattern for other services).
+    """
+    base = DEFAULT_LIMITS.get(service, LimitConfig(rps=5.0, burst=10))
+    prefix = service.upper()
+
+    def _env(name: str, default: float) -> float:
+        raw = os.getenv(f"{prefix}_{name}", "").strip()
+        return float(raw) if raw else default
+
+    return LimitConfig(
+        rps=_env("RPS", base.rps),
+        burst=int(_env("BURST", base.burst)),
+        failure_threshold=int(_env("BREAKER_THRESHOLD", base.failure_threshold)),
+        reset_timeout=_env("BREAKER_RESET", base.reset_timeout),
+    )
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() takes a token (possibly going into debt)
+    and returns how long the caller must wait, so sync and async callers can share it.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"Circuit open for {service}; retry in {retry_in:.1f}s")
+        self.service = service
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    closed -> open after N consecutive failures -> half-open (one trial call)
+    after reset_timeout -> closed on success / open again on failure.
+    """
+    def __init__(self, service: str, failure_threshold: int, reset_timeout: float):
+        self.service = service
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self.state == "open" and elapsed >= self.reset_timeout:
+                self.state = "half_open"
+                return
+            raise CircuitOpenError(self.service, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self.state = "closed"
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    log.warning("Circuit opened for %s after %d failures", self.service, self._failures)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """
+    Only 429/5xx and transport errors count against the breaker;
+    a 404 or a bad request means the upstream is healthy.
+    """
+    status = getattr(exc, "status_code", None)
+    resp = getattr(exc, "response", None)
+    if status is None and resp is not None:
+        status = getattr(resp, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    name = type(exc).__name__
+    return isinstance(exc, OSError) or "Timeout" in name or "Connection" in name
+
+
+class ServiceGuard:
+    def __init__(self, service: str, cfg: LimitConfig):
+        self.service = service
+        self.cfg = cfg
+        self.bucket = TokenBucket(cfg.rps, cfg.burst)
+        self.breaker = CircuitBreaker(service, cfg.failure_threshold, cfg.reset_timeout)
+        self._outcomes = {o: UPSTREAM_REQUESTS.labels(service, o) for o in ("ok", "error", "rejected")}
+        self._seconds = UPSTREAM_SECONDS.labels(service)
+
+    def observe(self, outcome: str, seconds: float | None = None) -> None:
+        """
+        Records one call in the upstream metrics (for callers that drive the breaker themselves).
+        """
+        self._outcomes[outcome].inc()
+        if seconds is not None:
+            self._seconds.observe(seconds)
+
+    @contextmanager
+    def call(self) -> Iterator[None]:
+        """
+        Wrap one upstream request: fail fast if the breaker is open,
+        wait for a token, then record the outcome.
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.observe("rejected")
+            raise
+        self.bucket.acquire()
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.observe("error", time.perf_counter() - t0)
+            if is_upstream_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.observe("ok", time.perf_counter() - t0)
+        self.breaker.record_success()
+
+
+_GUARDS: Dict[str, ServiceGuard] = {}
+_GUARDS_LOCK = threading.Lock()
+
+
+def guard(service: str) -> ServiceGuard:
+    """
+    Process-wide guard for a service, shared by every connector that talks to it.
+    """
+    with _GUARDS_LOCK:
+        g = _GUARDS.get(service)
+        if g is None:
+            g = ServiceGuard(service, limit_config(service))
+            _GUARDS[service] = g
+        return g
+
+
+def _circuit_states() -> Dict[tuple, float]:
+    with _GUARDS_LOCK:
+        return {(name,): _STATE_CODES.get(g.breaker.state, 0) for name, g in _GUARDS.items()}
+
+
+CIRCUIT_STATE.set_function(_circuit_states)
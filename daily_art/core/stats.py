@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Linear-interpolated percentile, q in [0, 1].
+    """
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = (len(s) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+
+def latency_summary(seconds: Iterable[float]) -> Dict[str, float]:
+    """
+    {n, mean, p50, p95, p99, max} in milliseconds.
+    """
+    ms = [v * 1000.0 for v in seconds]
+    if not ms:
+        return {"n": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "n": len(ms),
+        "mean": round(sum(ms) / len(ms), 3),
+        "p50": round(percentile(ms, 0.50), 3),
+        "p95": round(percentile(ms, 0.95), 3),
+        "p99": round(percentile(ms, 0.99), 3),
+        "max": round(max(ms), 3),
+    }
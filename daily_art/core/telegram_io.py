@@ -5,6 +5,9 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from daily_art.domain.models import ArtPost
 
+# Bump whenever caption layout or markup parsing changes (invalidates caption artifacts).
+CAPTION_VERSION = "v3"
+
 # ---- UTF-16 helpers ----
 
 def utf16_len(s: str) -> int:
@@ -15,92 +18,167 @@ def utf16_offset(s: str, idx: int) -> int:
     return len(s[:idx].encode("utf-16-le")) // 2
 
 
-# ---- Regex for inline styles ----
+# ---- Inline markup parser ----
+#
+# Single pass over the text, linear in its length:
+#   1. _pair_markup() walks the special characters once, pairing delimiters with a stack
+#      (unclosed or crossing delimiters stay literal; spans never cross a newline;
+#      `code` and link URLs are opaque).
+#   2. build_entities_from_markup() copies the text minus the paired delimiters,
+#      counting UTF-16 units as it goes, so every entity offset is known without
+#      re-encoding the output.
 
-LINK_RE   = re.compile(r"\[([^\]]+?)\]\((https?://[^\s)]+)\)")
-BOLD_RE   = re.compile(r"\*\*(.+?)\*\*")
-ITALIC_RE = re.compile(r"(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)")
-UNDER_RE  = re.compile(r"__(.+?)__")
-STRIKE_RE = re.compile(r"~~(.+?)~~")
-CODE_RE   = re.compile(r"`([^`\n]+?)`")
-SPOILER_RE= re.compile(r"\|\|(.+?)\|\|")
+_SPECIAL = re.compile(r"[*_~|`\[\]\n]")
+_LINK_URL_RE = re.compile(r"\((https?://[^\s)]+)\)")
 
+# Longest first, so "**" wins over "*".
+_DELIMITERS: Tuple[Tuple[str, str], ...] = (
+    ("**", "bold"),
+    ("__", "underline"),
+    ("~~", "strikethrough"),
+    ("||", "spoiler"),
+    ("*", "italic"),
+)
+_ENTITY_TYPE = dict(_DELIMITERS)
 
-def _strip_and_entity(
-    text: str,
-    pattern: re.Pattern,
-    entity_type: str,
-    url_group: Optional[int] = None,
-) -> Tuple[str, List[Dict[str, Any]]]:
-    entities: List[Dict[str, Any]] = []
-    cursor = 0
-    out: List[str] = []
+# (entity_type, open_pos, close_pos, url)
+_Span = Tuple[str, int, int, Optional[str]]
 
-    for m in pattern.finditer(text):
-        start, end = m.span()
-        inner_text = m.group(1) if m.lastindex and m.lastindex >= 1 else None
-        url = (
-            m.group(url_group)
-            if url_group and m.lastindex and m.lastindex >= url_group
-            else None
-        )
 
-        if inner_text is None:
+def _pair_markup(text: str) -> Tuple[Dict[int, int], List[_Span]]:
+    """
+    Returns (cuts, spans): cuts maps a delimiter's start index to its end index in `text`;
+    each span refers to its opening and closing delimiters by their start index.
+    """
+    cuts: Dict[int, int] = {}
+    spans: List[_Span] = []
+    # open frames: [delimiter, start, end, url, link_close_start, link_close_end];
+    # at most one frame per delimiter, so scans over the stack are O(1)
+    stack: List[list] = []
+    resume = 0
+    line_end = -1
+    link_probe: Tuple[int, Optional[re.Match]] = (-1, None)
+
+    for m in _SPECIAL.finditer(text):
+        p = m.start()
+        if p < resume:
+            continue
+        c = text[p]
+        if p > line_end:
+            line_end = text.find("\n", p)
+            if line_end == -1:
+                line_end = len(text)
+
+        if c == "\n":
+            stack.clear()
             continue
 
-        out.append(text[cursor:start])
-        before_out = "".join(out)
-        start_out_idx = len(before_out)
-
-        out.append(inner_text)
-
-        clean_inner = inner_text.rstrip()
-        offset = utf16_offset("".join(out), start_out_idx)
-        length_units = utf16_len(clean_inner)
+        if c == "`":
+            k = text.find("`", p + 1, line_end)
+            if k > p + 1:
+                cuts[p], cuts[k] = p + 1, k + 1
+                spans.append(("code", p, k, None))
+                resume = k + 1
+            continue
 
-        if length_units > 0:
-            ent: Dict[str, Any] = {
-                "type": entity_type,
-                "offset": offset,
-                "length": length_units,
-            }
-            if entity_type == "text_link" and url:
-                ent["url"] = url
-            entities.append(ent)
+        if c == "[":
+            if any(f[0] == "[" for f in stack):
+                continue
+            if link_probe[0] <= p:
+                j = text.find("]", p + 1, line_end)
+                if j == -1:
+                    link_probe = (line_end, None)
+                else:
+                    link_probe = (j, _LINK_URL_RE.match(text, j + 1))
+            j, url_m = link_probe
+            if url_m and j > p + 1:
+                stack.append(["[", p, p + 1, url_m.group(1), j, url_m.end()])
+            continue
 
-        cursor = end
+        if c == "]":
+            for idx in range(len(stack) - 1, -1, -1):
+                f = stack[idx]
+                if f[0] == "[" and f[4] == p:
+                    del stack[idx:]
+                    cuts[f[1]], cuts[p] = f[2], f[5]
+                    spans.append(("text_link", f[1], p, f[3]))
+                    resume = f[5]
+                    break
+            continue
 
-    out.append(text[cursor:])
-    return "".join(out), entities
+        delim = next((d for d, _ in _DELIMITERS if text.startswith(d, p)), None)
+        if delim is None:
+            continue
+        if delim == "**" and stack and stack[-1][0] == "*" and text.startswith("***", p):
+            # closing "***bold italic***": the inner "*" closes first, then "**"
+            delim = "*"
+        resume = p + len(delim)
+        for idx in range(len(stack) - 1, -1, -1):
+            f = stack[idx]
+            if f[0] == delim:
+                # closing: frames opened after it are unclosed and stay literal
+                del stack[idx:]
+                if f[2] < p:
+                    cuts[f[1]], cuts[p] = f[2], resume
+                    spans.append((_ENTITY_TYPE[delim], f[1], p, None))
+                break
+        else:
+            stack.append([delim, p, resume, None, -1, -1])
+
+    return cuts, spans
 
 
 def build_entities_from_markup(text: str) -> Tuple[str, List[Dict[str, Any]]]:
-    entities: List[Dict[str, Any]] = []
-
-    text, ents = _strip_and_entity(text, BOLD_RE, "bold")
-    entities.extend(ents)
-
-    text, ents = _strip_and_entity(text, LINK_RE, "text_link", url_group=2)
-    entities.extend(ents)
-
-    text, ents = _strip_and_entity(text, CODE_RE, "code")
-    entities.extend(ents)
-
-    text, ents = _strip_and_entity(text, ITALIC_RE, "italic")
-    entities.extend(ents)
-
-    text, ents = _strip_and_entity(text, UNDER_RE, "underline")
-    entities.extend(ents)
-
-    text, ents = _strip_and_entity(text, STRIKE_RE, "strikethrough")
-    entities.extend(ents)
+    """
+    Strips inline markup and returns (clean_text, entities) with UTF-16 offsets.
+    Nested styles are supported; trailing whitespace is left out of each entity.
+    """
+    cuts, spans = _pair_markup(text)
+    if not cuts:
+        return text, []
 
-    text, ents = _strip_and_entity(text, SPOILER_RE, "spoiler")
-    entities.extend(ents)
+    out: List[str] = []
+    units = 0          # UTF-16 length of the output so far
+    trailing_ws = 0    # whitespace at the end of the output so far (always BMP: 1 unit/char)
+    at: Dict[int, Tuple[int, int]] = {}
+    cursor = 0
 
-    entities = [e for e in entities if e["length"] > 0]
-    entities.sort(key=lambda e: e["offset"])
-    return text, entities
+    def emit(chunk: str) -> None:
+        nonlocal units, trailing_ws
+        if not chunk:
+            return
+        out.append(chunk)
+        units += utf16_len(chunk)
+        stripped = chunk.rstrip()
+        if not stripped:
+            trailing_ws += len(chunk)
+        else:
+            trailing_ws = len(chunk) - len(stripped)
+
+    for m in _SPECIAL.finditer(text):
+        p = m.start()
+        if p < cursor or p not in cuts:
+            continue
+        emit(text[cursor:p])
+        at[p] = (units, trailing_ws)
+        cursor = cuts[p]
+    emit(text[cursor:])
+
+    entities: List[Tuple[int, Dict[str, Any]]] = []
+    for etype, open_pos, close_pos, url in spans:
+        offset = at[open_pos][0]
+        end, ws = at[close_pos]
+        length = end - ws - offset
+        if length <= 0:
+            continue
+        ent: Dict[str, Any] = {"type": etype, "offset": offset, "length": length}
+        if url:
+            ent["url"] = url
+        entities.append((open_pos, ent))
+
+    # outer first; equal ranges in the order they were opened (***x*** -> bold, italic)
+    entities.sort(key=lambda pe: (pe[1]["offset"], -pe[1]["length"], pe[0]))
+    return "".join(out), [e for _, e in entities]
 
 
 def clamp_entities(text: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
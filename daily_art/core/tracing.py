@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from daily_art.core.stats import latency_summary
+
+# Nested timing spans, exported as JSONL (one finished span per line).
+# Off by default: until enable() is called span() hands out a shared no-op object,
+# so instrumented hot paths pay one global lookup. The active span lives in a
+# ContextVar, so nesting follows asyncio tasks; thread pools need bind().
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float                                   # unix time
+    duration_ms: float = 0.0
+    error: str = ""
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("daily_art_span", default=None)
+
+
+class _JsonlSink:
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, s: Span) -> None:
+        line = json.dumps(asdict(s), ensure_ascii=False, default=str)
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._f.close()
+
+
+_sink: Optional[_JsonlSink] = None
+
+
+def enable(path: Path) -> None:
+    """
+    Starts exporting spans to `path` (appended, so many runs can share one file).
+    """
+    global _sink
+    disable()
+    _sink = _JsonlSink(path)
+
+
+def disable() -> None:
+    global _sink
+    if _sink is not None:
+        _sink.close()
+        _sink = None
+
+
+def enabled() -> bool:
+    return _sink is not None
+
+
+def current_span() -> Span | _NoopSpan:
+    """
+    The innermost open span (a no-op when tracing is off), for adding attributes.
+    """
+    return _current.get() or _NOOP
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span | _NoopSpan]:
+    sink = _sink
+    if sink is None:
+        yield _NOOP
+        return
+    parent = _current.get()
+    s = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else uuid.uuid4().hex[:16],
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        start=time.time(),
+        attrs=attrs,
+    )
+    token = _current.set(s)
+    t0 = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        s.duration_ms = round((time.perf_counter() - t0) * 1000, 3)
+        _current.reset(token)
+        sink.write(s)
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator form of span().
+    """
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Runs `fn` (on another thread) in a copy of the caller's context, so its spans are
+    children of the caller's current span and other context tags carry over.
+    """
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        # one copy per call: a context can't be entered by two threads at once
+        return ctx.copy().run(fn, *args, **kwargs)
+    return run
+
+
+# ---- reading exported spans (trace-summary) ----
+
+def load_spans(paths: Iterable[Path]) -> List[Dict[str, Any]]:
+    spans: List[Dict[str, Any]] = []
+    for p in paths:
+        with Path(p).open("r", encoding="utf-8") as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def group_traces(spans: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    {trace_id: spans sorted by start}, traces ordered by their first span.
+    """
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for s in sorted(spans, key=lambda s: s["start"]):
+        traces.setdefault(s["trace_id"], []).append(s)
+    return traces
+
+
+def _attrs_text(attrs: Dict[str, Any]) -> str:
+    return " ".join(f"{k}={v}" for k, v in attrs.items() if v not in ("", None))
+
+
+def waterfall(trace: List[Dict[str, Any]], width: int = 40) -> str:
+    """
+    One line per span: offset and duration in ms, the span tree, and a bar on a
+    shared time axis.
+    """
+    if not trace:
+        return ""
+    t0 = min(s["start"] for s in trace)
+    end = max(s["start"] + s["duration_ms"] / 1000 for s in trace)
+    total = max(end - t0, 1e-9)
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s["span_id"] for s in trace}
+    for s in trace:
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    lines: List[str] = []
+
+    def walk(parent: Optional[str], depth: int) -> None:
+        for s in children.get(parent, []):
+            a = int((s["start"] - t0) / total * width)
+            b = max(a + 1, int((s["start"] - t0 + s["duration_ms"] / 1000) / total * width))
+            bar = " " * a + "█" * (b - a) + " " * (width - b)
+            label = "  " * depth + s["name"] + (" !" if s.get("error") else "")
+            lines.append(
+                f"{(s['start'] - t0) * 1000:>9.1f} {s['duration_ms']:>9.1f}  |{bar}|  {label}"
+                f"  {_attrs_text(s.get('attrs') or {})}".rstrip()
+            )
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    head = f"{'start ms':>9} {'dur ms':>9}  |{'':{width}}|  span"
+    return "\n".join([head] + lines)
+
+
+def aggregate(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Per span name across all runs: latency percentiles (ms), errors and cache hit rate
+    (over spans that recorded cache_hit).
+    """
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for s in spans:
+        by_name.setdefault(s["name"], []).append(s)
+    out: Dict[str, Dict[str, float]] = {}
+    for name, group in by_name.items():
+        hits = [bool(s["attrs"]["cache_hit"]) for s in group if "cache_hit" in (s.get("attrs") or {})]
+        out[name] = {
+            **latency_summary(s["duration_ms"] / 1000 for s in group),
+            "total_ms": round(sum(s["duration_ms"] for s in group), 3),
+            "errors": sum(1 for s in group if s.get("error")),
+            "cache_hit_rate": round(sum(hits) / len(hits), 3) if hits else -1.0,
+        }
+    return dict(sorted(out.items(), key=lambda kv: -kv[1]["total_ms"]))
+
+
+def format_aggregate(agg: Dict[str, Dict[str, float]]) -> str:
+    head = f"{'span':<28} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'total':>10} {'err':>4} {'cache':>6}"
+    lines = [head, "-" * len(head)]
+    for name, a in agg.items():
+        cache = f"{a['cache_hit_rate']:.0%}" if a["cache_hit_rate"] >= 0 else "-"
+        lines.append(
+            f"{name[:28]:<28} {a['n']:>6} {a['p50']:>9.1f} {a['p95']:>9.1f} {a['p99']:>9.1f}"
+            f" {a['max']:>9.1f} {a['total_ms']:>10.1f} {a['errors']:>4} {cache:>6}"
+        )
+    return "\n".join(lines)
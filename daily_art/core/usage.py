@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from daily_art.core.metrics import counter
+from daily_art.domain.documents import utc_now_iso
+
+log = logging.getLogger("daily_art.usage")
+
+OPENAI_TOKENS = counter("daily_art_openai_tokens_total", "OpenAI tokens billed", ("kind", "model", "direction"))
+OPENAI_CACHE = counter("daily_art_openai_cache_hits_total", "OpenAI calls answered from a cache", ("kind",))
+
+# Append-only JSONL of every OpenAI call (and every call a cache saved us), tagged with
+# the CLI command / bot job and the artwork it was made for. The same file backs the
+# daily token budget: DAILY_TOKEN_BUDGET tokens per UTC day, 0 = unlimited. Once spent,
+# chat calls move to BUDGET_FALLBACK_MODEL if one is set, otherwise all calls are refused.
+
+# USD per 1M tokens (input, output). Approximate list prices; unknown models cost 0.
+PRICES: Dict[str, tuple] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class UsageRecord:
+    kind: str                      # "chat" | "embedding"
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0
+    cache_hit: bool = False
+    saved_tokens: int = 0          # estimated tokens a cache hit avoided
+    estimated: bool = False        # the API reported no usage; tokens were counted locally
+    command: str = ""
+    artwork: str = ""
+    ts: str = field(default_factory=utc_now_iso)
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+_context: ContextVar[Dict[str, str]] = ContextVar("daily_art_usage", default={})
+
+
+@contextmanager
+def usage_context(**tags: str) -> Iterator[None]:
+    """
+    Tags (command=..., artwork=...) recorded on every call made inside the block.
+    """
+    token = _context.set({**_context.get(), **{k: v for k, v in tags.items() if v}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def _parse_line(line: str | bytes) -> Optional[Dict[str, Any]]:
+    """
+    One ledger row; None for blank lines and lines a killed writer left torn.
+    """
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        log.warning("Skipping unreadable usage ledger line: %r", line[:80])
+        return None
+
+
+class UsageLedger:
+    """
+    JSONL ledger plus running token totals per UTC day. The totals are kept up to date
+    by reading only what was appended since the last look (by this or another process).
+    """
+    def __init__(self, path: Path, daily_budget: int = 0, fallback_model: str = ""):
+        self.path = path
+        self.daily_budget = daily_budget
+        self.fallback_model = fallback_model
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._tokens_by_day: Dict[str, int] = {}
+
+    def read(self) -> List[UsageRecord]:
+        if not self.path.exists():
+            return []
+        records: List[UsageRecord] = []
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                row = _parse_line(line)
+                if row is not None:
+                    records.append(UsageRecord(**row))
+        return records
+
+    def _file_size(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _sync(self) -> None:
+        """
+        Adds the complete lines appended since the last call to the per-day totals
+        (starts over if the file was truncated or replaced by a smaller one).
+        """
+        size = self._file_size()
+        if size < self._offset:
+            self._offset, self._tokens_by_day = 0, {}
+        if size == self._offset:
+            return
+        with self.path.open("rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        end = data.rfind(b"\n") + 1          # a half-written last line waits for the next sync
+        for line in data[:end].splitlines():
+            row = _parse_line(line)
+            if row is not None:
+                day = row["ts"][:10]
+                tokens = int(row.get("prompt_tokens") or 0) + int(row.get("completion_tokens") or 0)
+                self._tokens_by_day[day] = self._tokens_by_day.get(day, 0) + tokens
+        self._offset += end
+
+    def tokens_today(self) -> int:
+        with self._lock:
+            self._sync()
+            return self._tokens_by_day.get(utc_now_iso()[:10], 0)
+
+    def record(self, rec: UsageRecord) -> None:
+        ctx = _context.get()
+        rec.command = rec.command or ctx.get("command", "")
+        rec.artwork = rec.artwork or ctx.get("artwork", "")
+        line = json.dumps(asdict(rec), ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+            # picks up our line and anything other processes appended before it
+            self._sync()
+        if rec.cache_hit:
+            OPENAI_CACHE.labels(rec.kind).inc()
+        else:
+            OPENAI_TOKENS.labels(rec.kind, rec.model, "prompt").inc(rec.prompt_tokens)
+            if rec.completion_tokens:
+                OPENAI_TOKENS.labels(rec.kind, rec.model, "completion").inc(rec.completion_tokens)
+
+    def over_budget(self) -> bool:
+        return self.daily_budget > 0 and self.tokens_today() >= self.daily_budget
+
+    def chat_model(self, model: str) -> str:
+        """
+        The model chat calls should use now: `model`, or the fallback once the budget is spent.
+        """
+        if self.fallback_model and self.over_budget():
+            return self.fallback_model
+        return model
+
+    def check(self, kind: str, model: str) -> None:
+        """
+        Raises BudgetExceeded when the day's budget is spent and this call has no cheaper
+        way to go (no fallback configured, or a chat call not already on the fallback).
+        """
+        if not self.over_budget():
+            return
+        if self.fallback_model and (kind == "embedding" or model == self.fallback_model):
+            return
+        raise BudgetExceeded(
+            f"Daily token budget spent ({self.tokens_today()}/{self.daily_budget}); refusing {kind} call to {model}"
+        )
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def usage_ledger() -> UsageLedger:
+    """
+    Process-wide ledger at <data_dir>/usage/usage.jsonl, budget from settings.
+    """
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                from daily_art.core.config import load_settings
+
+                s = load_settings()
+                _ledger = UsageLedger(
+                    s.data_dir / "usage" / "usage.jsonl",
+                    daily_budget=s.daily_token_budget,
+                    fallback_model=s.budget_fallback_model,
+                )
+    return _ledger
+
+
+def set_usage_ledger(ledger: UsageLedger) -> None:
+    global _ledger
+    _ledger = ledger
+
+
+def aggregate(records: List[UsageRecord], by: str = "day") -> Dict[str, Dict[str, Any]]:
+    """
+    Totals per day / command / artwork / model: calls, cache hits, tokens, saved tokens, cost.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    for r in records:
+        key = r.ts[:10] if by == "day" else (getattr(r, by) or "-")
+        a = out.setdefault(key, {
+            "calls": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "embedding_tokens": 0, "saved_tokens": 0, "cost_usd": 0.0, "latency_ms": 0.0,
+        })
+        if r.cache_hit:
+            a["cache_hits"] += 1
+            a["saved_tokens"] += r.saved_tokens
+        else:
+            a["calls"] += 1
+            a["latency_ms"] += r.latency_ms
+        if r.kind == "embedding":
+            a["embedding_tokens"] += r.prompt_tokens
+        else:
+            a["prompt_tokens"] += r.prompt_tokens
+            a["completion_tokens"] += r.completion_tokens
+        a["cost_usd"] += cost_usd(r.model, r.prompt_tokens, r.completion_tokens)
+    return dict(sorted(out.items()))
+
+
+def format_report(agg: Dict[str, Dict[str, Any]], by: str) -> str:
+    head = (
+        f"{by:<28} {'calls':>6} {'hits':>6} {'hit%':>5} {'prompt':>10} {'compl':>9}"
+        f" {'embed':>10} {'saved':>10} {'cost $':>9} {'avg ms':>8}"
+    )
+    lines = [head, "-" * len(head)]
+    total: Dict[str, float] = {}
+    for key, a in agg.items():
+        n = a["calls"] + a["cache_hits"]
+        lines.append(
+            f"{key[:28]:<28} {a['calls']:>6} {a['cache_hits']:>6} {a['cache_hits'] / n if n else 0:>5.0%}"
+            f" {a['prompt_tokens']:>10} {a['completion_tokens']:>9} {a['embedding_tokens']:>10}"
+            f" {a['saved_tokens']:>10} {a['cost_usd']:>9.4f} {a['latency_ms'] / a['calls'] if a['calls'] else 0:>8.0f}"
+        )
+        for k, v in a.items():
+            total[k] = total.get(k, 0) + v
+    if len(agg) > 1:
+        n = total["calls"] + total["cache_hits"]
+        lines.append("-" * len(head))
+        lines.append(
+            f"{'total':<28} {int(total['calls']):>6} {int(total['cache_hits']):>6} {total['cache_hits'] / n if n else 0:>5.0%}"
+            f" {int(total['prompt_tokens']):>10} {int(total['completion_tokens']):>9} {int(total['embedding_tokens']):>10}"
+            f" {int(total['saved_tokens']):>10} {total['cost_usd']:>9.4f}"
+        )
+    return "\n".join(lines)
@@ -63,7 +63,15 @@ class ArtPost(BaseModel):
     citations: List[SourceLink] = Field(default_factory=list)
 
 
+# ArtPost fields written by the LLM (everything else is filled deterministically).
+GENERATED_FIELDS = (
+    "title", "year", "art_style", "artist", "artist_info", "related_quote", "quote_author",
+    "painting_features", "intro", "context", "meaning", "conclusion", "museum", "unique_fact",
+)
+
+
 class MessagePayload(BaseModel):
     photo_url: str
+    photo_urls: List[str] = Field(default_factory=list)  # >1 -> sent as a media group
     caption: str
     caption_entities: List[Dict[str, Any]]
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List
+
+from daily_art.domain.models import GENERATED_FIELDS as REFINABLE_FIELDS
+
+# Prose fields a comment applies to when it doesn't name any field ("make it more vivid").
+NARRATIVE_FIELDS = ("painting_features", "intro", "context", "meaning", "conclusion")
+
+# Only changed through an explicit "field: ..." prefix, never picked up from free text
+# ("the quote is not by the artist" is about the quote, not the artist).
+IDENTITY_FIELDS = ("title", "artist", "year")
+
+FIELD_ALIASES: Dict[str, str] = {
+    "style": "art_style",
+    "author": "artist",
+    "painter": "artist",
+    "bio": "artist_info",
+    "biography": "artist_info",
+    "quote": "related_quote",
+    "features": "painting_features",
+    "description": "painting_features",
+    "fact": "unique_fact",
+    "spoiler": "unique_fact",
+    "ending": "conclusion",
+    "date": "year",
+}
+
+_PREFIX = re.compile(r"^\s*([A-Za-z_ ]+?)\s*[:=]\s*(.+)$")
+
+
+def _resolve(name: str) -> str | None:
+    n = name.strip().lower().replace(" ", "_")
+    if n in REFINABLE_FIELDS:
+        return n
+    return FIELD_ALIASES.get(n)
+
+
+def _subject_field(comment: str) -> str | None:
+    """
+    The comment's subject: the first field (or alias) it names, identity fields excluded.
+    """
+    for word in re.findall(r"[a-z_]+", comment.lower()):
+        field = _resolve(word)
+        if field and field not in IDENTITY_FIELDS:
+            return field
+    return None
+
+
+def _names_any_field(comment: str) -> bool:
+    return any(_resolve(w) for w in re.findall(r"[a-z_]+", comment.lower()))
+
+
+def parse_field_comments(comments: List[str]) -> Dict[str, str]:
+    """
+    Map reviewer comments to the ArtPost fields they affect.
+      "intro: make it shorter"          -> {"intro": "..."}
+      "the quote is not by the artist"  -> {"related_quote": "..."} (first field named)
+      "more vivid please"               -> every NARRATIVE_FIELDS entry
+      "the artist is wrong"             -> {} (identity fields need "artist: ...")
+    Comments hitting the same field are joined.
+    """
+    out: Dict[str, List[str]] = {}
+    for raw in comments:
+        for line in (raw or "").splitlines():
+            line = line.strip().lstrip("-*• ").strip()
+            if not line:
+                continue
+            m = _PREFIX.match(line)
+            field = _resolve(m.group(1)) if m else None
+            if field:
+                targets, text = [field], m.group(2).strip()
+            else:
+                subject = _subject_field(line)
+                if subject:
+                    targets = [subject]
+                elif _names_any_field(line):
+                    continue  # only identity fields named: needs an explicit prefix
+                else:
+                    targets = list(NARRATIVE_FIELDS)
+                text = line
+            for f in targets:
+                out.setdefault(f, []).append(text)
+    return {f: " ".join(v) for f, v in out.items()}
@@ -2,21 +2,40 @@ from __future__ import annotations
 
 import argparse
 import json
-from dataclasses import dataclass
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, is_dataclass
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+from daily_art.core.cache import FileCache
 from daily_art.core.config import load_settings
 from daily_art.core.logging import configure_logging
+from daily_art.core.stats import latency_summary
 from daily_art.core.validate import validate_settings
-from daily_art.rag.kb import KnowledgeBase
+from daily_art.domain.documents import utc_now_iso
 
 
 @dataclass
 class Metrics:
     n: int
-    recall_at_k: float
+    recall_at_k: float      # share of queries with a relevant chunk in the top k
     mrr: float
+    ndcg_at_k: float = 0.0  # document level: repeated chunks of one URL count once
+    precision_at_k: float = 0.0
+    hit_at_1: float = 0.0
+
+
+@dataclass
+class EvalReport:
+    top_k: int
+    metrics: Metrics
+    latency_ms: Dict[str, Dict[str, float]]   # embed_batch / embed_per_query / search / total
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    config: Dict[str, Any] = field(default_factory=dict)
+    created_at: str = field(default_factory=utc_now_iso)
+    wall_s: float = 0.0
 
 
 def _normalize_url(u: str) -> str:
@@ -31,63 +50,163 @@ def _first_relevant_rank(retrieved_urls: List[str], expected_urls: List[str]) ->
     return None
 
 
-def evaluate(gold: List[Dict[str, Any]], top_k: int) -> Metrics:
-    s = load_settings()
-    configure_logging(s.log_level)
-    validate_settings(s, require_telegram=False, require_serper=False)
-
-    kb = KnowledgeBase(openai_api_key=s.openai_api_key)
-
-    hits = 0
-    rr_sum = 0.0
-
-    for item in gold:
-        q = item["query"]
-        expected_urls = item.get("expected_urls", [])
-        evidence = kb.search(q, top_k=top_k)
-
-        retrieved_urls = []
-        for e in evidence:
-            if e.source_url:
-                retrieved_urls.append(e.source_url)
-
-        rank = _first_relevant_rank(retrieved_urls, expected_urls)
-
-        print("\n---")
-        print("ID:", item.get("id"))
-        print("Q:", q)
-        print("Expected:", expected_urls)
-        print("Retrieved URLs:")
-        for i, u in enumerate(retrieved_urls, 1):
-            print(f"  {i}. {u}")
-        print("First relevant rank:", rank)
-        if rank is not None:
-            hits += 1
-            rr_sum += 1.0 / rank
-
-    n = len(gold) if gold else 1
-    return Metrics(
-        n=len(gold),
-        recall_at_k=hits / n,
-        mrr=rr_sum / n,
+def _ndcg(retrieved_urls: List[str], expected_urls: List[str], k: int) -> float:
+    expected = {_normalize_url(u) for u in expected_urls if u}
+    if not expected:
+        return 0.0
+    ranked: List[str] = []
+    for u in retrieved_urls[:k]:
+        n = _normalize_url(u)
+        if n not in ranked:
+            ranked.append(n)
+    dcg = sum(1.0 / math.log2(i + 2) for i, u in enumerate(ranked) if u in expected)
+    idcg = sum(1.0 / math.log2(i + 2) for i in range(min(k, len(expected))))
+    return dcg / idcg
+
+
+def score_item(retrieved_urls: List[str], expected_urls: List[str], k: int) -> Dict[str, float]:
+    expected = {_normalize_url(u) for u in expected_urls if u}
+    top = [_normalize_url(u) for u in retrieved_urls[:k]]
+    rank = _first_relevant_rank(retrieved_urls[:k], expected_urls)
+    return {
+        "rank": rank,
+        "rr": 1.0 / rank if rank else 0.0,
+        "ndcg": _ndcg(retrieved_urls, expected_urls, k),
+        "precision": sum(1 for u in top if u in expected) / k if k else 0.0,
+        "hit_at_1": 1.0 if top and top[0] in expected else 0.0,
+    }
+
+
+def embed_queries(kb, queries: List[str], batch_size: int = 256) -> tuple[List[List[float]], List[float]]:
+    """
+    Embeds queries in batches through the KB embedder (and its cache).
+    Returns (vectors, per-batch seconds).
+    """
+    vectors: List[List[float]] = []
+    timings: List[float] = []
+    for i in range(0, len(queries), batch_size):
+        t0 = time.perf_counter()
+        vectors.extend(kb.embedder.embed_texts(queries[i : i + batch_size]))
+        timings.append(time.perf_counter() - t0)
+    return vectors, timings
+
+
+def evaluate(
+    gold: List[Dict[str, Any]],
+    top_k: int,
+    kb=None,
+    workers: int = 8,
+    batch_size: int = 256,
+    verbose: bool = False,
+) -> EvalReport:
+    """
+    Batched query embedding (cached) + concurrent vector searches.
+    Pass `kb` to evaluate an already built KnowledgeBase (e.g. from eval-sweep).
+    """
+    if kb is None:
+        from daily_art.rag.kb import KnowledgeBase
+
+        s = load_settings()
+        configure_logging(s.log_level)
+        validate_settings(s, require_telegram=False, require_serper=False)
+        kb = KnowledgeBase(openai_api_key=s.openai_api_key, cache=FileCache(s.data_dir / "cache"))
+
+    started = time.perf_counter()
+    queries = [item["query"] for item in gold]
+    vectors, embed_batches = embed_queries(kb, queries, batch_size=batch_size)
+    embed_per_query = [t / len(queries[i * batch_size : (i + 1) * batch_size]) for i, t in enumerate(embed_batches)]
+
+    def run(i: int) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        evidence = kb.search_vector(vectors[i], top_k=top_k)
+        search_s = time.perf_counter() - t0
+        item = gold[i]
+        retrieved_urls = [e.source_url for e in evidence if e.source_url]
+        scores = score_item(retrieved_urls, item.get("expected_urls", []), top_k)
+        return {
+            "id": item.get("id"),
+            "query": item["query"],
+            "retrieved_urls": retrieved_urls,
+            **scores,
+            "search_s": search_s,
+            "total_s": search_s + embed_per_query[i // batch_size],
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        items = list(ex.map(run, range(len(gold))))
+
+    if verbose:
+        for it in items:
+            print("\n---")
+            print("ID:", it["id"])
+            print("Q:", it["query"])
+            print("Retrieved URLs:")
+            for i, u in enumerate(it["retrieved_urls"], 1):
+                print(f"  {i}. {u}")
+            print("First relevant rank:", it["rank"])
+
+    n = len(items) or 1
+    metrics = Metrics(
+        n=len(items),
+        recall_at_k=sum(1 for it in items if it["rank"]) / n,
+        mrr=sum(it["rr"] for it in items) / n,
+        ndcg_at_k=sum(it["ndcg"] for it in items) / n,
+        precision_at_k=sum(it["precision"] for it in items) / n,
+        hit_at_1=sum(it["hit_at_1"] for it in items) / n,
+    )
+    latency = {
+        "embed_batch": latency_summary(embed_batches),
+        "embed_per_query": latency_summary(embed_per_query),
+        "search": latency_summary(it["search_s"] for it in items),
+        "total": latency_summary(it["total_s"] for it in items),
+    }
+    return EvalReport(
+        top_k=top_k,
+        metrics=metrics,
+        latency_ms=latency,
+        items=[{k: v for k, v in it.items() if not k.endswith("_s")} for it in items],
+        config={
+            "workers": workers,
+            "batch_size": batch_size,
+            "kb": asdict(kb.cfg) if is_dataclass(getattr(kb, "cfg", None)) else {},
+        },
+        wall_s=round(time.perf_counter() - started, 3),
     )
 
 
+def print_summary(r: EvalReport) -> None:
+    m, k = r.metrics, r.top_k
+    print(f"Gold items: {m.n}  (wall {r.wall_s:.2f}s)")
+    print(f"Recall@{k}: {m.recall_at_k:.3f}")
+    print(f"MRR@{k}: {m.mrr:.3f}")
+    print(f"nDCG@{k}: {m.ndcg_at_k:.3f}")
+    print(f"P@{k}: {m.precision_at_k:.3f}")
+    print(f"Hit@1: {m.hit_at_1:.3f}")
+    for stage, lat in r.latency_ms.items():
+        print(f"{stage:>16} ms  p50={lat['p50']:.1f}  p95={lat['p95']:.1f}  p99={lat['p99']:.1f}")
+
+
 def main() -> int:
-    p = argparse.ArgumentParser(description="Evaluate retrieval quality (Recall@k, MRR).")
+    p = argparse.ArgumentParser(description="Evaluate retrieval quality (Recall@k, MRR, nDCG@k, P@k, Hit@1) and latency.")
     p.add_argument("--gold", type=str, default="daily_art/eval/gold.json")
     p.add_argument("--top-k", type=int, default=6)
+    p.add_argument("--workers", type=int, default=8, help="Concurrent searches")
+    p.add_argument("--batch-size", type=int, default=256, help="Queries per embedding request")
+    p.add_argument("--report", type=str, default="", help="Write the full JSON report here")
+    p.add_argument("--verbose", action="store_true", help="Print retrieved URLs for every query")
     args = p.parse_args()
 
     gold_path = Path(args.gold)
     gold = json.loads(gold_path.read_text(encoding="utf-8"))
 
-    m = evaluate(gold, top_k=args.top_k)
-    print(f"Gold items: {m.n}")
-    print(f"Recall@{args.top_k}: {m.recall_at_k:.3f}")
-    print(f"MRR@{args.top_k}: {m.mrr:.3f}")
+    r = evaluate(gold, top_k=args.top_k, workers=args.workers, batch_size=args.batch_size, verbose=args.verbose)
+    print_summary(r)
+    if args.report:
+        r.config["gold"] = str(gold_path)
+        Path(args.report).write_text(json.dumps(asdict(r), ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        print(f"Report: {args.report}")
     return 0
 
 
 if __name__ == "__main__":
-    raise SystemExit(main())
\ No newline at end of file
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, List, Sequence
+
+from daily_art.core.cache import FileCache
+from daily_art.domain.documents import Document
+from daily_art.eval.retrieval_eval import evaluate
+from daily_art.rag.chunking import ChunkingConfig
+from daily_art.rag.embeddings import embedding_cache_key
+from daily_art.rag.kb import KnowledgeBase, KnowledgeBaseConfig
+from daily_art.rag.vectordb import QdrantConfig
+
+log = logging.getLogger("daily_art.sweep")
+
+# Only dense retrieval exists today, so the grid covers chunking and top_k.
+# top_k doesn't change the index: each chunking variant is built once and
+# evaluated at every top_k.
+
+
+@dataclass(frozen=True)
+class SweepGrid:
+    max_chars: Sequence[int] = (900,)
+    min_chars: Sequence[int] = (200,)
+    top_k: Sequence[int] = (6,)
+
+    def chunkings(self) -> List[ChunkingConfig]:
+        return [
+            ChunkingConfig(max_chars=mx, min_chars=mn)
+            for mx, mn in itertools.product(self.max_chars, self.min_chars)
+            if mn < mx
+        ]
+
+
+@dataclass
+class SweepRow:
+    max_chars: int
+    min_chars: int
+    top_k: int
+    chunks: int
+    index_chars: int
+    embedded_new: int          # chunk embeddings that were not cached yet
+    build_s: float
+    ndcg_at_k: float
+    mrr: float
+    recall_at_k: float
+    precision_at_k: float
+    hit_at_1: float
+    search_p50_ms: float
+    search_p95_ms: float
+
+
+def variant_kb(
+    chunking: ChunkingConfig,
+    openai_api_key: str,
+    cache: FileCache,
+    qdrant: QdrantConfig,
+) -> KnowledgeBase:
+    """
+    An empty knowledge base with one chunking config in its own throwaway collection.
+    """
+    cfg = KnowledgeBaseConfig(
+        chunking=chunking,
+        qdrant=replace(qdrant, collection=f"sweep_{uuid.uuid4().hex[:10]}"),
+    )
+    return KnowledgeBase(openai_api_key=openai_api_key, cfg=cfg, cache=cache)
+
+
+def build_variant(kb: KnowledgeBase, docs: List[Document], cache: FileCache) -> Dict[str, Any]:
+    """
+    Indexes docs into kb. Chunk texts that already have a cached embedding are not re-embedded.
+    """
+    chunks = [ch for d in docs for ch in kb.chunker.chunk(d)]
+    model = kb.cfg.embeddings.model
+    new = sum(1 for text in {ch.text for ch in chunks} if not cache.has("embeddings", embedding_cache_key(model, text)))
+
+    t0 = time.perf_counter()
+    kb.upsert_documents(docs)
+    return {
+        "chunks": len(chunks),
+        "index_chars": sum(len(ch.text) for ch in chunks),
+        "embedded_new": new,
+        "build_s": round(time.perf_counter() - t0, 3),
+    }
+
+
+def run_sweep(
+    docs: List[Document],
+    gold: List[Dict[str, Any]],
+    grid: SweepGrid,
+    openai_api_key: str,
+    cache: FileCache,
+    qdrant: QdrantConfig | None = None,
+    workers: int = 8,
+) -> List[SweepRow]:
+    """
+    Builds every chunking variant, evaluates it at each top_k and returns rows sorted
+    best first (nDCG, then MRR, then search p50).
+    """
+    qdrant = qdrant or QdrantConfig(location=":memory:")
+    rows: List[SweepRow] = []
+
+    for chunking in grid.chunkings():
+        kb = variant_kb(chunking, openai_api_key, cache, qdrant)
+        try:
+            stats = build_variant(kb, docs, cache)
+            log.info(
+                "Variant max_chars=%d min_chars=%d: %d chunks (%d newly embedded) in %.1fs",
+                chunking.max_chars, chunking.min_chars, stats["chunks"], stats["embedded_new"], stats["build_s"],
+            )
+            for k in grid.top_k:
+                r = evaluate(gold, top_k=k, kb=kb, workers=workers)
+                rows.append(SweepRow(
+                    max_chars=chunking.max_chars,
+                    min_chars=chunking.min_chars,
+                    top_k=k,
+                    **stats,
+                    ndcg_at_k=r.metrics.ndcg_at_k,
+                    mrr=r.metrics.mrr,
+                    recall_at_k=r.metrics.recall_at_k,
+                    precision_at_k=r.metrics.precision_at_k,
+                    hit_at_1=r.metrics.hit_at_1,
+                    search_p50_ms=r.latency_ms["search"]["p50"],
+                    search_p95_ms=r.latency_ms["search"]["p95"],
+                ))
+        finally:
+            kb.store.drop()
+
+    rows.sort(key=lambda r: (-r.ndcg_at_k, -r.mrr, r.search_p50_ms))
+    return rows
+
+
+def format_leaderboard(rows: List[SweepRow]) -> str:
+    head = (
+        f"{'#':>2} {'max':>5} {'min':>4} {'k':>3} {'nDCG':>6} {'MRR':>6} {'R@k':>6} {'P@k':>6} {'H@1':>6}"
+        f" {'chunks':>7} {'chars':>9} {'new_emb':>7} {'p50ms':>7} {'p95ms':>7}"
+    )
+    lines = [head, "-" * len(head)]
+    for i, r in enumerate(rows, 1):
+        lines.append(
+            f"{i:>2} {r.max_chars:>5} {r.min_chars:>4} {r.top_k:>3} {r.ndcg_at_k:>6.3f} {r.mrr:>6.3f}"
+            f" {r.recall_at_k:>6.3f} {r.precision_at_k:>6.3f} {r.hit_at_1:>6.3f} {r.chunks:>7}"
+            f" {r.index_chars:>9} {r.embedded_new:>7} {r.search_p50_ms:>7.2f} {r.search_p95_ms:>7.2f}"
+        )
+    return "\n".join(lines)
+
+
+def rows_to_json(rows: List[SweepRow]) -> List[Dict[str, Any]]:
+    return [asdict(r) for r in rows]
@@ -1,26 +1,105 @@
 from __future__ import annotations
 
 import json
+import logging
 import re
-from typing import Any, Dict, List
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
 
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 
+from daily_art.core.cache import FileCache, sha1_text
 from daily_art.core.config import load_settings
+from daily_art.core.json_stream import IncrementalObjectParser, SchemaViolation
+from daily_art.core.resilience import guard
+from daily_art.core.tracing import current_span, traced
+from daily_art.core.usage import UsageRecord, usage_ledger
 from daily_art.domain.documents import Evidence
+from daily_art.domain.models import GENERATED_FIELDS
+from daily_art.rag.packing import PackResult, PackingConfig, count_tokens, pack_evidence
+
+# Bump whenever the prompt template changes; it is part of every generation cache key.
+PROMPT_VERSION = "v1"
+
+log = logging.getLogger("daily_art.llm")
+
+
+def _reported_usage(message: Any) -> tuple[int, int]:
+    """
+    (input, output) tokens from a LangChain AI message or chunk; (0, 0) if not reported.
+    """
+    meta = getattr(message, "usage_metadata", None) or {}
+    if meta:
+        return int(meta.get("input_tokens") or 0), int(meta.get("output_tokens") or 0)
+    usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+
+
+def parse_completion(raw: str) -> Dict[str, Any]:
+    """
+    The JSON object in a chat completion (tolerates prose or code fences around it).
+    """
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        m = re.search(r"\{[\s\S]*\}", raw)
+        if not m:
+            raise
+        return json.loads(m.group())
+
+
+def _present(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in data.items() if v is not None}
+
+
+def _validate_field(key: str, value: Any) -> None:
+    # null is the model saying "unknown": treated as a missing field, not a violation
+    ok = value is None or isinstance(value, str) or (key == "year" and isinstance(value, int) and not isinstance(value, bool))
+    if not ok:
+        raise SchemaViolation(f"field '{key}' must be a string, got {type(value).__name__}")
 
 
 class PostGenerator:
     """
     Evidence-grounded generator.
     The model sees ONLY: meta + evidence snippets.
+
+    With `cache` set, responses are cached by (rendered prompt, model, temperature,
+    PROMPT_VERSION) for `cache_ttl` seconds; `bypass_cache` forces fresh generations.
+
+    With `stream` set, the completion is parsed incrementally: fields are handed to
+    `on_field` as soon as they close, and a schema violation aborts the stream and
+    retries (up to `stream_retries` times) without waiting for the rest.
     """
-    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.5):
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.5,
+        cache: FileCache | None = None,
+        cache_ttl: Optional[float] = None,
+        bypass_cache: bool = False,
+        stream: bool = False,
+        stream_retries: int = 2,
+        packing: PackingConfig | None = None,
+    ):
         s = load_settings()
+        self.model = model
+        self.temperature = temperature
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.bypass_cache = bypass_cache
+        self.stream = stream
+        self.stream_retries = max(0, stream_retries)
+        self.packing = packing or PackingConfig()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._stats_lock = threading.Lock()
         # ensure OpenAI key is picked up from env; LangChain reads env var by default,
         # but this keeps it explicit in your settings flow.
-        self.llm = ChatOpenAI(model=model, temperature=temperature, api_key=s.openai_api_key)
+        # stream_usage: streamed completions report token usage in their last chunk
+        self.llm = ChatOpenAI(model=model, temperature=temperature, api_key=s.openai_api_key, stream_usage=True)
 
         self.template = ChatPromptTemplate.from_messages(
             [
@@ -42,28 +121,215 @@ class PostGenerator:
             ]
         )
 
-    def generate(self, meta: Dict[str, Any], evidence: List[Evidence]) -> Dict[str, Any]:
-        lines = []
-        for i, e in enumerate(sorted(evidence, key=lambda x: x.score, reverse=True)[:6], 1):
-            src = (e.source_title or "").strip()
-            url = (e.source_url or "").strip()
-            head = f"[{i}] {src} ({url})" if url else f"[{i}] {src}"
-            snippet = (e.text or "").strip()
-            lines.append(head)
-            lines.append(snippet)
-            lines.append("")
+        self.refine_template = ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    "You revise selected fields of an evidence-grounded art note.\n"
+                    "You MUST use ONLY the provided EVIDENCE SNIPPETS for factual claims.\n"
+                    "Apply the reviewer comments to the listed fields only; keep tone and length "
+                    "consistent with the rest of the note.\n"
+                    "Return ONLY a single JSON object with exactly these keys: {fields}.\n"
+                    "No extra keys. No markdown. No citations. No URLs.",
+                ),
+                (
+                    "human",
+                    "CURRENT NOTE:\n{post_json}\n\n"
+                    "REVIEWER COMMENTS (per field):\n{comments_text}\n\n"
+                    "EVIDENCE SNIPPETS (ranked):\n{evidence_text}\n\n"
+                    "OUTPUT: JSON object only.",
+                ),
+            ]
+        )
+
+    def _cache_key(self, messages: List[Any]) -> str:
+        prompt = "\n".join(f"{m.type}: {m.content}" for m in messages)
+        return f"{self.model}::t={self.temperature}::{PROMPT_VERSION}::{sha1_text(prompt)}"
+
+    def _record_cache(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+            total = self.cache_hits + self.cache_misses
+            log.info(
+                "LLM cache %s (hit rate %d/%d = %.0f%%)",
+                "hit" if hit else "miss", self.cache_hits, total, 100.0 * self.cache_hits / total,
+            )
+
+    @traced("llm.generate")
+    def generate(
+        self,
+        meta: Dict[str, Any],
+        evidence: List[Evidence],
+        bypass_cache: Optional[bool] = None,
+        stream: Optional[bool] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        messages = self.render(meta, evidence)
+        bypass = self.bypass_cache if bypass_cache is None else bypass_cache
+        cache_key = self._cache_key(messages) if self.cache else ""
+        sp = current_span()
+        sp.set(model=self.model, evidence=len(evidence), prompt_chars=sum(len(m.content) for m in messages))
+
+        if self.cache and not bypass:
+            cached = self.cache.get_json("llm", cache_key, max_age=self.cache_ttl)
+            if isinstance(cached, dict):
+                sp.set(cache_hit=True)
+                self._record_cache(hit=True)
+                usage_ledger().record(UsageRecord(
+                    kind="chat",
+                    model=self.model,
+                    cache_hit=True,
+                    saved_tokens=self._prompt_tokens(messages) + count_tokens(json.dumps(cached, ensure_ascii=False), self.model),
+                ))
+                if on_field:
+                    for k, v in cached.items():
+                        on_field(k, v)
+                return cached
+
+        if self.stream if stream is None else stream:
+            data = self._generate_streaming(messages, on_field)
+        else:
+            data = _present(parse_completion(self._invoke(messages)))
+        sp.set(cache_hit=False, output_fields=len(data))
+
+        if self.cache:
+            self._record_cache(hit=False)
+            self.cache.set_json("llm", cache_key, data)
+        return data
 
+    @staticmethod
+    def _evidence_head(i: int, e: Evidence) -> str:
+        src = (e.source_title or "").strip()
+        url = (e.source_url or "").strip()
+        return f"[{i}] {src} ({url})" if url else f"[{i}] {src}"
+
+    def pack(self, evidence: List[Evidence]) -> PackResult:
+        """
+        Fit evidence into the prompt-token budget (see rag/packing.py).
+        """
+        return pack_evidence(evidence, self.packing, header=self._evidence_head)
+
+    def render(self, meta: Dict[str, Any], evidence: List[Evidence]) -> List[Any]:
         args = {
             "meta_json": json.dumps(meta, ensure_ascii=False),
-            "evidence_text": "\n".join(lines).strip(),
+            "evidence_text": self._evidence_text(evidence),
+        }
+
+        return self.template.format_messages(**args)
+
+    def _evidence_text(self, evidence: List[Evidence]) -> str:
+        lines = []
+        for i, e in enumerate(self.pack(evidence).kept, 1):
+            lines.append(self._evidence_head(i, e))
+            lines.append((e.text or "").strip())
+            lines.append("")
+        return "\n".join(lines).strip()
+
+    @traced("llm.refine")
+    def refine_fields(
+        self,
+        post: Dict[str, Any],
+        comments: Dict[str, str],
+        evidence: List[Evidence],
+    ) -> Dict[str, Any]:
+        """
+        Regenerate only the fields named in `comments` ({field: comment}); the rest of the
+        post is given as context. Returns just the rewritten fields.
+        """
+        fields = [f for f in GENERATED_FIELDS if f in comments]
+        if not fields:
+            return {}
+        current = {k: v for k, v in post.items() if k in GENERATED_FIELDS}
+        messages = self.refine_template.format_messages(
+            fields=", ".join(fields),
+            post_json=json.dumps(current, ensure_ascii=False),
+            comments_text="\n".join(f"- {f}: {comments[f]}" for f in fields),
+            evidence_text=self._evidence_text(evidence),
+        )
+        data = parse_completion(self._invoke(messages))
+        return {k: v for k, v in data.items() if k in fields and v is not None}
+
+    def request_body(self, meta: Dict[str, Any], evidence: List[Evidence]) -> Dict[str, Any]:
+        """
+        The same prompt as generate(), as a raw chat-completions body (for batch jobs).
+        """
+        roles = {"system": "system", "human": "user", "ai": "assistant"}
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": roles.get(m.type, m.type), "content": m.content}
+                for m in self.render(meta, evidence)
+            ],
         }
 
-        raw = (self.template | self.llm).invoke(args).content
+    def _prompt_tokens(self, messages: List[Any]) -> int:
+        return sum(count_tokens(m.content, self.model) for m in messages)
+
+    def _record_call(self, messages: List[Any], output: str, reported: tuple[int, int], started: float) -> None:
+        prompt, completion = reported
+        estimated = not (prompt or completion)
+        if estimated:
+            prompt, completion = self._prompt_tokens(messages), count_tokens(output, self.model)
+        usage_ledger().record(UsageRecord(
+            kind="chat",
+            model=self.model,
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+            estimated=estimated,
+        ))
+
+    def _invoke(self, messages: List[Any]) -> str:
+        usage_ledger().check("chat", self.model)
+        t0 = time.perf_counter()
+        with guard("openai").call():
+            msg = self.llm.invoke(messages)
+        self._record_call(messages, msg.content, _reported_usage(msg), t0)
+        return msg.content
 
-        try:
-            return json.loads(raw)
-        except json.JSONDecodeError:
-            m = re.search(r"\{[\s\S]*\}", raw)
-            if not m:
-                raise
-            return json.loads(m.group())
+    def _generate_streaming(
+        self,
+        messages: List[Any],
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Parses the completion as it streams. A schema violation closes the stream early
+        and retries; on_field may then see a field again with a new value.
+        """
+        last: Optional[SchemaViolation] = None
+        for attempt in range(1, self.stream_retries + 2):
+            parser = IncrementalObjectParser(allowed_keys=set(GENERATED_FIELDS), validate=_validate_field)
+            usage_ledger().check("chat", self.model)
+            t0 = time.perf_counter()
+            output: List[str] = []
+            reported = (0, 0)
+            try:
+                with guard("openai").call():
+                    chunks = self.llm.stream(messages)
+                    try:
+                        for chunk in chunks:
+                            output.append(chunk.content or "")
+                            reported = max(reported, _reported_usage(chunk))
+                            # past the closing brace only the trailing usage chunk is left:
+                            # drain it so the real token counts get recorded
+                            if parser.done:
+                                continue
+                            for k, v in parser.feed(chunk.content or ""):
+                                if on_field and v is not None:
+                                    on_field(k, v)
+                    finally:
+                        chunks.close()
+                        # aborted attempts are billed too
+                        self._record_call(messages, "".join(output), reported, t0)
+                if not parser.done:
+                    raise SchemaViolation("stream ended before the JSON object was closed")
+                return _present(parser.fields)
+            except SchemaViolation as e:
+                last = e
+                log.warning("Generation attempt %d aborted: %s", attempt, e)
+        raise last  # stream_retries >= 0, so at least one attempt ran
@@ -1,78 +1,332 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
 import logging
+import threading
+import time
 from daily_art.core.config import load_settings
-from daily_art.core.fs import load_json, save_json
-from daily_art.core.config import load_settings
-from daily_art.core.fs import save_json
-from daily_art.core.fs import ensure_dirs
+from daily_art.core.fs import ensure_dirs, load_json, save_json
+from daily_art.domain.documents import Document, Evidence
 from daily_art.domain.models import ArtPost, MessagePayload
 from daily_art.domain.citations import citations_from_evidence
 from daily_art.connectors.serper import SerperClient
 from daily_art.connectors.wikipedia import WikipediaClient
-from daily_art.llm_generators import PostGenerator
-from daily_art.rag.kb import KnowledgeBase
-from daily_art.core.telegram_io import build_caption
-from daily_art.connectors.telegram import TelegramClient, TelegramConfig
+from daily_art.connectors.image_probe import ImageProber
+from daily_art.core.telegram_io import CAPTION_VERSION, build_caption
+from daily_art.core.cache import FileCache
+from daily_art.core.metrics import counter, gauge, histogram
+from daily_art.core.tracing import span, traced
+from daily_art.core.usage import usage_context, usage_ledger
+from daily_art.pipeline.artifacts import ArtifactStore, content_key
+from daily_art.pipeline.stages import Stage, run_stages
+from daily_art.connectors.telegram_queue import MAX_MEDIA_GROUP, SentLedger, TelegramSendQueue
+
+if TYPE_CHECKING:
+    # heavy (langchain / openai / qdrant_client); imported lazily on first use
+    from daily_art.llm_generators import PostGenerator
+    from daily_art.rag.kb import KnowledgeBase
 
 log = logging.getLogger("daily_art.pipeline")
 
+DRAFTS_IN_FLIGHT = gauge("daily_art_drafts_in_flight", "Drafts being built right now")
+DRAFTS = counter("daily_art_drafts_total", "Finished draft builds by result", ("result",))
+DRAFT_SECONDS = histogram("daily_art_draft_seconds", "Wall time of build_draft")
+
+# Per-stage timeouts (seconds) for build_draft.
+STAGE_TIMEOUTS = {
+    "serper_docs": 30.0,
+    "wiki_doc": 20.0,
+    "images": 30.0,
+    "evidence": 120.0,
+    "text": 180.0,
+}
+
+# Image search results probed per artwork; the best IMAGES_PER_POST of the vetted, ranked
+# subset become painting_urls (a draft edited to list more is sent as a media group).
+IMAGE_CANDIDATES = 6
+IMAGES_PER_POST = 1
+
+# Stages whose artifacts can be forced to recompute (--force-stage).
+ARTIFACT_STAGES = ("serper_docs", "wiki_doc", "images", "evidence", "text", "caption")
+
 
 class ArtPipeline:
-    def __init__(self, model: str | None = None):
+    def __init__(
+        self,
+        model: str | None = None,
+        fresh_generations: bool = False,
+        stream_generation: bool = False,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ):
         self.s = load_settings()
         ensure_dirs(self.s.data_dir, self.s.drafts_dir, self.s.messages_dir, self.s.kb_dir)
 
         self.model = model or self.s.openai_model
-        self.telegram = TelegramClient(TelegramConfig(bot_token=self.s.telegram_bot_token, chat_id=self.s.telegram_chat_id))
-        self.serper = SerperClient(api_key=self.s.serper_api_key)
-        self.wiki = WikipediaClient()
-        self.kb = KnowledgeBase(openai_api_key=self.s.openai_api_key)
-        
-        self.generator = PostGenerator(model=self.model)
-
-    def build_draft(self, title: str, author: str, year: str) -> Path:
-        query = " ".join([title, author, year]).strip()
-
-        # 1) Fetch docs (deterministic inputs)
-        docs = []
-        if self.s.serper_api_key:
-            docs.extend(self.serper.search_documents(query, limit=5))
-        wiki_doc = self.wiki.get_document(f"{title} {author}".strip())
-        if wiki_doc:
-            docs.append(wiki_doc)
-
-        # 2) Upsert into KB + retrieve evidence
-        if docs:
-            self.kb.upsert_documents(docs)
-
-        evidence = self.kb.search(query, top_k=6)
-
-        # 3) Generate narrative from evidence
+        # bypass both the LLM response cache and the text artifact
+        self.fresh_generations = fresh_generations
+        # stream the completion and hand finished fields to on_field as they arrive
+        self.stream_generation = stream_generation
+        self.on_field = on_field
+        self.cache = FileCache(self.s.data_dir / "cache")
+        self.serper = SerperClient(api_key=self.s.serper_api_key, cache=self.cache)
+        self.wiki = WikipediaClient(cache=self.cache)
+        self.image_prober = ImageProber(cache=self.cache)
+        self.artifacts_cache = FileCache(self.s.data_dir / "artifacts")
+
+        # KB connects to Qdrant and makes a probe embedding; the generator pulls in
+        # LangChain. Neither is needed by build_message/send, so build them on first use.
+        self._kb: Optional[KnowledgeBase] = None
+        self._generator: Optional[PostGenerator] = None
+        self._lazy_lock = threading.Lock()
+
+    @property
+    def kb(self) -> KnowledgeBase:
+        if self._kb is None:
+            with self._lazy_lock:
+                if self._kb is None:
+                    from daily_art.rag.kb import KnowledgeBase
+                    self._kb = KnowledgeBase(openai_api_key=self.s.openai_api_key, cache=self.cache)
+        return self._kb
+
+    @property
+    def generator(self) -> PostGenerator:
+        # past the daily token budget, drafts continue on the fallback model (if configured);
+        # the model is part of every text cache key, so the two never mix
+        model = usage_ledger().chat_model(self.model)
+        if self._generator is None or self._generator.model != model:
+            with self._lazy_lock:
+                if self._generator is None or self._generator.model != model:
+                    from daily_art.llm_generators import PostGenerator
+                    if model != self.model:
+                        log.warning("Daily token budget spent; generating with %s instead of %s", model, self.model)
+                    ttl_h = self.s.llm_cache_ttl_hours
+                    self._generator = PostGenerator(
+                        model=model,
+                        cache=self.cache if ttl_h > 0 else None,
+                        cache_ttl=ttl_h * 3600,
+                        bypass_cache=self.fresh_generations,
+                        stream=self.stream_generation,
+                    )
+        return self._generator
+
+    @staticmethod
+    def draft_query(title: str, author: str, year: str) -> str:
+        return " ".join([title, author, year]).strip()
+
+    def prefetch(self, items) -> None:
+        """
+        Warm the Serper cache for many artworks (anything with title/author/year)
+        with batched requests, so build_draft finds search results cached.
+        """
+        if not self.s.serper_api_key:
+            return
+        queries = [self.draft_query(it.title, it.author, it.year) for it in items]
+        self.serper.search_many(queries)
+        self.serper.search_images_many(queries, num=IMAGE_CANDIDATES)
+
+    def build_draft(
+        self,
+        title: str,
+        author: str,
+        year: str,
+        force_stages: Iterable[str] = (),
+        on_stage: Optional[Callable[[str], None]] = None,
+    ) -> Path:
+        t0 = time.perf_counter()
+        with span("pipeline.draft", title=title, author=author, year=year), usage_context(artwork=title), \
+                DRAFTS_IN_FLIGHT.track():
+            try:
+                results = self.run_draft_stages(title, author, year, force_stages, on_stage=on_stage)
+                path = self.save_draft(results["meta"], results["text"], results["evidence"], results["images"])
+            except Exception:
+                DRAFTS.labels("failed").inc()
+                raise
+        DRAFTS.labels("ok").inc()
+        DRAFT_SECONDS.observe(time.perf_counter() - t0)
+        return path
+
+    def text_key(self, meta: Dict[str, Any], evidence: List[Evidence]) -> str:
+        """
+        Artifact key of the generated text: inputs + every generator setting that shapes the prompt.
+        """
+        from daily_art.llm_generators import PROMPT_VERSION
+
+        gen = self.generator
+        return content_key(meta, evidence, gen.model, gen.temperature, PROMPT_VERSION, asdict(gen.packing))
+
+    def run_draft_stages(
+        self,
+        title: str,
+        author: str,
+        year: str,
+        force_stages: Iterable[str] = (),
+        generate: bool = True,
+        on_stage: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Runs the draft graph and returns stage results (+ "meta").
+        generate=False stops before the LLM (used by offline batch generation).
+        """
+        query = self.draft_query(title, author, year)
         meta = {"title": title, "author": author, "year": year}
-        text_data = self.generator.generate(meta=meta, evidence=evidence)
 
-        # 4) Deterministic painting image urls
-        painting_urls = self.serper.search_images(query, num=2) if self.s.serper_api_key else []
+        # Every stage output is stored as a content-addressed artifact keyed on its inputs
+        # (upstream artifacts + config), so reruns only recompute stages downstream of a change.
+        # The text artifact is a generation cache too, so it follows LLM_CACHE_TTL_HOURS:
+        # reused only while younger than the TTL, never when the cache is off (0).
+        force = set(force_stages)
+        ttl_h = self.s.llm_cache_ttl_hours
+        if self.fresh_generations or ttl_h <= 0:
+            force.add("text")
+        store = ArtifactStore(self.artifacts_cache, force=force, max_age={"text": ttl_h * 3600})
+        docs_decode = lambda v: [Document(**d) for d in v]
+
+        # Draft flow as a dependency graph; independent fetches run concurrently:
+        #   serper_docs ─┐
+        #   wiki_doc ────┴─> evidence (KB upsert + search) ─> text (LLM)
+        #   images (search + probe/rank candidates; independent of everything else)
+        def serper_docs():
+            if not self.s.serper_api_key:
+                return []
+            return store.get_or_compute(
+                "serper_docs",
+                content_key(query, 5),
+                lambda: self.serper.search_documents(query, limit=5),
+                docs_decode,
+            )
+
+        def wiki_doc():
+            wiki_q = f"{title} {author}".strip()
+            doc = store.get_or_compute(
+                "wiki_doc",
+                content_key(wiki_q),
+                lambda: [d for d in [self.wiki.get_document(wiki_q)] if d],
+                docs_decode,
+            )
+            return doc[0] if doc else None
+
+        def evidence(serper_docs, wiki_doc):
+            from daily_art.rag.kb import KnowledgeBaseConfig
+
+            docs = serper_docs + ([wiki_doc] if wiki_doc else [])
 
-        # 5) Deterministic citations from evidence
+            def compute():
+                if docs:
+                    self.kb.upsert_documents(docs)
+                return self.kb.search(query, top_k=6)
+
+            return store.get_or_compute(
+                "evidence",
+                content_key(query, [(d.id, d.text) for d in docs], asdict(KnowledgeBaseConfig()), 6),
+                compute,
+                lambda v: [Evidence(**e) for e in v],
+            )
+
+        def text(evidence):
+            return store.get_or_compute(
+                "text",
+                self.text_key(meta, evidence),
+                lambda: self.generator.generate(meta=meta, evidence=evidence, on_field=self.on_field),
+            )
+
+        def images():
+            if not self.s.serper_api_key:
+                return []
+            return store.get_or_compute(
+                "images",
+                content_key(query, IMAGE_CANDIDATES, asdict(self.image_prober.cfg)),
+                lambda: self.image_prober.select(self.serper.search_images(query, num=IMAGE_CANDIDATES)),
+            )
+
+        t = STAGE_TIMEOUTS
+        stages = [
+            Stage("serper_docs", serper_docs, timeout=t["serper_docs"], optional=True, default=[]),
+            Stage("wiki_doc", wiki_doc, timeout=t["wiki_doc"], optional=True, default=None),
+            Stage("images", images, timeout=t["images"], optional=True, default=[]),
+            Stage("evidence", evidence, deps=("serper_docs", "wiki_doc"), timeout=t["evidence"]),
+        ]
+        if generate:
+            stages.append(Stage("text", text, deps=("evidence",), timeout=t["text"]))
+        return {"meta": meta, **run_stages(stages, on_stage=on_stage)}
+
+    def save_draft(
+        self,
+        meta: Dict[str, Any],
+        text_data: Dict[str, Any],
+        evidence: List[Evidence],
+        painting_urls: List[str],
+        drafts_dir: Optional[Path] = None,
+    ) -> Path:
+        """
+        painting_urls is the ranked image list; the post gets the first IMAGES_PER_POST.
+        """
+        # Deterministic citations from evidence
         citations = citations_from_evidence(evidence, max_sources=2)
 
         post = ArtPost(**{
             **text_data,
-            "painting_urls": painting_urls,
+            "painting_urls": painting_urls[:IMAGES_PER_POST],
             "citations": citations,
         })
 
+        title, year = meta["title"], meta["year"]
         slug = f"{title.lower().replace(' ', '_')}_{year}"
-        out_path = self.s.drafts_dir / f"{slug}.json"
+        out_path = (drafts_dir or self.s.drafts_dir) / f"{slug}.json"
         save_json(out_path, post.model_dump())
+        # keep the evidence next to the draft so refine() can reuse it without retrieval
+        save_json(self._evidence_path(out_path), {
+            "meta": meta,
+            "evidence": [e.model_dump() for e in evidence],
+        })
         log.info("Draft saved: %s", out_path)
         return out_path
+
+    def _evidence_path(self, draft_path: Path) -> Path:
+        return draft_path.parent / "evidence" / f"{draft_path.stem}.json"
+
+    def refine(self, draft_path: Path, comments: List[str]) -> Path:
+        """
+        Field-level refinement: only fields targeted by the comments are regenerated,
+        against the evidence saved with the draft. Writes <stem>_refined.json next to the input draft.
+        """
+        from daily_art.domain.refinement import parse_field_comments
+
+        post = ArtPost(**load_json(draft_path))
+        per_field = parse_field_comments(comments)
+        if not per_field:
+            raise RuntimeError("No usable comments to refine with (title/artist/year need a 'field:' prefix).")
+
+        ev_path = self._evidence_path(draft_path)
+        if ev_path.exists():
+            saved = load_json(ev_path)
+            evidence = [Evidence(**e) for e in saved["evidence"]]
+        else:
+            log.warning("No saved evidence for %s; retrieving again", draft_path.name)
+            saved = {"meta": {"title": post.title, "author": post.artist, "year": str(post.year)}}
+            evidence = self.kb.search(self.draft_query(post.title, post.artist, str(post.year)), top_k=6)
+
+        log.info("Refining fields: %s", ", ".join(per_field))
+        with usage_context(artwork=post.title):
+            updated = self.generator.refine_fields(post.model_dump(), per_field, evidence)
+        missing = sorted(set(per_field) - set(updated))
+        if missing:
+            log.warning("Model returned no value for: %s (kept as is)", ", ".join(missing))
+
+        refined = post.model_copy(update=updated)
+        stem = draft_path.stem if draft_path.stem.endswith("_refined") else f"{draft_path.stem}_refined"
+        out_path = draft_path.parent / f"{stem}.json"
+        save_json(out_path, refined.model_dump())
+        save_json(self._evidence_path(out_path), {
+            "meta": saved.get("meta", {}),
+            "evidence": [e.model_dump() for e in evidence],
+        })
+        log.info("Refined draft saved: %s", out_path)
+        return out_path
     
-    def build_message(self, art_json_path: Path) -> Path:
+    @traced("pipeline.build_message")
+    def build_message(self, art_json_path: Path, force_stages: Iterable[str] = ()) -> Path:
         data = load_json(art_json_path)
         post = ArtPost(**data)
 
@@ -80,21 +334,43 @@ class ArtPipeline:
             raise RuntimeError("No painting_urls in ArtPost; enable Serper images or set one manually.")
         photo_url = post.painting_urls[0]
 
-        caption, entities = build_caption(post)
+        store = ArtifactStore(self.artifacts_cache, force=force_stages)
+        caption, entities = store.get_or_compute(
+            "caption",
+            content_key(post, CAPTION_VERSION),
+            lambda: build_caption(post),
+            tuple,
+        )
 
-        msg = MessagePayload(photo_url=photo_url, caption=caption, caption_entities=entities)
+        msg = MessagePayload(
+            photo_url=photo_url,
+            photo_urls=post.painting_urls[:MAX_MEDIA_GROUP],
+            caption=caption,
+            caption_entities=entities,
+        )
 
         out_path = self.s.messages_dir / f"{art_json_path.stem}_message.json"
         save_json(out_path, msg.model_dump())
         return out_path
 
 
+    def send_queue(self, workers: int = 8) -> TelegramSendQueue:
+        ledger = SentLedger(self.s.data_dir / "telegram" / "sent.jsonl")
+        return TelegramSendQueue(self.s.telegram_bot_token, ledger, workers=workers, file_ids=self.cache)
+
+    def fan_out(self, message_json_path: Path, chat_ids: List[str]) -> Dict[str, Any]:
+        """
+        Sends one message to several chats; returns {chat_id: response or exception}.
+        """
+        payload = MessagePayload(**load_json(message_json_path))
+        with span("pipeline.send", chats=len(chat_ids), caption_chars=len(payload.caption)):
+            return self.send_queue().fan_out(payload, chat_ids)
+
     def send(self, message_json_path: Path) -> dict:
-        data = load_json(message_json_path)
-        payload = MessagePayload(**data)
-        return self.telegram.send_photo(
-            photo_url=payload.photo_url,
-            caption=payload.caption,
-            caption_entities=payload.caption_entities,
-        )
+        if not self.s.telegram_chat_id:
+            raise RuntimeError("Missing TELEGRAM_CHAT_ID")
+        res = self.fan_out(message_json_path, [self.s.telegram_chat_id])[self.s.telegram_chat_id]
+        if isinstance(res, BaseException):
+            raise res
+        return res
 
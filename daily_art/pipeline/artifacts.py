@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from daily_art.core.cache import FileCache
+from daily_art.core.tracing import current_span
+
+log = logging.getLogger("daily_art.artifacts")
+
+
+def _jsonable(x: Any) -> Any:
+    if hasattr(x, "model_dump"):
+        return x.model_dump()
+    if isinstance(x, (list, tuple)):
+        return [_jsonable(v) for v in x]
+    if isinstance(x, dict):
+        return {str(k): _jsonable(v) for k, v in x.items()}
+    return x
+
+
+def content_key(*parts: Any) -> str:
+    """
+    Stable hash of a stage's inputs (upstream artifacts + config).
+    """
+    blob = json.dumps(_jsonable(list(parts)), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Content-addressed stage outputs: <root>/<stage>/<sha1(key)>.json.
+    Stages listed in `force` are recomputed (and their artifact overwritten); stages in
+    `max_age` ({stage: seconds}) reuse only artifacts younger than that.
+    """
+    def __init__(self, cache: FileCache, force: Iterable[str] = (), max_age: Optional[Dict[str, float]] = None):
+        self.cache = cache
+        self.force = set(force)
+        self.max_age = max_age or {}
+
+    def get(self, stage: str, key: str) -> Optional[dict]:
+        if stage in self.force:
+            return None
+        return self.cache.get_json(stage, key, max_age=self.max_age.get(stage))
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        self.cache.set_json(stage, key, {"key": key, "value": _jsonable(value)})
+
+    def get_or_compute(
+        self,
+        stage: str,
+        key: str,
+        compute: Callable[[], Any],
+        decode: Callable[[Any], Any] = lambda v: v,
+    ) -> Any:
+        hit = self.get(stage, key)
+        current_span().set(cache_hit=hit is not None)
+        if hit is not None:
+            log.info("Reusing %s artifact %s", stage, key[:12])
+            return decode(hit["value"])
+        value = compute()
+        self.put(stage, key, value)
+        return value
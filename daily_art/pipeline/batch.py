@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List
+
+from daily_art.core.fs import append_jsonl
+from daily_art.core.resilience import CircuitOpenError
+from daily_art.core.usage import BudgetExceeded
+from daily_art.domain.documents import utc_now_iso
+
+log = logging.getLogger("daily_art.batch")
+
+# Failures a retry can't fix (bad input, schema/validation errors, spent budget).
+_PERMANENT = (ValueError, TypeError, BudgetExceeded)
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    title: str
+    author: str
+    year: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.title}|{self.author}|{self.year}"
+
+
+def load_items(path: Path) -> List[BatchItem]:
+    """
+    Reads artworks from CSV (header: title,author,year) or JSONL (one object per line).
+    """
+    rows: List[Dict[str, Any]] = []
+    if path.suffix.lower() == ".csv":
+        with path.open("r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with path.open("r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    items: List[BatchItem] = []
+    for r in rows:
+        title = str(r.get("title") or "").strip()
+        if not title:
+            continue
+        items.append(BatchItem(
+            title=title,
+            author=str(r.get("author") or "").strip(),
+            year=str(r.get("year") or "").strip(),
+        ))
+    return items
+
+
+class Checkpoint:
+    """
+    Append-only JSONL of per-item status; the last line for a key wins.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        state: Dict[str, Dict[str, Any]] = {}
+        if not self.path.exists():
+            return state
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+                state[row["key"]] = row
+        return state
+
+    def record(self, key: str, status: str, **extra: Any) -> None:
+        row = {"key": key, "status": status, "at": utc_now_iso(), **extra}
+        with self._lock:
+            append_jsonl(self.path, [row])
+
+
+def _draft_with_retries(pipeline, item: BatchItem, retries: int, backoff: float) -> Path:
+    attempt = 0
+    while True:
+        try:
+            return pipeline.build_draft(title=item.title, author=item.author, year=item.year)
+        except Exception as e:
+            attempt += 1
+            if attempt > retries or isinstance(e, _PERMANENT):
+                raise
+            delay = backoff * (2 ** (attempt - 1))
+            if isinstance(e, CircuitOpenError):
+                delay = max(delay, e.retry_in)
+            log.warning("Draft %s failed (%s); retry %d/%d in %.1fs", item.key, e, attempt, retries, delay)
+            time.sleep(delay)
+
+
+def run_batch(
+    pipeline,
+    items: List[BatchItem],
+    checkpoint: Checkpoint,
+    *,
+    workers: int = 4,
+    retries: int = 3,
+    backoff: float = 2.0,
+) -> Dict[str, int]:
+    """
+    Drafts items on a worker pool sharing one ArtPipeline.
+    Items already marked done in the checkpoint are skipped, so reruns resume.
+    """
+    done = {k for k, row in checkpoint.load().items() if row.get("status") == "done"}
+    todo = [it for it in items if it.key not in done]
+    log.info("Batch: %d items, %d already done, %d to draft", len(items), len(items) - len(todo), len(todo))
+
+    if todo:
+        # only a warm-up: items fetch whatever is missing themselves
+        try:
+            pipeline.prefetch(todo)
+        except Exception as e:
+            log.warning("Prefetch failed (%s); drafting without a warm cache", e)
+
+    counts = {"done": len(items) - len(todo), "failed": 0}
+    counts_lock = threading.Lock()
+
+    def _work(item: BatchItem) -> None:
+        try:
+            path = _draft_with_retries(pipeline, item, retries, backoff)
+        except Exception as e:
+            log.error("Draft %s failed permanently: %s", item.key, e)
+            checkpoint.record(item.key, "failed", error=str(e))
+            status = "failed"
+        else:
+            checkpoint.record(item.key, "done", path=str(path))
+            status = "done"
+        with counts_lock:
+            counts[status] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="draft") as pool:
+        list(pool.map(_work, todo))
+
+    return counts
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List
+
+from daily_art.connectors.batch_providers import (
+    CHAT_ENDPOINT,
+    EMBEDDINGS_ENDPOINT,
+    BatchProvider,
+    LocalBatchProvider,
+    OpenAIBatchProvider,
+    request_line,
+)
+from daily_art.core.cache import FileCache
+from daily_art.core.config import Settings
+from daily_art.core.fs import append_jsonl, load_json, save_json
+from daily_art.domain.documents import Document, Evidence, utc_now_iso
+from daily_art.pipeline.artifacts import ArtifactStore
+
+log = logging.getLogger("daily_art.batch_jobs")
+
+# Offline bulk work through a provider batch API. A job lives in data/batch_jobs/<name>/:
+#   requests.jsonl  - one request per line (OpenAI batch input format)
+#   manifest.json   - kind, provider, job_id, status + whatever collect() needs to map results back
+# Results of the offline "local" provider are placeholders: they never reach the shared
+# caches under real keys (embeddings go under LOCAL_MODEL_PREFIX + model, drafts stay in
+# the job dir and no text artifact is stored), so later kb-index / draft runs can't pick them up.
+
+LOCAL_MODEL_PREFIX = "local-batch::"
+
+
+def make_provider(name: str, s: Settings) -> BatchProvider:
+    if name == "openai":
+        return OpenAIBatchProvider(api_key=s.openai_api_key)
+    if name == "local":
+        return LocalBatchProvider(root=s.data_dir / "batch_jobs" / "_local")
+    raise ValueError(f"Unknown batch provider: {name}")
+
+
+def _manifest(job_dir: Path) -> Dict[str, Any]:
+    return load_json(job_dir / "manifest.json")
+
+
+def prepare_draft_job(pipeline, items, job_dir: Path) -> int:
+    """
+    Runs retrieval for each artwork interactively (cheap) and writes one chat request per
+    artwork. Meta, evidence and images are kept in the manifest for collect().
+    """
+    requests_path = job_dir / "requests.jsonl"
+    requests_path.unlink(missing_ok=True)
+    entries: Dict[str, Any] = {}
+
+    for i, it in enumerate(items):
+        res = pipeline.run_draft_stages(it.title, it.author, it.year, generate=False)
+        meta, evidence = res["meta"], res["evidence"]
+        custom_id = f"draft-{i}"
+        append_jsonl(requests_path, [request_line(custom_id, CHAT_ENDPOINT, pipeline.generator.request_body(meta, evidence))])
+        entries[custom_id] = {
+            "meta": meta,
+            "evidence": [e.model_dump() for e in evidence],
+            "images": res["images"],
+            "text_key": pipeline.text_key(meta, evidence),
+        }
+
+    save_json(job_dir / "manifest.json", {
+        "kind": "drafts",
+        "endpoint": CHAT_ENDPOINT,
+        "created_at": utc_now_iso(),
+        "items": entries,
+    })
+    return len(entries)
+
+
+def prepare_embedding_job(
+    docs: List[Document],
+    job_dir: Path,
+    cache: FileCache,
+    model: str,
+    chunking=None,
+    group: int = 100,
+) -> int:
+    """
+    Chunks docs and writes embedding requests (up to `group` inputs each) for chunk
+    texts that are not in the embedding cache yet.
+    """
+    from daily_art.rag.chunking import Chunker
+    from daily_art.rag.embeddings import embedding_cache_key
+
+    chunker = Chunker(chunking)
+    texts: List[str] = []
+    seen = set()
+    for d in docs:
+        for ch in chunker.chunk(d):
+            if ch.text in seen or cache.has("embeddings", embedding_cache_key(model, ch.text)):
+                continue
+            seen.add(ch.text)
+            texts.append(ch.text)
+
+    requests_path = job_dir / "requests.jsonl"
+    requests_path.unlink(missing_ok=True)
+    rows = [
+        request_line(f"emb-{n}", EMBEDDINGS_ENDPOINT, {"model": model, "input": texts[i : i + group]})
+        for n, i in enumerate(range(0, len(texts), group))
+    ]
+    append_jsonl(requests_path, rows)
+
+    save_json(job_dir / "manifest.json", {
+        "kind": "embeddings",
+        "endpoint": EMBEDDINGS_ENDPOINT,
+        "model": model,
+        "created_at": utc_now_iso(),
+    })
+    return len(texts)
+
+
+def submit_job(job_dir: Path, provider: BatchProvider) -> str:
+    manifest = _manifest(job_dir)
+    job_id = provider.submit(job_dir / "requests.jsonl", manifest["endpoint"])
+    manifest.update({"provider": provider.name, "job_id": job_id, "status": "submitted"})
+    save_json(job_dir / "manifest.json", manifest)
+    log.info("Submitted %s batch %s via %s", manifest["kind"], job_id, provider.name)
+    return job_id
+
+
+def collect_job(job_dir: Path, provider: BatchProvider, pipeline=None, cache: FileCache | None = None) -> int:
+    """
+    Maps a finished job's results back: drafts are saved (and their text artifacts stored,
+    so later interactive reruns reuse them while LLM_CACHE_TTL_HOURS allows); embeddings
+    go into the embedding cache.
+    Local-provider results are kept apart (see LOCAL_MODEL_PREFIX).
+    Returns the number of results applied.
+    """
+    manifest = _manifest(job_dir)
+    results = provider.results(manifest["job_id"])
+    offline = manifest.get("provider") == LocalBatchProvider.name
+    applied = 0
+
+    if manifest["kind"] == "drafts":
+        from daily_art.llm_generators import parse_completion
+
+        store = ArtifactStore(pipeline.artifacts_cache)
+        for custom_id, body in results.items():
+            entry = manifest["items"].get(custom_id)
+            if not entry:
+                continue
+            try:
+                text_data = parse_completion(body["choices"][0]["message"]["content"])
+            except (KeyError, IndexError, ValueError) as e:
+                log.warning("Unusable result for %s: %s", custom_id, e)
+                continue
+            if not offline:
+                store.put("text", entry["text_key"], text_data)
+            evidence = [Evidence(**e) for e in entry["evidence"]]
+            path = pipeline.save_draft(
+                entry["meta"], text_data, evidence, entry["images"],
+                drafts_dir=job_dir / "drafts" if offline else None,
+            )
+            entry["draft_path"] = str(path)
+            applied += 1
+
+    elif manifest["kind"] == "embeddings":
+        from daily_art.rag.embeddings import embedding_cache_key
+
+        model = LOCAL_MODEL_PREFIX + manifest["model"] if offline else manifest["model"]
+        inputs = {}
+        with (job_dir / "requests.jsonl").open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    inputs[row["custom_id"]] = row["body"]["input"]
+        for custom_id, body in results.items():
+            texts = inputs.get(custom_id) or []
+            for d in body.get("data", []):
+                i = d.get("index", 0)
+                if i < len(texts):
+                    cache.set_json("embeddings", embedding_cache_key(model, texts[i]), d["embedding"])
+                    applied += 1
+
+    manifest["status"] = "collected"
+    save_json(job_dir / "manifest.json", manifest)
+    return applied
+
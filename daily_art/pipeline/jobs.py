@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from daily_art.core.fs import load_json, save_json
+from daily_art.core.metrics import counter, gauge
+from daily_art.core.usage import usage_context
+from daily_art.domain.documents import utc_now_iso
+
+log = logging.getLogger("daily_art.jobs")
+
+# queued -> running -> done | failed
+# "running" found on startup means the process died mid-job; it is queued again
+# (drafts reuse their stage artifacts, sends are deduplicated by the sent ledger).
+
+Notify = Callable[[Optional[int], str], None]
+
+JOBS = counter("daily_art_jobs_total", "Finished pipeline jobs", ("kind", "status"))
+JOBS_WAITING = gauge("daily_art_jobs", "Jobs in the queue file by status (read at scrape time)", ("status",))
+
+
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex[:6])
+    kind: str                          # "draft" | "send"
+    args: Dict[str, Any] = Field(default_factory=dict)
+    chat_id: Optional[int] = None      # where progress is reported
+    status: str = "queued"
+    error: str = ""
+    result: Dict[str, Any] = Field(default_factory=dict)
+    created_at: str = Field(default_factory=utc_now_iso)
+    updated_at: str = Field(default_factory=utc_now_iso)
+
+
+class JobQueue:
+    """
+    Persistent FIFO of pipeline jobs, one JSON file (atomic replace on every change).
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+
+    def _load(self) -> List[Job]:
+        if not self.path.exists():
+            return []
+        return [Job(**row) for row in load_json(self.path)]
+
+    def _save(self, jobs: List[Job]) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        save_json(tmp, [j.model_dump() for j in jobs])
+        os.replace(tmp, self.path)
+
+    def all(self) -> List[Job]:
+        with self._lock:
+            return self._load()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return next((j for j in self.all() if j.id == job_id), None)
+
+    def put(self, job: Job) -> int:
+        """
+        Enqueues a job; returns how many queued jobs are ahead of it.
+        """
+        with self._lock:
+            jobs = self._load()
+            ahead = sum(1 for j in jobs if j.status == "queued")
+            jobs.append(job)
+            self._save(jobs)
+            self._wakeup.notify()
+        return ahead
+
+    def update(self, job_id: str, **fields: Any) -> Job:
+        with self._lock:
+            jobs = self._load()
+            for i, j in enumerate(jobs):
+                if j.id == job_id:
+                    jobs[i] = j.model_copy(update={**fields, "updated_at": utc_now_iso()})
+                    self._save(jobs)
+                    return jobs[i]
+        raise KeyError(job_id)
+
+    def claim(self, timeout: float = 5.0) -> Optional[Job]:
+        """
+        Marks the oldest queued job as running and returns it (None if nothing came in time).
+        """
+        with self._lock:
+            for _ in range(2):
+                jobs = self._load()
+                for i, j in enumerate(jobs):
+                    if j.status == "queued":
+                        jobs[i] = j.model_copy(update={"status": "running", "updated_at": utc_now_iso()})
+                        self._save(jobs)
+                        return jobs[i]
+                self._wakeup.wait(timeout)
+        return None
+
+    def depth(self) -> Dict[Tuple[str], int]:
+        counts: Dict[Tuple[str], int] = {("queued",): 0, ("running",): 0}
+        for j in self.all():
+            if j.status in ("queued", "running"):
+                counts[(j.status,)] += 1
+        return counts
+
+    def recover(self) -> None:
+        with self._lock:
+            jobs = self._load()
+            stale = [i for i, j in enumerate(jobs) if j.status == "running"]
+            for i in stale:
+                jobs[i] = jobs[i].model_copy(update={"status": "queued"})
+            if stale:
+                log.warning("Re-queued %d interrupted job(s)", len(stale))
+                self._save(jobs)
+
+
+class JobWorkers:
+    """
+    Pool of threads running queued jobs against one shared ArtPipeline, so long retrieval
+    and generation never run on the bot's event loop. notify(chat_id, text) reports progress.
+    """
+    def __init__(self, pipeline, queue: JobQueue, notify: Notify, workers: int = 2):
+        self.pipeline = pipeline
+        self.queue = queue
+        self.notify = notify
+        self.workers = max(1, workers)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self.queue.recover()
+        JOBS_WAITING.set_function(self.queue.depth)
+        for n in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is not None:
+                self.run(job)
+
+    def run(self, job: Job) -> None:
+        try:
+            with usage_context(command=f"bot:{job.kind}"):
+                if job.kind == "draft":
+                    result = self._draft(job)
+                elif job.kind == "send":
+                    result = self._send(job)
+                else:
+                    raise ValueError(f"Unknown job kind: {job.kind}")
+        except Exception as e:
+            log.exception("Job %s (%s) failed", job.id, job.kind)
+            self.queue.update(job.id, status="failed", error=f"{type(e).__name__}: {e}")
+            self.notify(job.chat_id, f"Job {job.id} failed: {e}")
+            JOBS.labels(job.kind, "failed").inc()
+            return
+        self.queue.update(job.id, status="done", result=result, error="")
+        JOBS.labels(job.kind, "done").inc()
+
+    def _draft(self, job: Job) -> Dict[str, Any]:
+        a = job.args
+        self.notify(job.chat_id, f"Job {job.id}: drafting \"{a['title']}\"…")
+
+        def on_stage(name: str) -> None:
+            if name in ("evidence", "text"):
+                label = "sources retrieved" if name == "evidence" else "text generated"
+                self.notify(job.chat_id, f"Job {job.id}: {label}")
+
+        draft = self.pipeline.build_draft(a["title"], a.get("author", ""), a.get("year", ""), on_stage=on_stage)
+        message = self.pipeline.build_message(draft)
+        post = load_json(draft)
+        preview = (post.get("intro") or post.get("painting_features") or "")[:300]
+        self.notify(
+            job.chat_id,
+            f"Draft {job.id} ready: {post.get('title')} ({post.get('year')})\n\n{preview}\n\n"
+            f"/send {job.id} to publish",
+        )
+        return {"draft_path": str(draft), "message_path": str(message)}
+
+    def _send(self, job: Job) -> Dict[str, Any]:
+        from daily_art.connectors.telegram_queue import message_ids
+
+        draft_job = self.queue.get(job.args["draft_job"])
+        if draft_job is None or draft_job.status != "done" or draft_job.kind != "draft":
+            raise ValueError(f"No finished draft {job.args['draft_job']}")
+        resp = self.pipeline.send(Path(draft_job.result["message_path"]))
+        ids = message_ids(resp)
+        self.notify(job.chat_id, f"Draft {draft_job.id} published (message_id={','.join(map(str, ids))})")
+        return {"draft_job": draft_job.id, "message_ids": ids}
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from daily_art.connectors.telegram_queue import delivery_uncertain, message_ids
+from daily_art.core.fs import load_json, save_json
+from daily_art.domain.documents import utc_now_iso
+
+log = logging.getLogger("daily_art.scheduler")
+
+# pending -> preparing -> ready -> sending -> sent
+#                  \-> (retry after backoff) ... -> failed
+# Sends are retried only when Telegram surely didn't get the post (4xx/429, connect
+# errors). A send that may have gone through (timeout after the request went out, 5xx)
+# and "sending" found on startup (we crashed mid-send) are moved to "send_unknown"
+# instead: never resent automatically, a human confirms with schedule-resolve.
+
+
+def parse_send_at(value: str) -> datetime:
+    """
+    ISO-8601 timestamp; naive values are taken as UTC.
+    """
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid send time {value!r}; expected ISO-8601 like 2026-10-20T09:00:00+00:00") from None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class ScheduledPost(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex[:8])
+    title: str
+    author: str = ""
+    year: str = ""
+    send_at: str                      # ISO-8601 with timezone
+    status: str = "pending"
+    attempts: int = 0
+    error: str = ""
+    draft_path: str = ""
+    message_path: str = ""
+    message_id: Optional[int] = None
+    retry_at: str = ""                # earliest time of the next attempt after a failure
+    updated_at: str = Field(default_factory=utc_now_iso)
+
+    @property
+    def send_at_dt(self) -> datetime:
+        return parse_send_at(self.send_at)
+
+    def due(self, at: datetime, now: datetime) -> bool:
+        return at <= now and (not self.retry_at or parse_send_at(self.retry_at) <= now)
+
+
+class ScheduleQueue:
+    """
+    Queue of upcoming posts persisted as one JSON file (atomic replace on every change).
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[ScheduledPost]:
+        if not self.path.exists():
+            return []
+        return [ScheduledPost(**row) for row in load_json(self.path)]
+
+    def _save(self, posts: List[ScheduledPost]) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        save_json(tmp, [p.model_dump() for p in posts])
+        os.replace(tmp, self.path)
+
+    def all(self) -> List[ScheduledPost]:
+        with self._lock:
+            return sorted(self._load(), key=lambda p: p.send_at_dt)
+
+    def add(self, post: ScheduledPost) -> ScheduledPost:
+        with self._lock:
+            posts = self._load()
+            posts.append(post)
+            self._save(posts)
+        return post
+
+    def update(self, post_id: str, **fields) -> ScheduledPost:
+        with self._lock:
+            posts = self._load()
+            for i, p in enumerate(posts):
+                if p.id == post_id:
+                    posts[i] = p.model_copy(update={**fields, "updated_at": utc_now_iso()})
+                    self._save(posts)
+                    return posts[i]
+        raise KeyError(post_id)
+
+    def resolve(self, post_id: str, sent: bool, message_id: Optional[int] = None) -> ScheduledPost:
+        """
+        Settles a send_unknown (or failed) post by hand: mark it sent, or queue it again
+        (from ready if its message was built, otherwise from pending).
+        """
+        if sent:
+            return self.update(post_id, status="sent", message_id=message_id, error="", retry_at="")
+        post = next((p for p in self.all() if p.id == post_id), None)
+        if post is None:
+            raise KeyError(post_id)
+        status = "ready" if post.message_path else "pending"
+        return self.update(post_id, status=status, attempts=0, error="", retry_at="")
+
+    def recover(self) -> None:
+        """
+        Called on startup: interrupted prepares are retried, interrupted sends are parked.
+        """
+        for p in self.all():
+            if p.status == "preparing":
+                self.update(p.id, status="pending")
+            elif p.status == "sending":
+                log.warning("Post %s was being sent when we stopped; marking 'send_unknown'", p.id)
+                self.update(p.id, status="send_unknown")
+
+
+class Scheduler:
+    """
+    Prepares posts `lead` ahead of their send time (fetch, index, draft, message + image
+    checks) so that at send time only the Telegram call is left. Failed attempts wait
+    retry_backoff * 2**(attempt-1) seconds (or Telegram's retry_after) before the next.
+    """
+    def __init__(
+        self,
+        pipeline,
+        queue: ScheduleQueue,
+        lead: timedelta = timedelta(hours=6),
+        poll_interval: float = 30.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 60.0,
+    ):
+        self.pipeline = pipeline
+        self.queue = queue
+        self.lead = lead
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+    def _fail(
+        self, p: ScheduledPost, stage: str, e: Exception, retry_status: str, delay: Optional[float] = None
+    ) -> ScheduledPost:
+        attempts = p.attempts + 1
+        if attempts >= self.max_attempts:
+            status, retry_at = "failed", ""
+        else:
+            delay = delay if delay else self.retry_backoff * 2 ** (attempts - 1)
+            status = retry_status
+            retry_at = (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat(timespec="seconds")
+        log.error("Post %s %s failed (attempt %d/%d): %s", p.id, stage, attempts, self.max_attempts, e)
+        return self.queue.update(p.id, status=status, attempts=attempts, error=f"{stage}: {e}", retry_at=retry_at)
+
+    def prepare(self, p: ScheduledPost) -> ScheduledPost:
+        self.queue.update(p.id, status="preparing")
+        try:
+            draft = self.pipeline.build_draft(title=p.title, author=p.author, year=p.year)
+            message = self.pipeline.build_message(draft)
+        except Exception as e:
+            return self._fail(p, "prepare", e, retry_status="pending")
+        log.info("Post %s prepared for %s", p.id, p.send_at)
+        return self.queue.update(
+            p.id, status="ready", draft_path=str(draft), message_path=str(message), error="", retry_at=""
+        )
+
+    def send(self, p: ScheduledPost) -> ScheduledPost:
+        self.queue.update(p.id, status="sending")
+        try:
+            resp = self.pipeline.send(Path(p.message_path))
+        except Exception as e:
+            if delivery_uncertain(e):
+                log.error("Post %s may have been sent (%s); marking 'send_unknown', not retrying", p.id, e)
+                return self.queue.update(p.id, status="send_unknown", attempts=p.attempts + 1, error=f"send: {e}")
+            return self._fail(p, "send", e, retry_status="ready", delay=getattr(e, "retry_after", 0.0))
+        msg_id = next(iter(message_ids(resp)), None)
+        log.info("Post %s sent message_id=%s", p.id, msg_id)
+        return self.queue.update(p.id, status="sent", message_id=msg_id, error="", retry_at="")
+
+    def tick(self, now: Optional[datetime] = None) -> None:
+        now = now or datetime.now(timezone.utc)
+        posts = self.queue.all()
+        # Send everything already due first, so a slow prepare can't delay it
+        for p in posts:
+            if p.status == "ready" and p.due(p.send_at_dt, now):
+                self.send(p)
+        for p in posts:
+            if p.status == "pending" and p.due(p.send_at_dt - self.lead, now):
+                p = self.prepare(p)
+                if p.status == "ready" and p.due(p.send_at_dt, now):
+                    self.send(p)
+
+    def run_forever(self) -> None:
+        self.queue.recover()
+        log.info("Scheduler started (lead=%s, poll=%.0fs)", self.lead, self.poll_interval)
+        while True:
+            try:
+                self.tick()
+            except Exception:
+                log.exception("Scheduler tick failed")
+            time.sleep(self.poll_interval)
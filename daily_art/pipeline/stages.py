@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from daily_art.core.metrics import histogram
+from daily_art.core.tracing import bind, span
+
+log = logging.getLogger("daily_art.stages")
+
+STAGE_SECONDS = histogram("daily_art_stage_seconds", "Pipeline stage run time (artifact hits included)", ("stage",))
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of a pipeline graph. `fn` receives the results of `deps` as keyword
+    arguments named after the dependency stages.
+    Optional stages fall back to `default` on error/timeout instead of failing the run.
+    """
+    name: str
+    fn: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    optional: bool = False
+    default: Any = None
+
+
+def _run_stage(st: Stage, /, **deps: Any) -> Any:
+    with span(f"stage.{st.name}"), STAGE_SECONDS.labels(st.name).time():
+        return st.fn(**deps)
+
+
+class StageError(RuntimeError):
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"Stage '{stage}' failed: {reason}")
+        self.stage = stage
+
+
+def run_stages(
+    stages: List[Stage],
+    max_workers: int = 4,
+    on_stage: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs independent stages concurrently on a thread pool, starting each stage
+    as soon as its dependencies are done. Returns {stage_name: result}.
+    A timed-out thread cannot be killed; its result is simply ignored.
+    on_stage(name) is called as each stage finishes (progress reporting).
+    """
+    names = {st.name for st in stages}
+    for st in stages:
+        unknown = [d for d in st.deps if d not in names]
+        if unknown:
+            raise ValueError(f"Stage '{st.name}' depends on unknown stages: {unknown}")
+
+    results: Dict[str, Any] = {}
+    pending: Dict[str, Stage] = {st.name: st for st in stages}
+    running: Dict[Future, Tuple[Stage, Optional[float], float]] = {}
+
+    def _fail(st: Stage, reason: str, exc: BaseException | None = None) -> None:
+        if st.optional:
+            log.warning("Stage %s skipped (%s)", st.name, reason)
+            results[st.name] = st.default
+            return
+        raise StageError(st.name, reason) from exc
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+    try:
+        while pending or running:
+            for name, st in list(pending.items()):
+                if all(d in results for d in st.deps):
+                    del pending[name]
+                    started = time.monotonic()
+                    deadline = started + st.timeout if st.timeout else None
+                    fut = pool.submit(bind(_run_stage), st, **{d: results[d] for d in st.deps})
+                    running[fut] = (st, deadline, started)
+
+            if not running:
+                raise ValueError(f"Dependency cycle between stages: {sorted(pending)}")
+
+            deadlines = [dl for _, dl, _ in running.values() if dl is not None]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                st, _, started = running.pop(fut)
+                try:
+                    results[st.name] = fut.result()
+                    log.debug("Stage %s done in %.2fs", st.name, time.monotonic() - started)
+                except Exception as e:
+                    _fail(st, f"{type(e).__name__}: {e}", e)
+                if on_stage:
+                    on_stage(st.name)
+
+            now = time.monotonic()
+            for fut, (st, dl, _) in list(running.items()):
+                if dl is not None and now >= dl:
+                    running.pop(fut)
+                    fut.cancel()
+                    _fail(st, f"timed out after {st.timeout:g}s")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -1,14 +1,75 @@
 from __future__ import annotations
+import hashlib
+import math
+import re
+import struct
+import time
 from dataclasses import dataclass
 from typing import List
 from openai import OpenAI
 from daily_art.core.cache import FileCache, sha1_text
+from daily_art.core.resilience import guard
+from daily_art.core.tracing import current_span, span, traced
+from daily_art.core.usage import UsageRecord, usage_ledger
+from daily_art.rag.packing import count_tokens
 
 
 @dataclass(frozen=True)
 class EmbeddingConfig:
     model: str = "text-embedding-3-small"
 
+def embedding_cache_key(model: str, text: str) -> str:
+    # include model so changing model invalidates cache
+    return f"{model}::{sha1_text(text)}"
+
+
+def deterministic_embedding(text: str, dim: int = 1536) -> List[float]:
+    """
+    Offline stand-in: unit vector derived from sha256(text). Same text -> same vector.
+    """
+    raw = b""
+    counter = 0
+    while len(raw) < dim * 4:
+        raw += hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        counter += 1
+    ints = struct.unpack(f"<{dim}i", raw[: dim * 4])
+    vec = [i / 2**31 for i in ints]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def hashed_bow_embedding(text: str, dim: int = 256) -> List[float]:
+    """
+    Offline stand-in with some semantics: signed feature hashing of lowercase words,
+    L2-normalised. Texts sharing words get similar vectors.
+    """
+    vec = [0.0] * dim
+    for w in re.findall(r"\w+", (text or "").lower()):
+        h = int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+class OfflineEmbedder:
+    """
+    Drop-in for Embedder without network calls (benchmarks, tests): hashed bag-of-words vectors.
+    """
+    def __init__(self, dim: int = 256):
+        self.cfg = EmbeddingConfig(model=f"offline-bow-{dim}")
+        self.dim = dim
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return [hashed_bow_embedding(t, self.dim) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return hashed_bow_embedding(text, self.dim)
+
+
+def _prompt_tokens(resp) -> int:
+    return int(getattr(getattr(resp, "usage", None), "prompt_tokens", 0) or 0)
+
+
 class Embedder:
     def __init__(self, api_key: str, cfg: EmbeddingConfig | None = None, cache: FileCache | None = None):
         self.client = OpenAI(api_key=api_key)
@@ -16,9 +77,9 @@ class Embedder:
         self.cache = cache
 
     def _cache_key(self, text: str) -> str:
-        # include model so changing model invalidates cache
-        return f"{self.cfg.model}::{sha1_text(text)}"
+        return embedding_cache_key(self.cfg.model, text)
 
+    @traced("embeddings.embed")
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         if not texts:
             return []
@@ -37,9 +98,30 @@ class Embedder:
             missing_texts.append(t)
             missing_idx.append(i)
 
+        current_span().set(
+            texts=len(texts),
+            cache_hits=len(texts) - len(missing_texts),
+            cache_hit=not missing_texts,
+        )
+
+        ledger = usage_ledger()
+        if len(missing_texts) < len(texts):
+            missing = set(missing_idx)
+            ledger.record(UsageRecord(
+                kind="embedding",
+                model=self.cfg.model,
+                cache_hit=True,
+                saved_tokens=sum(count_tokens(t, self.cfg.model) for i, t in enumerate(texts) if i not in missing),
+            ))
+
         # 2) embed only missing
         if missing_texts:
-            resp = self.client.embeddings.create(model=self.cfg.model, input=missing_texts)
+            ledger.check("embedding", self.cfg.model)
+            t0 = time.perf_counter()
+            with span("openai.embeddings", model=self.cfg.model, inputs=len(missing_texts),
+                      input_chars=sum(len(t) for t in missing_texts)), guard("openai").call():
+                resp = self.client.embeddings.create(model=self.cfg.model, input=missing_texts)
+            self._record(resp, missing_texts, t0)
             new_vecs = [d.embedding for d in resp.data]
 
             # 3) write cache + fill
@@ -53,4 +135,19 @@ class Embedder:
 
     def embed_query(self, text: str) -> List[float]:
         # queries you typically don't cache, but you *can*
-        return self.client.embeddings.create(model=self.cfg.model, input=[text]).data[0].embedding
+        usage_ledger().check("embedding", self.cfg.model)
+        t0 = time.perf_counter()
+        with span("openai.embeddings", model=self.cfg.model, inputs=1, input_chars=len(text)), guard("openai").call():
+            resp = self.client.embeddings.create(model=self.cfg.model, input=[text])
+        self._record(resp, [text], t0)
+        return resp.data[0].embedding
+
+    def _record(self, resp, texts: List[str], started: float) -> None:
+        tokens = _prompt_tokens(resp)
+        usage_ledger().record(UsageRecord(
+            kind="embedding",
+            model=self.cfg.model,
+            prompt_tokens=tokens or sum(count_tokens(t, self.cfg.model) for t in texts),
+            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+            estimated=not tokens,
+        ))
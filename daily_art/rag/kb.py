@@ -6,8 +6,10 @@ from typing import List
 from daily_art.domain.documents import Document, Evidence
 from daily_art.rag.chunking import Chunker, ChunkingConfig
 from daily_art.rag.embeddings import Embedder, EmbeddingConfig
+from daily_art.rag.packing import trim_text
 from daily_art.rag.vectordb import VectorStore, QdrantConfig
 from daily_art.core.cache import FileCache
+from daily_art.core.tracing import current_span, traced
 
 
 @dataclass(frozen=True)
@@ -19,17 +21,27 @@ class KnowledgeBaseConfig:
 
 
 class KnowledgeBase:
-    def __init__(self, *, openai_api_key: str, cfg: KnowledgeBaseConfig | None = None, cache: FileCache | None = None):
+    def __init__(
+        self,
+        *,
+        openai_api_key: str,
+        cfg: KnowledgeBaseConfig | None = None,
+        cache: FileCache | None = None,
+        embedder: Embedder | None = None,
+    ):
         self.cfg = cfg or KnowledgeBaseConfig()
         self.chunker = Chunker(self.cfg.chunking)
-        self.embedder = Embedder(api_key=openai_api_key, cfg=self.cfg.embeddings, cache=cache)
+        # any object with embed_texts/embed_query works (e.g. OfflineEmbedder)
+        self.embedder = embedder or Embedder(api_key=openai_api_key, cfg=self.cfg.embeddings, cache=cache)
         sample_vec = self.embedder.embed_query("vector-size-probe")
         self.store = VectorStore(cfg=self.cfg.qdrant, vector_size=len(sample_vec))
 
+    @traced("kb.upsert")
     def upsert_documents(self, docs: List[Document]) -> int:
         chunks = []
         for d in docs:
             chunks.extend(self.chunker.chunk(d))
+        current_span().set(docs=len(docs), chunks=len(chunks), chars=sum(len(c.text) for c in chunks))
         if not chunks:
             return 0
 
@@ -37,9 +49,12 @@ class KnowledgeBase:
         self.store.upsert(chunks, vectors)
         return len(chunks)
 
+    @traced("kb.search")
     def search(self, query: str, top_k: int | None = None) -> List[Evidence]:
+        return self.search_vector(self.embedder.embed_query(query), top_k=top_k)
+
+    def search_vector(self, qvec: List[float], top_k: int | None = None) -> List[Evidence]:
         k = top_k or self.cfg.top_k
-        qvec = self.embedder.embed_query(query)
         results = self.store.search(qvec, top_k=k)
 
         evidence: List[Evidence] = []
@@ -48,7 +63,7 @@ class KnowledgeBase:
             evidence.append(
                 Evidence(
                     chunk_id=r.chunk_id,
-                    text=(payload.get("text") or "")[:900],
+                    text=trim_text(payload.get("text") or "", 900),
                     source_title=str(payload.get("title") or ""),
                     source_url=payload.get("url"),
                     score=r.score,
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from daily_art.domain.documents import Evidence
+
+log = logging.getLogger("daily_art.packing")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class PackingConfig:
+    token_budget: int = 1200            # tokens for the whole evidence block
+    max_items: int = 6
+    min_score: float = 0.0              # drop evidence scoring below this
+    redundancy_threshold: float = 0.8   # word-set Jaccard above which an item is a near-duplicate
+    min_item_tokens: int = 40           # don't keep trimmed items smaller than this
+    tokenizer_model: str = "gpt-4o-mini"
+
+
+@dataclass
+class PackResult:
+    kept: List[Evidence]
+    dropped: List[Tuple[Evidence, str]] = field(default_factory=list)  # (item, reason)
+    tokens: int = 0
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> Optional[Any]:
+    # tiktoken is optional; without it we fall back to a ~4 chars/token estimate
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # encodings are downloaded on first use; offline that fails (cached per model, so logged once)
+        log.warning("tiktoken encoding for %s unavailable (%s); estimating tokens from length", model, e)
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text))
+
+
+# A sentence cut must keep at least this share of the limit; an early boundary
+# ("St. Rémy …", "c. 1889 …") would otherwise shrink a snippet to a few characters.
+MIN_SENTENCE_CUT = 0.5
+
+
+def trim_text(text: str, max_chars: int) -> str:
+    """
+    Cut to at most max_chars, at a sentence boundary if that keeps at least half of it,
+    else at a word boundary.
+    """
+    text = (text or "").strip()
+    if len(text) <= max_chars:
+        return text
+    ends = [m.start() for m in _SENTENCE_END.finditer(text[: max_chars + 1])]
+    if ends and ends[-1] >= max_chars * MIN_SENTENCE_CUT:
+        return text[: ends[-1]]
+    head = text[:max_chars]
+    cut = head.rfind(" ")
+    return (head[:cut] if cut > 0 else head).rstrip() + "…"
+
+
+def trim_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """
+    Keep whole sentences while they fit; fall back to whole words when they would
+    keep less than half of max_tokens.
+    """
+    out: List[str] = []
+    used = 0
+    for sent in _SENTENCE_END.split((text or "").strip()):
+        n = count_tokens(sent + " ", model)
+        if used + n > max_tokens:
+            break
+        out.append(sent)
+        used += n
+    if out and used >= max_tokens * MIN_SENTENCE_CUT:
+        return " ".join(out)
+    words = (text or "").split()
+    if count_tokens(" ".join(words), model) <= max_tokens:
+        return " ".join(words)
+    # largest prefix that fits, by binary search (token counts grow with the prefix)
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid]) + "…", model) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    if lo == 0:
+        return " ".join(out)
+    return " ".join(words[:lo]) + "…"
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def pack_evidence(
+    evidence: List[Evidence],
+    cfg: PackingConfig | None = None,
+    header: Any = None,
+) -> PackResult:
+    """
+    Greedy packing in score order: low-score and near-duplicate items go first,
+    then items that no longer fit the budget; the last item that partially fits
+    is trimmed at a sentence boundary. `header(i, e)` renders the per-item heading
+    so its tokens are counted too.
+    """
+    cfg = cfg or PackingConfig()
+    model = cfg.tokenizer_model
+    res = PackResult(kept=[])
+    kept_words: List[set] = []
+
+    for e in sorted(evidence, key=lambda x: x.score, reverse=True):
+        text = (e.text or "").strip()
+        if e.score < cfg.min_score:
+            res.dropped.append((e, "low_score"))
+            continue
+        words = {w.lower() for w in _WORD.findall(text)}
+        if any(_jaccard(words, kw) >= cfg.redundancy_threshold for kw in kept_words):
+            res.dropped.append((e, "redundant"))
+            continue
+        if len(res.kept) >= cfg.max_items:
+            res.dropped.append((e, "max_items"))
+            continue
+
+        head = header(len(res.kept) + 1, e) if header else ""
+        head_tokens = count_tokens(head + "\n", model) if head else 0
+        remaining = cfg.token_budget - res.tokens - head_tokens
+        cost = count_tokens(text, model)
+
+        if cost > remaining:
+            if remaining < cfg.min_item_tokens:
+                res.dropped.append((e, "over_budget"))
+                continue
+            text = trim_to_tokens(text, remaining, model)
+            if not text:
+                res.dropped.append((e, "over_budget"))
+                continue
+            cost = count_tokens(text, model)
+            e = e.model_copy(update={"text": text})
+
+        res.kept.append(e)
+        kept_words.append(words)
+        res.tokens += head_tokens + cost
+
+    if res.dropped:
+        log.info(
+            "Evidence packing kept %d (%d tokens), dropped %d: %s",
+            len(res.kept), res.tokens, len(res.dropped),
+            ", ".join(f"{d.chunk_id or d.source_title}={why}" for d, why in res.dropped),
+        )
+    return res
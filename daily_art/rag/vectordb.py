@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from typing import Any, Dict, List
 import uuid
@@ -7,14 +8,24 @@ import uuid
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qm
 
+from daily_art.core.metrics import counter, histogram
+from daily_art.core.tracing import current_span, traced
 from daily_art.domain.documents import Chunk, SearchResult
 
 
+SEARCH_SECONDS = histogram(
+    "daily_art_qdrant_search_seconds", "Vector search latency",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+UPSERTED_POINTS = counter("daily_art_qdrant_upserted_points_total", "Points written to the vector store")
+
+
 @dataclass(frozen=True)
 class QdrantConfig:
     host: str = "localhost"
     port: int = 6333
     collection: str = "rag_docs"
+    location: str = ""     # ":memory:" for a throwaway in-process store; empty = host/port
 
 
 def _qdrant_point_id(stable_text_id: str) -> str:
@@ -25,7 +36,10 @@ def _qdrant_point_id(stable_text_id: str) -> str:
 class VectorStore:
     def __init__(self, cfg: QdrantConfig, vector_size: int):
         self.cfg = cfg
-        self.client = QdrantClient(host=cfg.host, port=cfg.port)
+        if cfg.location:
+            self.client = QdrantClient(location=cfg.location)
+        else:
+            self.client = QdrantClient(host=cfg.host, port=cfg.port)
         self._ensure_collection(vector_size)
 
     def _ensure_collection(self, vector_size: int) -> None:
@@ -41,8 +55,16 @@ class VectorStore:
             ),
         )
 
+    def drop(self) -> None:
+        self.client.delete_collection(collection_name=self.cfg.collection)
+
+    def count(self) -> int:
+        return self.client.count(collection_name=self.cfg.collection, exact=True).count
+
+    @traced("qdrant.upsert")
     def upsert(self, chunks: List[Chunk], vectors: List[List[float]]) -> None:
         assert len(chunks) == len(vectors)
+        current_span().set(points=len(chunks))
 
         points: List[qm.PointStruct] = []
         for ch, vec in zip(chunks, vectors):
@@ -66,11 +88,14 @@ class VectorStore:
             points=points,
             wait=True,
         )
+        UPSERTED_POINTS.inc(len(points))
 
+    @traced("qdrant.search")
     def search(self, query_vector: List[float], top_k: int = 5) -> List[SearchResult]:
         """
         Compatible with modern qdrant-client versions.
         """
+        t0 = time.perf_counter()
         if hasattr(self.client, "query_points"):
             res = self.client.query_points(
                 collection_name=self.cfg.collection,
@@ -86,6 +111,7 @@ class VectorStore:
                 limit=top_k,
                 with_payload=True,
             )
+        SEARCH_SECONDS.observe(time.perf_counter() - t0)
 
         out: List[SearchResult] = []
         for h in hits:
@@ -97,4 +123,5 @@ class VectorStore:
                     payload=payload,
                 )
             )
+        current_span().set(top_k=top_k, hits=len(out))
         return out
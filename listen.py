@@ -1,9 +1,17 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
 import logging
 import os
+from pathlib import Path
+
+from typing import TYPE_CHECKING, Optional, Tuple
 
-from typing import Optional, Tuple
-from telegram import ForceReply, Update
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+# python-telegram-bot is only needed for polling mode; webhook mode runs without it
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import Application, ContextTypes
 
 # ---- logging ----
 logging.basicConfig(
@@ -32,6 +40,8 @@ def _extract_text(update: Update) -> Tuple[Optional[int], Optional[str]]:
 
 # -------- handlers --------
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    from telegram import ForceReply
+
     user = update.effective_user
     chat_id, _ = _extract_text(update)
     logger.info("Received /start from user=%s chat_id=%s", getattr(user, "username", None), chat_id)
@@ -43,13 +53,6 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         )
 
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    chat_id, _ = _extract_text(update)
-    logger.info("Received /help in chat_id=%s", chat_id)
-    if update.message:
-        await update.message.reply_text("Help!")
-
-
 async def echo_any(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Echo for both user/group messages AND channel posts (text or caption)."""
     chat_id, text = _extract_text(update)
@@ -73,12 +76,30 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
     logger.exception("Unhandled exception while processing update=%r", update)
 
 
-def main() -> None:
-    application = Application.builder().token(TOKEN).build()
+def run_polling(job_workers: int = 2) -> None:
+    from telegram.ext import Application, CommandHandler, MessageHandler, filters
+
+    from daily_art.bot.api import BotAPI
+    from daily_art.bot.handlers import build_dispatcher, job_queue, start_job_workers
+    from daily_art.core.config import load_settings
+
+    api = BotAPI(TOKEN)
+    jobs = job_queue() if job_workers > 0 else None
+    dp = build_dispatcher(api, jobs=jobs, admin_chat_ids=load_settings().bot_admin_chat_ids)
+
+    async def post_init(app: Application) -> None:
+        if jobs is not None:
+            start_job_workers(api, jobs, asyncio.get_running_loop(), workers=job_workers)
+
+    async def pipeline_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        # same handlers as webhook mode, fed the raw update
+        await dp.dispatch(update.to_dict())
+
+    application = Application.builder().token(TOKEN).post_init(post_init).build()
 
     # Commands
     application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler(["help", "draft", "status", "send"], pipeline_command))
 
     # Text in private/groups
     application.add_handler(
@@ -105,5 +126,53 @@ def main() -> None:
     ])
 
 
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Telegram listener (polling by default)")
+    ap.add_argument("--webhook", action="store_true", help="Serve a webhook (ASGI/uvicorn) instead of polling")
+    ap.add_argument("--public-url", default=os.getenv("TELEGRAM_WEBHOOK_URL", ""), help="Public base URL Telegram posts to")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    ap.add_argument("--secret", default=os.getenv("TELEGRAM_WEBHOOK_SECRET", ""), help="X-Telegram-Bot-Api-Secret-Token")
+    ap.add_argument("--workers", type=int, default=16, help="Concurrent update handlers")
+    ap.add_argument("--max-pending", type=int, default=1000, help="Queued updates before answering 503")
+    ap.add_argument("--record", type=str, default="", help="Append received updates to this JSONL (for replay)")
+    ap.add_argument("--job-workers", type=int, default=2, help="Pipeline workers for /draft and /send (0 disables them)")
+    ap.add_argument("--trace", type=str, default="", help="Append timing spans (updates, jobs) to this JSONL")
+    ap.add_argument("--metrics-port", type=int, default=0, help="Serve Prometheus /metrics on this port (0 = off)")
+    ap.add_argument("--metrics-host", default="127.0.0.1", help="Interface for --metrics-port (local-only by default)")
+    args = ap.parse_args()
+
+    if args.trace:
+        from daily_art.core import tracing
+        tracing.enable(Path(args.trace))
+
+    if not args.webhook:
+        if args.metrics_port:
+            from daily_art.core.metrics import serve_metrics
+            serve_metrics(args.metrics_port, host=args.metrics_host)
+        run_polling(job_workers=args.job_workers)
+        return
+    if not args.public_url:
+        ap.error("--webhook needs --public-url (or TELEGRAM_WEBHOOK_URL)")
+
+    from daily_art.bot.webhook import serve
+    from daily_art.core.config import load_settings
+
+    serve(
+        TOKEN,
+        args.public_url,
+        host=args.host,
+        port=args.port,
+        secret_token=args.secret,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        record_path=Path(args.record) if args.record else None,
+        job_workers=args.job_workers,
+        admin_chat_ids=load_settings().bot_admin_chat_ids,
+        metrics_port=args.metrics_port,
+        metrics_host=args.metrics_host,
+    )
+
+
 if __name__ == "__main__":
     main()